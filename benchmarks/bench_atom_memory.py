@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""Memory benchmark of Atom and the compact SlotAtom.
+
+Writes a large GRO file (water boxes) and loads it into a Model in a fresh
+process, once with Atom and once with SlotAtom, reporting the peak resident
+set size and the loading time.
+
+Usage::
+
+    python benchmarks/bench_atom_memory.py [natoms]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def write_gro(fn, natoms):
+    names = ['OW', 'HW1', 'HW2']
+    with open(fn, 'w') as f:
+        f.write('water\n%5d\n' % natoms)
+        for i in range(natoms):
+            resnr = i // 3 + 1
+            f.write('%5d%-5s%5s%5d%8.3f%8.3f%8.3f\n'
+                    % (resnr % 100000, 'SOL', names[i % 3], (i+1) % 100000,
+                       (i*0.37) % 20., (i*0.71) % 20., (i*0.13) % 20.))
+        f.write('%10.5f%10.5f%10.5f\n' % (20., 20., 20.))
+
+
+def load(fn, atom_class):
+    from pmx.model import Model
+    from pmx.atom import Atom, SlotAtom
+    cls = {'Atom': Atom, 'SlotAtom': SlotAtom}[atom_class]
+    t0 = time.time()
+    m = Model(fn, atom_class=cls)
+    t = time.time() - t0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+    print('%d %.3f %.1f' % (len(m.atoms), t, rss))
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    fd, fn = tempfile.mkstemp(suffix='.gro')
+    os.close(fd)
+    try:
+        write_gro(fn, natoms)
+        print('natoms = %d' % natoms)
+        print('%-10s %10s %12s' % ('', 'time [s]', 'peak RSS [MB]'))
+        for atom_class in ['Atom', 'SlotAtom']:
+            out = subprocess.check_output([sys.executable, __file__,
+                                           '--load', fn, atom_class])
+            n, t, rss = out.split()
+            assert int(n) == natoms
+            print('%-10s %10.2f %12.1f' % (atom_class, float(t), float(rss)))
+    finally:
+        os.remove(fn)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--load':
+        load(sys.argv[2], sys.argv[3])
+    else:
+        main()
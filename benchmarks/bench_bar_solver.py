@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""Micro-benchmark of the BAR solvers in pmx.estimators.
+
+Compares the original pure-Python fmin objective, the vectorised fmin
+objective and the bracketing root finder for N = 100, 1k and 10k work values.
+
+Usage::
+
+    python benchmarks/bench_bar_solver.py
+"""
+
+import timeit
+import numpy as np
+from scipy.optimize import fmin
+from pmx.estimators import BAR, kb
+
+T = 298.15
+
+
+def calc_dg_loop(wf, wr, T):
+    """The BAR solver as it was before vectorisation, for reference."""
+    nf = float(len(wf))
+    nr = float(len(wr))
+    beta = 1./(kb*T)
+    M = kb * T * np.log(nf/nr)
+
+    def func(x, wf, wr):
+        sf = 0
+        for v in wf:
+            sf += 1./(1+np.exp(beta*(M+v-x)))
+        sr = 0
+        for v in wr:
+            sr += 1./(1+np.exp(-beta*(M+v-x)))
+        r = sf-sr
+        return r**2
+
+    x0 = (np.average(wf)+np.average(wr))/2.
+    return float(fmin(func, x0=x0, args=(wf, wr), disp=0)[0])
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print('%8s %12s %12s %12s %10s' % ('N', 'loop [ms]', 'fmin [ms]',
+                                        'brentq [ms]', 'speedup'))
+    for n in [100, 1000, 10000]:
+        wf = rng.normal(loc=12., scale=5., size=n)
+        wr = rng.normal(loc=8., scale=5., size=n)
+
+        reps = 3 if n < 10000 else 1
+        t_loop = min(timeit.repeat(lambda: calc_dg_loop(wf, wr, T),
+                                   number=1, repeat=reps))
+        t_fmin = min(timeit.repeat(lambda: BAR.calc_dg(wf, wr, T, 'fmin'),
+                                   number=1, repeat=5))
+        t_root = min(timeit.repeat(lambda: BAR.calc_dg(wf, wr, T, 'brentq'),
+                                   number=1, repeat=5))
+
+        dg_loop = calc_dg_loop(wf, wr, T)
+        dg_root = BAR.calc_dg(wf, wr, T, 'brentq')
+        assert abs(dg_loop - dg_root) < 1e-3, (dg_loop, dg_root)
+
+        print('%8d %12.2f %12.2f %12.2f %9.0fx' % (n, t_loop*1e3, t_fmin*1e3,
+                                                   t_root*1e3, t_loop/t_root))
+
+
+if __name__ == '__main__':
+    main()
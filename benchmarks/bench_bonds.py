@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""Benchmark of bond perception from coordinates.
+
+Writes ncopy copies of tests/data/peptide.pdb on a grid and finds their
+bonds, 1-3 and 1-4 pairs with pmx.geometry.bond_graph and
+bonded_neighbors (arrays only) and with Atomselection.perceive_bonds
+(which also fills the bonds, b13 and b14 lists of the atoms). For
+comparison, the 1-3 and 1-4 lists are also made from the same bond lists
+with the Python loops of Atomselection.get_b13 and get_b14.
+(search_neighbors with build_bonds crashes in the C extension, so it
+cannot be timed.)
+
+Usage::
+
+    python benchmarks/bench_bonds.py [ncopy]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from pmx.model import Model
+from pmx.geometry import bond_graph, bonded_neighbors
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'tests', 'data', 'peptide.pdb')
+
+
+def write_copies(fn, ncopy):
+    """Writes a PDB file with ncopy copies of the peptide, 40 A apart."""
+    lines = [l for l in open(DATA) if l.startswith('ATOM')]
+    nres = int(lines[-1][22:26])
+    n = int(np.ceil(ncopy ** (1. / 3)))
+    with open(fn, 'w') as f:
+        atomnr = 1
+        for c in range(ncopy):
+            shift = 40. * np.array([c % n, c // n % n, c // n // n])
+            for line in lines:
+                x = [float(line[30+8*k:38+8*k]) + shift[k] for k in range(3)]
+                f.write('%s%5d %s%4d%s%8.3f%8.3f%8.3f%s'
+                        % (line[:6], atomnr % 100000, line[12:22],
+                           (int(line[22:26]) + c * nres) % 10000,
+                           line[26:30], x[0], x[1], x[2], line[54:]))
+                atomnr += 1
+        f.write('END\n')
+
+
+def timed(func, *args):
+    """Result and best time of three calls."""
+    best = None
+    for k in range(3):
+        gc.collect()
+        t0 = time.time()
+        res = func(*args)
+        t = time.time() - t0
+        best = t if best is None else min(best, t)
+    return res, best
+
+
+def graphs(x, symbols):
+    bonds = bond_graph(x, symbols)
+    return (bonds,) + bonded_neighbors(bonds)
+
+
+def loops(m):
+    for atom in m.atoms:
+        atom.b13 = []
+        atom.b14 = []
+    m.get_b13()
+    m.get_b14()
+
+
+def main():
+    ncopy = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    fd, fn = tempfile.mkstemp(suffix='.pdb')
+    os.close(fd)
+    try:
+        write_copies(fn, ncopy)
+        m = Model(fn, renumber_residues=False)
+    finally:
+        os.remove(fn)
+    x = np.array([a.x for a in m.atoms])
+    symbols = [a.name.lstrip('0123456789')[0] for a in m.atoms]
+
+    (bonds, b13, b14), t_arrays = timed(graphs, x, symbols)
+    _, t_atoms = timed(m.perceive_bonds)
+    _, t_loops = timed(loops, m)
+    nb13 = sum(len(a.b13) for a in m.atoms) // 2
+
+    print('atoms: %d  bonds: %d  1-3: %d  1-4: %d'
+          % (len(x), bonds.nnz // 2, b13.nnz // 2, b14.nnz // 2))
+    print('  bond_graph + bonded_neighbors : %8.3f s' % t_arrays)
+    print('  perceive_bonds (atom lists)   : %8.3f s' % t_atoms)
+    print('  get_b13 + get_b14 (loops)     : %8.3f s  (1-3: %d)'
+          % (t_loops, nb13))
+
+
+if __name__ == '__main__':
+    main()
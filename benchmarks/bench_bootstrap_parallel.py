@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""Scaling benchmark of the process-pool bootstrap of the BAR estimator.
+
+Times BAR.calc_err_boot with 1, 2, 4 and 8 workers and checks that the
+bootstrap error does not depend on the number of workers.
+
+Usage::
+
+    python benchmarks/bench_bootstrap_parallel.py [nboots] [nwork]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+from pmx.estimators import BAR
+
+T = 298.15
+
+
+def main():
+    nboots = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    nwork = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    rng = np.random.default_rng(42)
+    wf = rng.normal(loc=12., scale=5., size=nwork)
+    wr = rng.normal(loc=8., scale=5., size=nwork)
+
+    print('nboots = %d, work values = %d x 2, cores = %s'
+          % (nboots, nwork, os.cpu_count()))
+    print('%8s %10s %10s %12s' % ('workers', 'time [s]', 'speedup',
+                                   'err_boot'))
+    t1 = None
+    ref = None
+    for n_jobs in [1, 2, 4, 8]:
+        t0 = time.time()
+        err = BAR.calc_err_boot(wf, wr, nboots, T, seed=1, n_jobs=n_jobs)
+        t = time.time() - t0
+        if t1 is None:
+            t1 = t
+            ref = err
+        assert err == ref, (n_jobs, err, ref)
+        print('%8d %10.2f %9.1fx %12.6f' % (n_jobs, t, t1/t, err))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""Benchmark of the coordinate store of pmx.atomselection.Atomselection.
+
+Times nm2a/a2nm and translate on a 200k-atom system with the coordinates in
+per-atom lists and with the coordinates kept in one array (store_coords).
+
+Usage::
+
+    python benchmarks/bench_coord_store.py [natoms]
+"""
+
+import sys
+import timeit
+import numpy as np
+from pmx.atom import Atom
+from pmx.atomselection import Atomselection
+
+
+def make_system(natoms):
+    rng = np.random.default_rng(42)
+    x = rng.uniform(0., 10., size=(natoms, 3)).tolist()
+    atoms = [Atom(x=xi, unity='nm', m=1.) for xi in x]
+    return Atomselection(atoms=atoms, unity='nm')
+
+
+def units(sel):
+    sel.nm2a()
+    sel.a2nm()
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    lists = make_system(natoms)
+    stored = make_system(natoms)
+    stored.store_coords()
+
+    print('natoms = %d' % natoms)
+    print('%-22s %12s %12s' % ('', 'lists [ms]', 'array [ms]'))
+    for label, func in [('nm2a + a2nm', units),
+                        ('translate', lambda s: s.translate([1., 2., 3.])),
+                        ('com', lambda s: s.com(vector_only=True))]:
+        t_list = min(timeit.repeat(lambda: func(lists), number=1, repeat=3))
+        t_arr = min(timeit.repeat(lambda: func(stored), number=1, repeat=3))
+        print('%-22s %12.2f %12.2f  (%.0fx)' % (label, t_list*1e3,
+                                                 t_arr*1e3, t_list/t_arr))
+    assert np.allclose([a.x for a in lists.atoms], stored.store_coords())
+
+
+if __name__ == '__main__':
+    main()
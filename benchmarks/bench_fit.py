@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""Benchmark of superposing many fragments.
+
+Makes nconf randomly rotated and perturbed copies of the first residues
+of tests/data/peptide.pdb, the way rotamer and hybrid residue building
+fits fragments on N, CA and C, and fits them back onto the original:
+
+* one at a time on Atom objects, as geometry.fit_atoms did before (C
+  calc_fit_R and the Python loops of apply_fit_R),
+* one at a time with the NumPy fit_atoms,
+* all at once on a (nconf, natoms, 3) array with kabsch and transform.
+
+Usage::
+
+    python benchmarks/bench_fit.py [nconf]
+"""
+
+import gc
+import os
+import sys
+import time
+import numpy as np
+from pmx import _pmx
+from pmx.atom import Atom
+from pmx.model import Model
+from pmx.geometry import fit_atoms, kabsch, transform
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'tests', 'data', 'peptide.pdb')
+
+
+def old_fit_atoms(fit_atoms1, fit_atoms2, rot_atoms2):
+    """geometry.fit_atoms before the NumPy version."""
+    cs1 = list(map(lambda a: a.x, fit_atoms1))
+    cs2 = list(map(lambda a: a.x, fit_atoms2))
+    m = list(map(lambda x: 1., cs1))
+    v = _pmx.center_vec(cs1)
+    v2 = _pmx.center_vec(cs2)
+    R = _pmx.calc_fit_R(cs1, cs2, m)
+    for atom in rot_atoms2:
+        atom.x[0] -= v2[0]
+        atom.x[1] -= v2[1]
+        atom.x[2] -= v2[2]
+    for atom in rot_atoms2:
+        x_old = list(map(lambda x: x, atom.x))
+        for r in range(3):
+            atom.x[r] = 0
+            for c in range(3):
+                atom.x[r] += R[r][c]*x_old[c]
+    for atom in rot_atoms2:
+        atom.x[0] += v[0]
+        atom.x[1] += v[1]
+        atom.x[2] += v[2]
+
+
+def random_rotations(n, rng):
+    q = rng.normal(size=(n, 3, 3))
+    q, r = np.linalg.qr(q)
+    q *= np.sign(np.linalg.det(q))[:, None, None]
+    return q
+
+
+def fit_objects(func, ref, confs, index):
+    for atoms in confs:
+        func(ref, [atoms[i] for i in index], atoms)
+
+
+def main():
+    nconf = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    m = Model(DATA)
+    atoms = [a for a in m.atoms if a.resnr <= 3]
+    index = [k for k, a in enumerate(atoms)
+             if a.resnr == 2 and a.name in ('N', 'CA', 'C')]
+    ref = [atoms[i] for i in index]
+    x0 = np.array([a.x for a in atoms])
+
+    rng = np.random.RandomState(1)
+    confs = np.matmul(x0, random_rotations(nconf, rng)) + \
+        rng.uniform(-20, 20, (nconf, 1, 3)) + \
+        rng.normal(scale=0.1, size=(nconf, len(atoms), 3))
+
+    def objects():
+        return [[Atom(name=a.name, x=x) for a, x in zip(atoms, c)]
+                for c in confs.tolist()]
+
+    timings = []
+    fitted = []
+    for name, func in (('old fit_atoms', old_fit_atoms),
+                       ('fit_atoms', fit_atoms)):
+        confs_atoms = objects()
+        gc.collect()
+        t0 = time.time()
+        fit_objects(func, ref, confs_atoms, index)
+        timings.append((name, time.time() - t0))
+        fitted.append(np.array([[a.x for a in c] for c in confs_atoms]))
+
+    xyz = confs.copy()
+    gc.collect()
+    t0 = time.time()
+    rmsd, R, t = kabsch(x0[index], xyz[:, index])
+    transform(xyz, R, t)
+    timings.append(('kabsch + transform', time.time() - t0))
+    assert np.allclose(fitted[0], fitted[1])
+    assert np.allclose(xyz, fitted[1])
+
+    print('conformers: %d  atoms: %d  fitted atoms: %d'
+          % (nconf, len(atoms), len(index)))
+    for name, t in timings:
+        print('  %-20s: %8.3f s' % (name, t))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""Import-time benchmark of pmx and its command line scripts.
+
+Runs each import in a fresh interpreter with ``python -X importtime`` and
+reports the cumulative import time of the top-level module, as well as
+whether scipy and matplotlib were loaded.
+
+Usage::
+
+    python benchmarks/bench_import.py [repeats]
+"""
+
+import subprocess
+import sys
+
+STMTS = ['pmx', 'pmx.scripts.cli', 'pmx.scripts.mutate',
+         'pmx.scripts.generate_hybrid_topology', 'pmx.scripts.analyze_dhdl']
+
+
+def importtime(mod):
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                          'import %s' % mod], stderr=subprocess.PIPE,
+                         universal_newlines=True, check=True).stderr
+    times = {}
+    for line in out.splitlines():
+        if line.startswith('import time:') and 'cumulative' not in line:
+            _, cum_us, name = line.split('|')
+            times[name.strip()] = int(cum_us)
+    return times
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print('%-42s %10s %7s %10s' % ('import', 'time [ms]', 'scipy',
+                                   'matplotlib'))
+    for mod in STMTS:
+        runs = [importtime(mod) for _ in range(repeats)]
+        t = min(r[mod] for r in runs) / 1e3
+        scipy = any(m.startswith('scipy') for m in runs[0])
+        mpl = any(m.startswith('matplotlib') for m in runs[0])
+        print('%-42s %10.1f %7s %10s' % (mod, t, scipy, mpl))
+
+
+if __name__ == '__main__':
+    main()
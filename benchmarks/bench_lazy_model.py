@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""Benchmark of the lazy Model mode.
+
+Loads a GRO file of water molecules into a Model with and without
+lazy=True, counts the waters, and writes the structure back to a GRO file.
+The lazy Model does all of this on its column arrays, without making Atom,
+Molecule or Chain objects.
+
+Usage::
+
+    python benchmarks/bench_lazy_model.py [natoms]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from filecmp import cmp
+from pmx.model import Model
+from bench_structure_read import write_gro
+
+
+def timed(func, *args, **kwargs):
+    gc.collect()
+    t0 = time.time()
+    res = func(*args, **kwargs)
+    return res, time.time() - t0
+
+
+def count_waters(m):
+    if m.columns is not None:
+        return int(np.sum(m.columns.name == 'OW'))
+    return len([a for a in m.atoms if a.name == 'OW'])
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    tmp = tempfile.mkdtemp()
+    fn = os.path.join(tmp, 'conf.gro')
+    try:
+        write_gro(fn, natoms)
+        print('natoms: %d' % natoms)
+        print('%-8s %10s %10s %10s' % ('', 'load [s]', 'count [s]',
+                                       'write [s]'))
+        out = {}
+        for lazy in [False, True]:
+            m, t_load = timed(Model, fn, lazy=lazy)
+            nwat, t_count = timed(count_waters, m)
+            assert nwat == (natoms + 2) // 3
+            out[lazy] = os.path.join(tmp, 'out%d.gro' % lazy)
+            _, t_write = timed(m.write, out[lazy])
+            assert lazy is False or m.columns is not None
+            print('%-8s %10.2f %10.3f %10.2f'
+                  % ('lazy' if lazy else 'eager', t_load, t_count, t_write))
+            del m
+        assert cmp(out[False], out[True], shallow=False)
+    finally:
+        for f in os.listdir(tmp):
+            os.remove(os.path.join(tmp, f))
+        os.rmdir(tmp)
+
+
+if __name__ == '__main__':
+    main()
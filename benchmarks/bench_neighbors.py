@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""Benchmark of the neighbor search on a solvated peptide.
+
+Puts the peptide of tests/data/peptide.pdb into a cubic box of water and
+compares the C neighbor search used by Atomselection.search_neighbors
+(which fills the neighbors list of every atom) with the cell list of
+pmx.geometry.neighbor_pairs, without and with periodic boundaries.
+
+Usage::
+
+    python benchmarks/bench_neighbors.py [box edge in nm] [cutoff in A]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from pmx import _pmx
+from pmx.model import Model
+from pmx.geometry import neighbor_pairs
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'tests', 'data', 'peptide.pdb')
+
+
+def write_system(fn, edge):
+    """Writes a GRO file of the peptide in the middle of a water box with
+    the given edge (nm)."""
+    pep = Model(DATA)
+    pep.a2nm()
+    xp = np.array([a.x for a in pep.atoms])
+    xp += edge / 2. - xp.mean(axis=0)
+    # water oxygens on a jittered grid of about 33 molecules per nm3
+    n = int(edge / 0.31)
+    rng = np.random.RandomState(7)
+    grid = (np.indices((n, n, n)).reshape(3, -1).T + 0.5) * edge / n
+    ow = grid + rng.uniform(-0.03, 0.03, grid.shape)
+    d = np.sqrt(((ow[:, None] - xp[None]) ** 2).sum(-1)).min(axis=1)
+    ow = ow[d > 0.25]
+    h1 = ow + [0.0957, 0, 0]
+    h2 = ow + [-0.024, 0.0927, 0]
+    with open(fn, 'w') as f:
+        f.write('peptide in water\n%5d\n' % (len(xp) + 3 * len(ow)))
+        k = 0
+        for a, x in zip(pep.atoms, xp):
+            k += 1
+            f.write('%5d%-5s%5s%5d%8.3f%8.3f%8.3f\n'
+                    % (a.resnr, a.resname, a.name, k, x[0], x[1], x[2]))
+        resnr = pep.atoms[-1].resnr
+        for w in range(len(ow)):
+            resnr += 1
+            for name, x in zip(['OW', 'HW1', 'HW2'], [ow[w], h1[w], h2[w]]):
+                k += 1
+                f.write('%5d%-5s%5s%5d%8.3f%8.3f%8.3f\n'
+                        % (resnr % 100000, 'SOL', name, k % 100000,
+                           x[0], x[1], x[2]))
+        f.write('%10.5f%10.5f%10.5f\n' % (edge, edge, edge))
+
+
+def timed(func, *args):
+    """Result and best time of three calls."""
+    best = None
+    for k in range(3):
+        gc.collect()
+        t0 = time.time()
+        res = func(*args)
+        t = time.time() - t0
+        best = t if best is None else min(best, t)
+    return res, best
+
+
+def main():
+    edge = float(sys.argv[1]) if len(sys.argv) > 1 else 5.
+    cutoff = float(sys.argv[2]) if len(sys.argv) > 2 else 5.
+    fd, fn = tempfile.mkstemp(suffix='.gro')
+    os.close(fd)
+    try:
+        write_system(fn, edge)
+        m = Model(fn, scale_coords='A')
+        x = np.array([a.x for a in m.atoms])
+        box = np.array(m.box) * 10.
+
+        _, t_old = timed(_pmx.search_neighbors, m.atoms, cutoff, False)
+        nold = sum(len(a.neighbors) for a in m.atoms) // 2
+        (i, j, d), t_new = timed(neighbor_pairs, x, cutoff)
+        (ip, jp, dp), t_pbc = timed(neighbor_pairs, x, cutoff, box)
+        assert len(i) == nold
+
+        print('atoms: %d  cutoff: %g A' % (len(x), cutoff))
+        print('  _pmx.search_neighbors : %7.3f s  %9d pairs'
+              % (t_old, nold))
+        print('  neighbor_pairs        : %7.3f s  %9d pairs  (%.1fx)'
+              % (t_new, len(i), t_old / t_new))
+        print('  neighbor_pairs, pbc   : %7.3f s  %9d pairs  (%.1fx)'
+              % (t_pbc, len(ip), t_old / t_pbc))
+    finally:
+        os.remove(fn)
+
+
+if __name__ == '__main__':
+    main()
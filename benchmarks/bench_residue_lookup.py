@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""Benchmark of residue and atom lookups while mutating a large protein.
+
+Builds a single chain protein of 5000 residues by repeating the residues of
+tests/data/peptide.pdb and replaces 50 residues spread over the chain, the
+way pmx.alchemy.mutate does: fetch_residue, bb_super (fetchm) and
+replace_residue with the residue number kept. The lookups alone
+(fetch_residue, fetchm, fetch_atoms by id) are timed separately.
+
+Usage::
+
+    python benchmarks/bench_residue_lookup.py [nres] [nmut]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+from pmx.model import Model
+from pmx.molecule import Molecule
+from pmx.atom import Atom
+from pmx.geometry import bb_super
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'tests', 'data', 'peptide.pdb')
+
+
+def write_protein(fn, nres):
+    """Writes a PDB file with nres residues taken in turn from the inner
+    residues of peptide.pdb. Each copy is shifted to continue the chain."""
+    residues = []
+    for line in open(DATA):
+        if line.startswith('ATOM'):
+            resnr = int(line[22:26])
+            if len(residues) < resnr:
+                residues.append([])
+            residues[-1].append(line)
+    residues = residues[1:-1]
+
+    def crd(res, name):
+        line = [l for l in res if l[12:16].strip() == name][0]
+        return [float(line[30+8*k:38+8*k]) for k in range(3)]
+
+    first_n = crd(residues[0], 'N')
+    bond = [n - c for n, c in zip(crd(residues[1], 'N'),
+                                  crd(residues[0], 'C'))]
+    shift = [c + b - n for c, b, n in zip(crd(residues[-1], 'C'), bond,
+                                          first_n)]
+    with open(fn, 'w') as f:
+        atomnr = 1
+        for i in range(nres):
+            ncopy = i // len(residues)
+            for line in residues[i % len(residues)]:
+                x = [float(line[30+8*k:38+8*k]) + ncopy*shift[k]
+                     for k in range(3)]
+                f.write('%s%5d %s%4d%s%8.3f%8.3f%8.3f%s'
+                        % (line[:6], atomnr % 100000, line[12:22], i+1,
+                           line[26:30], x[0], x[1], x[2], line[54:]))
+                atomnr += 1
+        f.write('END\n')
+    return residues
+
+
+def template(lines):
+    """A free standing Molecule made from the PDB lines of a residue."""
+    mol = Molecule()
+    for line in lines:
+        mol.atoms.append(Atom(line=line))
+    mol.resname = mol.atoms[0].resname
+    mol.assign_moltype()
+    for atom in mol.atoms:
+        atom.molecule = mol
+    return mol
+
+
+def lookups(m, resids):
+    for resid in resids:
+        r = m.fetch_residue(resid, chain='A')
+        r.fetchm(['N', 'CA', 'C', 'O', 'H', 'HA', 'CB'])
+        m.fetch_atoms(r.atoms[0].id, how='byid')
+
+
+def mutate(m, resids, new):
+    for resid in resids:
+        r = m.fetch_residue(resid, chain='A')
+        mol = new.copy()
+        bb_super(r, mol)
+        m.replace_residue(r, mol, bKeepResNum=True)
+
+
+def main():
+    nres = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    nmut = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    fd, fn = tempfile.mkstemp(suffix='.pdb')
+    os.close(fd)
+    try:
+        residues = write_protein(fn, nres)
+        m = Model(fn, renumber_residues=False)
+        natoms = len(m.atoms)
+        resids = list(range(2, nres, nres // nmut))[:nmut]
+        new = template(residues[0])
+        gc.collect()
+
+        t0 = time.time()
+        lookups(m, resids)
+        t_lookup = time.time() - t0
+
+        t0 = time.time()
+        mutate(m, resids, new)
+        t_mutate = time.time() - t0
+        assert len(m.residues) == nres
+        for resid in resids:
+            assert m.fetch_residue(resid, chain='A').resname == new.resname
+
+        print('residues: %d  atoms: %d  mutations: %d' % (nres, natoms, nmut))
+        print('  lookups only   : %8.3f s' % t_lookup)
+        print('  mutations      : %8.3f s' % t_mutate)
+    finally:
+        os.remove(fn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""Benchmark of the selection language against list comprehensions.
+
+Selects the water oxygens within 0.6 nm of one water molecule in a GRO
+file of water, once with a list comprehension over the atoms and once with
+Model.select, on a Model and on a lazy Model (whose columns are there
+already). The compiled selection is then evaluated again for a number of
+new coordinate frames, where only the distance criterion is redone.
+
+Usage::
+
+    python benchmarks/bench_selection.py [natoms] [nframes]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from pmx.model import Model
+from pmx.selection import compile_selection
+from bench_structure_read import write_gro
+
+
+def comprehension(m, resid, cutoff):
+    ref = [a for a in m.atoms if a.resnr == resid]
+    return [a for a in m.atoms if a.resname == 'SOL' and a.name == 'OW' and
+            min(a - b for b in ref) <= cutoff]
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    nframes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    resid = natoms // 6
+    text = 'resname SOL and name OW and within 0.6 of resid %d' % resid
+    fd, fn = tempfile.mkstemp(suffix='.gro')
+    os.close(fd)
+    try:
+        write_gro(fn, natoms)
+        m = Model(fn)
+        gc.collect()
+
+        t0 = time.time()
+        ref = comprehension(m, resid, 0.6)
+        t_list = time.time() - t0
+
+        t0 = time.time()
+        sel = m.select(text)
+        t_first = time.time() - t0
+        assert sel.atoms == ref
+
+        lazy = Model(fn, lazy=True)
+        t0 = time.time()
+        idx = lazy.select(text, indices=True)
+        t_lazy = time.time() - t0
+        assert [m.atoms[i] for i in idx] == ref
+
+        sel = compile_selection(text)
+        x = m._coords_array()
+        rng = np.random.RandomState(1)
+        frames = [x + rng.normal(scale=0.01, size=x.shape)
+                  for i in range(nframes)]
+        t0 = time.time()
+        for frame in frames:
+            m.select(sel, x=frame, indices=True)
+        t_frame = (time.time() - t0) / nframes
+
+        print('natoms: %d  selected: %d' % (natoms, len(ref)))
+        print('  list comprehension : %8.3f s' % t_list)
+        print('  Model.select       : %8.3f s  (%.0fx)'
+              % (t_first, t_list / t_first))
+        print('  lazy Model.select  : %8.3f s  (%.0fx)'
+              % (t_lazy, t_list / t_lazy))
+        print('  per frame          : %8.3f s  (%.0fx)'
+              % (t_frame, t_list / t_frame))
+    finally:
+        os.remove(fn)
+
+
+if __name__ == '__main__':
+    main()
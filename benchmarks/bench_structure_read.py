@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Benchmark of reading large structure files into a Model.
+
+Writes a GRO file of water molecules and compares the previous reader (one
+Atom per line followed by make_chains and make_residues, done twice) with
+the column-wise reader of pmx.columns used by Model now. The time of
+pmx.columns.read_gro alone, without making any objects, is reported too.
+
+Usage::
+
+    python benchmarks/bench_structure_read.py [natoms]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+from pmx.model import Model
+from pmx.atom import Atom
+from pmx.columns import read_gro
+
+
+def write_gro(fn, natoms):
+    names = ['OW', 'HW1', 'HW2']
+    with open(fn, 'w') as f:
+        f.write('water\n%5d\n' % natoms)
+        for i in range(natoms):
+            resnr = i // 3 + 1
+            f.write('%5d%-5s%5s%5d%8.3f%8.3f%8.3f\n'
+                    % (resnr % 100000, 'SOL', names[i % 3], (i+1) % 100000,
+                       (i*0.37) % 20., (i*0.71) % 20., (i*0.13) % 20.))
+        f.write('%10.5f%10.5f%10.5f\n' % (20., 20., 20.))
+
+
+def read_lines(fn):
+    """The GRO reading as it was done in Model before."""
+    m = Model()
+    l = open(fn).readlines()
+    m.title = l[0].rstrip()
+    natoms = int(l[1])
+    for line in l[2:2+natoms]:
+        rest = line[20:].split()
+        a = Atom(id=int(line[15:20]), name=line[10:15].strip(),
+                 resname=line[5:9].strip(), resnr=int(line[:5]),
+                 x=[float(rest[0]), float(rest[1]), float(rest[2])],
+                 v=[0, 0, 0], unity='nm')
+        a.get_symbol()
+        m.atoms.append(a)
+    m.unity = 'nm'
+    for i in range(2):
+        m.make_chains()
+        m.make_residues()
+    m.renumber_atoms()
+    m.renumber_residues()
+    return m
+
+
+def timed(func, fn):
+    gc.collect()
+    t0 = time.time()
+    res = func(fn)
+    return res, time.time() - t0
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    fd, fn = tempfile.mkstemp(suffix='.gro')
+    os.close(fd)
+    try:
+        write_gro(fn, natoms)
+        old, t_old = timed(read_lines, fn)
+        del old
+        new, t_new = timed(Model, fn)
+        assert len(new.atoms) == natoms
+        assert len(new.residues) == (natoms + 2) // 3
+        del new
+        _, t_cols = timed(read_gro, fn)
+
+        print('natoms: %d' % natoms)
+        print('  line-by-line reader  : %8.2f s' % t_old)
+        print('  Model (columns)      : %8.2f s  (%.1fx)'
+              % (t_new, t_old/t_new))
+        print('  columns.read_gro     : %8.2f s  (%.1fx)'
+              % (t_cols, t_old/t_cols))
+    finally:
+        os.remove(fn)
+
+
+if __name__ == '__main__':
+    main()
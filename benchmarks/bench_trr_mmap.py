@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""Benchmark of random frame access in trr files.
+
+Picks random frames of a trr trajectory, as done when choosing the starting
+frames of transitions, with pmx.xdrfile.MappedTrr and with XDRFile[i], and
+compares both to reading the whole file with XDRFile.
+
+Usage::
+
+    python benchmarks/bench_trr_mmap.py [natoms] [nframes] [nsample]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from pmx.xdrfile import XDRFile, MappedTrr, index_filename
+
+
+def write_trr(fn, natoms, nframes):
+    rng = np.random.default_rng(42)
+    out = XDRFile(fn, mode='Out', atomNum=natoms)
+    for i in range(0, nframes, 100):
+        x = rng.uniform(0., 50., size=(min(100, nframes - i), natoms, 3))
+        out.write_frames(x, step=np.arange(i, i + len(x)), bTrr=True)
+    out.close()
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    nframes = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    nsample = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    fd, fn = tempfile.mkstemp(suffix='.trr')
+    os.close(fd)
+    try:
+        write_trr(fn, natoms, nframes)
+        picks = np.random.default_rng(1).choice(nframes, nsample,
+                                                replace=False)
+        print('natoms = %d, nframes = %d, sampled frames = %d'
+              % (natoms, nframes, nsample))
+
+        t0 = time.time()
+        traj = XDRFile(fn)
+        ref = [frame.x.copy() for frame in traj]
+        traj.close()
+        t_all = time.time() - t0
+
+        t0 = time.time()
+        traj = XDRFile(fn)
+        xs = [traj[int(i)].x for i in picks]
+        traj.close()
+        t_index = time.time() - t0
+        assert all(np.array_equal(x, ref[i]) for x, i in zip(xs, picks))
+
+        t0 = time.time()
+        trr = MappedTrr(fn)
+        xs = [trr.get_x(int(i)) for i in picks]
+        trr.close()
+        t_mmap = time.time() - t0
+        assert all(np.array_equal(x, ref[i]) for x, i in zip(xs, picks))
+
+        print('  read all frames     : %8.2f ms' % (t_all*1e3))
+        print('  XDRFile[i]          : %8.2f ms  (%.1fx)'
+              % (t_index*1e3, t_all/t_index))
+        print('  MappedTrr.get_x(i)  : %8.2f ms  (%.1fx)'
+              % (t_mmap*1e3, t_all/t_mmap))
+    finally:
+        os.remove(fn)
+        if os.path.isfile(index_filename(fn)):
+            os.remove(index_filename(fn))
+
+
+if __name__ == '__main__':
+    main()
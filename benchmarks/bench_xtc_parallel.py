@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""Scaling benchmark of pmx.xdrfile.read_frames_parallel.
+
+Times decoding all frames of an xtc file into one array with 1, 2, 4 and 8
+worker processes, compared to plain iteration with XDRFile.
+
+Usage::
+
+    python benchmarks/bench_xtc_parallel.py [natoms] [nframes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from pmx.xdrfile import XDRFile, index_filename, read_frames_parallel
+
+
+def write_xtc(fn, natoms, nframes):
+    rng = np.random.default_rng(42)
+    out = XDRFile(fn, mode='Out', atomNum=natoms)
+    box = [[50., 0., 0.], [0., 50., 0.], [0., 0., 50.]]
+    for i in range(nframes):
+        x = rng.uniform(0., 500., size=3*natoms).tolist()
+        out.write_xtc_frame(step=i, time=float(i), box=box, x=x)
+    out.close()
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    nframes = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    fd, fn = tempfile.mkstemp(suffix='.xtc')
+    os.close(fd)
+    try:
+        write_xtc(fn, natoms, nframes)
+        print('natoms = %d, nframes = %d, cores = %s'
+              % (natoms, nframes, os.cpu_count()))
+
+        t0 = time.time()
+        traj = XDRFile(fn)
+        ref = np.array([frame.x.copy() for frame in traj])
+        traj.close()
+        t1 = time.time() - t0
+        print('%8s %10s %10s' % ('workers', 'time [s]', 'speedup'))
+        print('%8s %10.2f %10s' % ('iter', t1, ''))
+        for nproc in [1, 2, 4, 8]:
+            t0 = time.time()
+            x = read_frames_parallel(fn, nproc=nproc)
+            t = time.time() - t0
+            assert np.array_equal(x, ref)
+            print('%8d %10.2f %9.1fx' % (nproc, t, t1/t))
+    finally:
+        os.remove(fn)
+        if os.path.isfile(index_filename(fn)):
+            os.remove(index_filename(fn))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""Benchmark of xtc reading with pmx.xdrfile.XDRFile.
+
+Writes a random xtc trajectory and compares the ctypes ("Std") and the NumPy
+("NumPy", the default) read modes, both for iterating over the frames only
+and for updating the coordinates of an atom selection with Frame.update.
+
+Usage::
+
+    python benchmarks/bench_xtc_read.py [natoms] [nframes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from pmx.xdrfile import XDRFile
+from pmx.atom import Atom
+from pmx.atomselection import Atomselection
+
+
+def write_xtc(fn, natoms, nframes):
+    rng = np.random.default_rng(42)
+    out = XDRFile(fn, mode='Out', atomNum=natoms)
+    box = [[50., 0., 0.], [0., 50., 0.], [0., 0., 50.]]
+    for i in range(nframes):
+        x = rng.uniform(0., 500., size=3*natoms).tolist()
+        out.write_xtc_frame(step=i, time=float(i), box=box, x=x)
+    out.close()
+
+
+def read(fn, mode, sel=None):
+    t0 = time.time()
+    traj = XDRFile(fn, mode=mode)
+    for frame in traj:
+        if sel is not None:
+            frame.update(sel)
+    traj.close()
+    return time.time() - t0
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    nframes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    fd, fn = tempfile.mkstemp(suffix='.xtc')
+    os.close(fd)
+    try:
+        write_xtc(fn, natoms, nframes)
+        sel = Atomselection(atoms=[Atom() for _ in range(natoms)])
+        sel.box = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
+
+        print('natoms = %d, nframes = %d' % (natoms, nframes))
+        print('%-22s %12s %12s' % ('', 'Std [ms]', 'NumPy [ms]'))
+        for label, s in [('read frames', None), ('read + update', sel)]:
+            t_std = min(read(fn, 'Std', s) for _ in range(3)) / nframes
+            t_np = min(read(fn, 'NumPy', s) for _ in range(3)) / nframes
+            print('%-22s %12.2f %12.2f  (%.1fx)' % (label, t_std*1e3,
+                                                    t_np*1e3, t_std/t_np))
+    finally:
+        os.remove(fn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Benchmark of random access to xtc frames with pmx.xdrfile.XDRFile.
+
+Times building the frame offset index by scanning the frame headers, loading
+it again from the sidecar file, and reading the last frame with traj[-1]
+compared to iterating over the whole trajectory to get there.
+
+Usage::
+
+    python benchmarks/bench_xtc_seek.py [natoms] [nframes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from pmx.xdrfile import XDRFile, index_filename
+
+
+def write_xtc(fn, natoms, nframes):
+    rng = np.random.default_rng(42)
+    out = XDRFile(fn, mode='Out', atomNum=natoms)
+    box = [[50., 0., 0.], [0., 50., 0.], [0., 0., 50.]]
+    for i in range(nframes):
+        x = rng.uniform(0., 500., size=3*natoms).tolist()
+        out.write_xtc_frame(step=i, time=float(i), box=box, x=x)
+    out.close()
+
+
+def timed(func):
+    t0 = time.time()
+    res = func()
+    return time.time() - t0, res
+
+
+def last_by_iteration(fn):
+    traj = XDRFile(fn)
+    for frame in traj:
+        x = frame.x.copy()
+    traj.close()
+    return x
+
+
+def last_by_index(fn):
+    traj = XDRFile(fn)
+    x = traj[-1].x
+    traj.close()
+    return x
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    nframes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    fd, fn = tempfile.mkstemp(suffix='.xtc')
+    os.close(fd)
+    try:
+        write_xtc(fn, natoms, nframes)
+        print('natoms = %d, nframes = %d' % (natoms, nframes))
+
+        t_iter, x_ref = timed(lambda: last_by_iteration(fn))
+        t_scan, x = timed(lambda: last_by_index(fn))
+        assert np.array_equal(x, x_ref)
+        t_load, x = timed(lambda: last_by_index(fn))
+        assert np.array_equal(x, x_ref)
+
+        print('  last frame by iteration      : %8.2f ms' % (t_iter*1e3))
+        print('  traj[-1], scan + save index  : %8.2f ms  (%.1fx)'
+              % (t_scan*1e3, t_iter/t_scan))
+        print('  traj[-1], index from sidecar : %8.2f ms  (%.1fx)'
+              % (t_load*1e3, t_iter/t_load))
+    finally:
+        os.remove(fn)
+        if os.path.isfile(index_filename(fn)):
+            os.remove(index_filename(fn))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""Benchmark of strided xtc reading with pmx.xdrfile.XDRFile.frames.
+
+Compares reading every 10th frame, which jumps over the compressed payload
+of the other frames, with reading (decompressing) all frames.
+
+Usage::
+
+    python benchmarks/bench_xtc_stride.py [natoms] [nframes] [step]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from pmx.xdrfile import XDRFile, index_filename
+
+
+def write_xtc(fn, natoms, nframes):
+    rng = np.random.default_rng(42)
+    out = XDRFile(fn, mode='Out', atomNum=natoms)
+    box = [[50., 0., 0.], [0., 50., 0.], [0., 0., 50.]]
+    for i in range(nframes):
+        x = rng.uniform(0., 500., size=3*natoms).tolist()
+        out.write_xtc_frame(step=i, time=float(i), box=box, x=x)
+    out.close()
+
+
+def read(fn, **kwargs):
+    t0 = time.time()
+    traj = XDRFile(fn)
+    steps = [frame.step for frame in traj.frames(**kwargs)]
+    traj.close()
+    return time.time() - t0, steps
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    nframes = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    step = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    fd, fn = tempfile.mkstemp(suffix='.xtc')
+    os.close(fd)
+    try:
+        write_xtc(fn, natoms, nframes)
+        print('natoms = %d, nframes = %d, step = %d' % (natoms, nframes, step))
+
+        t_all, steps = read(fn)
+        t_scan, strided = read(fn, step=step)
+        assert strided == steps[::step]
+        t_load, strided = read(fn, step=step)
+        assert strided == steps[::step]
+
+        print('  all frames                    : %8.2f ms' % (t_all*1e3))
+        print('  every %2dth, index built       : %8.2f ms  (%.1fx)'
+              % (step, t_scan*1e3, t_all/t_scan))
+        print('  every %2dth, index from sidecar: %8.2f ms  (%.1fx)'
+              % (step, t_load*1e3, t_all/t_load))
+    finally:
+        os.remove(fn)
+        if os.path.isfile(index_filename(fn)):
+            os.remove(index_filename(fn))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""Benchmark of xtc writing with pmx.xdrfile.XDRFile.
+
+Compares the previous per-frame writer (a new out-mode Frame per call, the
+coordinates copied and scaled one by one into a ctypes array) with
+XDRFile.write_frames, which takes all frames as one NumPy array.
+
+Usage::
+
+    python benchmarks/bench_xtc_write.py [natoms] [nframes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from ctypes import c_int, c_float
+import numpy as np
+from pmx.xdrfile import XDRFile, Frame
+
+
+def write_old(fn, x, box):
+    """The frame by frame writing as XDRFile.write_xtc_frame did before."""
+    out = XDRFile(fn, mode='Out', atomNum=x.shape[1])
+    for i, xi in enumerate(x):
+        f = Frame(out.natoms, out.mode, box=box, x=xi.ravel().tolist(),
+                  units='A')
+        out.xdr.write_xtc(out.xd, out.natoms, c_int(i), c_float(i), f.box,
+                          f.x, c_float(1000.))
+    out.close()
+
+
+def write_new(fn, x, box):
+    out = XDRFile(fn, mode='Out', atomNum=x.shape[1])
+    out.write_frames(x, box=box)
+    out.close()
+
+
+def main():
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    nframes = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rng = np.random.default_rng(42)
+    x = rng.uniform(0., 500., size=(nframes, natoms, 3))
+    box = [[50., 0., 0.], [0., 50., 0.], [0., 0., 50.]]
+    fd, fn = tempfile.mkstemp(suffix='.xtc')
+    os.close(fd)
+    try:
+        t0 = time.time()
+        write_old(fn, x, box)
+        t_old = time.time() - t0
+        with open(fn, 'rb') as f:
+            ref = f.read()
+        t0 = time.time()
+        write_new(fn, x, box)
+        t_new = time.time() - t0
+        with open(fn, 'rb') as f:
+            assert f.read() == ref
+
+        print('natoms = %d, nframes = %d' % (natoms, nframes))
+        print('  frame by frame : %8.2f ms/frame' % (t_old/nframes*1e3))
+        print('  write_frames   : %8.2f ms/frame  (%.1fx)'
+              % (t_new/nframes*1e3, t_old/t_new))
+    finally:
+        os.remove(fn)
+
+
+if __name__ == '__main__':
+    main()
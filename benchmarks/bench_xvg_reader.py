@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""Benchmark of the dhdl.xvg reader used by pmx.analysis.
+
+Compares the previous line-by-line parsing (readlines, comment filtering and
+``float(x.split()[1])`` per line) with pmx.parser.read_xvg_data on a 50k-line
+file, and times the full integrate_dgdl call.
+
+Usage::
+
+    python benchmarks/bench_xvg_reader.py [nlines]
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+import numpy as np
+from pmx.parser import read_xvg_data
+from pmx.analysis import integrate_dgdl
+
+
+def read_lines(fn):
+    """The dgdl parsing as it was done in integrate_dgdl before."""
+    lines = open(fn, encoding="ISO-8859-1").readlines()
+    lines = [l for l in lines if l[0] not in '#@&']
+    return list(map(lambda x: float(x.split()[1]), lines))
+
+
+def write_xvg(fn, nlines):
+    rng = np.random.default_rng(42)
+    t = np.linspace(0., 50., nlines)
+    dgdl = rng.normal(loc=100., scale=50., size=nlines)
+    with open(fn, 'w') as f:
+        f.write('# This file was created by bench_xvg_reader.py\n'
+                '@    title "dH/d\\xl\\f{}"\n'
+                '@    xaxis  label "Time (ps)"\n'
+                '@TYPE xy\n')
+        np.savetxt(f, np.column_stack([t, dgdl]), fmt='%.4f %.5f')
+
+
+def main():
+    nlines = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    fd, fn = tempfile.mkstemp(suffix='.xvg')
+    os.close(fd)
+    try:
+        write_xvg(fn, nlines)
+        assert np.array_equal(read_lines(fn), read_xvg_data(fn, usecols=1))
+
+        t_old = min(timeit.repeat(lambda: read_lines(fn), number=5,
+                                  repeat=3)) / 5
+        t_new = min(timeit.repeat(lambda: read_xvg_data(fn, usecols=1),
+                                  number=5, repeat=3)) / 5
+        t_int = min(timeit.repeat(lambda: integrate_dgdl(fn), number=5,
+                                  repeat=3)) / 5
+
+        print('lines: %d' % nlines)
+        print('  line-by-line parsing : %8.2f ms' % (t_old*1e3))
+        print('  read_xvg_data        : %8.2f ms  (%.1fx)'
+              % (t_new*1e3, t_old/t_new))
+        print('  integrate_dgdl       : %8.2f ms' % (t_int*1e3))
+    finally:
+        os.remove(fn)
+
+
+if __name__ == '__main__':
+    main()
@@ -37,15 +37,44 @@ has also become a library for the setup and analysis of alchemical free energy
 calculations in Gromacs."""
 
 
+import importlib
 from .atom import Atom
 from .molecule import Molecule
 from .chain import Chain
 from .model import Model
 from .forcefield import Topology
-from .estimators import BAR, Crooks, Jarz
-from .analysis import *
-from .alchemy import *
-from . import gmx
+
+# The free energy and alchemy modules pull in scipy and matplotlib, which
+# take much longer to import than the rest of pmx. Their names are only
+# imported from the submodules on first access (PEP 562), so that e.g.
+# "pmx mutate" does not pay for them.
+_LAZY_NAMES = {
+    'BAR': 'estimators', 'Crooks': 'estimators', 'Jarz': 'estimators',
+    'read_dgdl_files': 'analysis', 'integrate_dgdl': 'analysis',
+    'ks_norm_test': 'analysis', 'plot_work_dist': 'analysis',
+    'mutate': 'alchemy', 'gen_hybrid_top': 'alchemy',
+    'write_split_top': 'alchemy', 'AbsRestraints': 'alchemy',
+}
+_LAZY_MODULES = ['analysis', 'estimators', 'alchemy', 'gmx']
+
+__all__ = ['Atom', 'Molecule', 'Chain', 'Model', 'Topology', 'gmx'] + \
+    list(_LAZY_NAMES)
+
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        module = importlib.import_module('.' + _LAZY_NAMES[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    if name in _LAZY_MODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_LAZY_MODULES))
+
 
 from ._version import get_versions
 __version__ = get_versions()['version']
@@ -1,17 +1,40 @@
 import sys
 import numpy as np
-import subprocess
 import os
 from os import path
+from glob import glob
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from scipy.integrate import simps
-from matplotlib import pyplot as plt
 from copy import deepcopy
 from scipy.special import erf
-from .utils import data2gauss, gauss_func
+from .utils import data2gauss, gauss_func, natural_sort
+from .parser import read_xvg_data
 
 __all__ = ['read_dgdl_files', 'integrate_dgdl',
            'ks_norm_test', 'plot_work_dist']
 
+def _read_last_line(fn, blocksize=4096):
+    '''Returns the last line of a file (like ``tail -n 1``) by reading
+    backwards from its end, without reading the whole file.'''
+    with open(fn, 'rb') as fp:
+        fp.seek(0, os.SEEK_END)
+        end = fp.tell()
+        pos = end
+        data = b''
+        while pos > 0:
+            step = min(blocksize, pos)
+            pos -= step
+            fp.seek(pos)
+            data = fp.read(step) + data
+            # a newline other than the one terminating the file
+            if data.rfind(b'\n', 0, len(data) - 1) != -1:
+                break
+    if data.endswith(b'\n'):
+        data = data[:-1]
+    return data[data.rfind(b'\n') + 1:]
+
+
 def find_longest_dgdl_file(lst):
     '''Takes a list of dgdl.xvg files and returns the longest one.
     The length is measured by the timestamp of the last recorded datapoint.
@@ -34,10 +57,8 @@ def find_longest_dgdl_file(lst):
     t_list=[0.0]*len(lst)
     for idx in range(len(lst)):
         if(os.path.exists(lst[idx])):
-            result = subprocess.run(['tail', '-n', '1', lst[idx]],\
-                                    stdout=subprocess.PIPE)
             try:
-                s=result.stdout.split()
+                s=_read_last_line(lst[idx]).split()
                 t=float(s[0])
                 t_list[idx] = t
                 if t > last_t:
@@ -51,8 +72,110 @@ def find_longest_dgdl_file(lst):
     return(longest_idx, t_list)
 
 
+class WorkCache(object):
+    '''On-disk cache of integrated work values.
+
+    Maps a dgdl.xvg file, identified by its path, size and modification time,
+    together with the integration settings (lambda0, invert_values, sigmoid),
+    to its integrated work value and number of data points. A file that is
+    modified or replaced gets a new key, so stale values are never returned.
+    The cache is stored as a ``.npz`` file.
+
+    Parameters
+    ----------
+    fn : str
+        path to the cache file. It is created by :meth:`save` if it does not
+        exist yet.
+
+    Examples
+    --------
+    >>> cache = WorkCache('integ_cache.npz')
+    >>> w = read_dgdl_files(files, lambda0=0, cache=cache)
+    '''
+
+    def __init__(self, fn):
+        self.fn = fn
+        self._data = {}
+        self._modified = False
+        if path.isfile(fn):
+            with np.load(fn, allow_pickle=False) as npz:
+                for key, w, ndata in zip(npz['keys'], npz['w'], npz['ndata']):
+                    self._data[str(key)] = (float(w), int(ndata))
+
+    def __len__(self):
+        return len(self._data)
+
+    @staticmethod
+    def key(fn, lambda0=0, invert_values=False, sigmoid=0.0):
+        '''Returns the cache key of a file and the integration settings, or
+        None if the file does not exist.'''
+        try:
+            st = os.stat(fn)
+        except OSError:
+            return None
+        return '%s|%d|%d|%d|%d|%r' % (path.abspath(fn), st.st_size,
+                                      st.st_mtime_ns, lambda0,
+                                      bool(invert_values), float(sigmoid))
+
+    def get(self, key):
+        '''Returns the cached (w, ndata) tuple for key, or None.'''
+        if key is None:
+            return None
+        return self._data.get(key)
+
+    def set(self, key, w, ndata):
+        if key is None:
+            return
+        self._data[key] = (float(w), int(ndata))
+        self._modified = True
+
+    def save(self):
+        '''Writes the cache to disk if it has been modified.'''
+        if not self._modified:
+            return
+        keys = sorted(self._data)
+        tmp = self.fn + '.tmp'
+        with open(tmp, 'wb') as fp:
+            np.savez(fp, keys=np.array(keys, dtype=str),
+                     w=np.array([self._data[k][0] for k in keys]),
+                     ndata=np.array([self._data[k][1] for k in keys],
+                                    dtype=np.int64))
+        # replace the old cache only once the new one is complete
+        os.replace(tmp, self.fn)
+        self._modified = False
+
+
+def _integrate_dgdl_files(fns, lambda0, invert_values, sigmoid, nproc=1,
+                          cache=None, stderr=False):
+    '''Returns a list of (work, ndata) tuples, one per file in fns, taking
+    the values from the cache where possible and integrating the other files
+    in nproc processes. stderr is passed on to integrate_dgdl.'''
+    keys = [None] * len(fns)
+    res = [None] * len(fns)
+    if cache is not None:
+        keys = [cache.key(f, lambda0, invert_values, sigmoid)
+                for f in fns]
+        res = [cache.get(k) for k in keys]
+    todo = [i for i, r in enumerate(res) if r is None]
+    integrate = partial(integrate_dgdl, lambda0=lambda0,
+                        invert_values=invert_values, sigmoid=sigmoid,
+                        stderr=stderr)
+    todo_fns = [fns[i] for i in todo]
+    if nproc > 1 and len(todo) > 1:
+        chunksize = max(1, len(todo) // (4*nproc))
+        with ProcessPoolExecutor(max_workers=nproc) as pool:
+            new = list(pool.map(integrate, todo_fns, chunksize=chunksize))
+    else:
+        new = list(map(integrate, todo_fns))
+    for i, (w, n) in zip(todo, new):
+        res[i] = (w, n)
+        if cache is not None and w is not None:
+            cache.set(keys[i], w, n)
+    return res
+
+
 def read_dgdl_files(lst, lambda0=0, invert_values=False, verbose=True,\
-                    sigmoid=0.0):
+                    sigmoid=0.0, nproc=1, cache=None):
     '''Takes a list of dgdl.xvg files and returns the integrated work values.
 
     Parameters
@@ -63,6 +186,15 @@ def read_dgdl_files(lst, lambda0=0, invert_values=False, verbose=True,\
         whether the simulations started from lambda 0 or 1. Default is 0.
     invert_values : bool
         whether to invert the sign of the returned work value.
+    nproc : int, optional
+        number of processes used to read and integrate the files. The order
+        of the returned work values, and which files are skipped, do not
+        depend on it. Default is 1.
+    cache : str or WorkCache, optional
+        cache of integrated work values (see :class:`WorkCache`), or the path
+        of its file. Only files that are not in the cache, or have been
+        modified since, are read and integrated; the cache is saved before
+        returning. Default is None (no caching).
 
     Returns
     -------
@@ -75,7 +207,10 @@ def read_dgdl_files(lst, lambda0=0, invert_values=False, verbose=True,\
 
     # check lambda0 is either 0 or 1
     assert lambda0 in [0, 1]
-    
+
+    if isinstance(cache, str):
+        cache = WorkCache(cache)
+
     #Start with first full-length (longest) simultaion.
     #Everything before is too short.
     good=False
@@ -87,34 +222,162 @@ def read_dgdl_files(lst, lambda0=0, invert_values=False, verbose=True,\
         if(t_list[idx] >= last_t): #only check full length simulations
             try:
                 _check_dgdl(lst[idx], lambda0, verbose=verbose)
-                first_w, ndata = integrate_dgdl(lst[idx], lambda0=lambda0,\
-                                            invert_values=invert_values,\
-                                            sigmoid=sigmoid)
-                good=True
+                first_w, ndata = _integrate_dgdl_files([lst[idx]], lambda0,
+                                    invert_values, sigmoid, cache=cache)[0]
+                good = first_w is not None
+                if not good:
+                    idx+=1
             except:
                 print(' !! Error in checking %s' % (lst[idx]))
                 good=False
                 idx+=1
+        else:
+            idx+=1
     if(not good):
         raise RuntimeError("No good dgdl files provided.")
 
+    rest = lst[idx+1:]
+    results = _integrate_dgdl_files(rest, lambda0, invert_values, sigmoid,
+                                    nproc=nproc, cache=cache)
+    if cache is not None:
+        cache.save()
+
+    # results are in the order of the input files
     w_list = [first_w]
-    for idx, f in enumerate(lst[idx+1:]):
+    for f, (w, n) in zip(rest, results):
         if verbose is True:
             sys.stdout.write('\r    Reading %s' % f)
             sys.stdout.flush()
-
-        w, _ = integrate_dgdl(f, ndata=ndata, lambda0=lambda0,
-                              invert_values=invert_values, sigmoid=sigmoid)
-        if w is not None:
-            w_list.append(w)
+        if w is None:
+            continue
+        if n != ndata:
+            print(' !! Skipping %s ( read %d data points, should be %d )'
+                  % (f, n, ndata))
+            continue
+        w_list.append(w)
 
     if verbose is True:
         print('\n')
     return w_list
 
 
-def integrate_dgdl(fn, ndata=-1, lambda0=0, invert_values=False, sigmoid=0.0):
+class DgdlWatcher(object):
+    '''Keeps track of the dgdl.xvg files of one direction of a transition
+    campaign that is still running.
+
+    Every call of :meth:`poll` looks for files matching the patterns, and
+    reads and integrates only those that are new or have changed since the
+    previous poll. A file is accepted as completed once it has as many data
+    points as the longest file found so far; the work values of accepted
+    files are kept and their files are not read again.
+
+    Parameters
+    ----------
+    patterns : list
+        file names or glob patterns of the dgdl.xvg files.
+    lambda0 : [0,1]
+        whether the simulations started from lambda 0 or 1. Default is 0.
+    invert_values : bool
+        whether to invert the sign of the work values.
+    sigmoid : float, optional
+        sigmoidal lambda path, see :func:`integrate_dgdl`.
+    nproc : int, optional
+        number of processes used to integrate new files. Default is 1.
+    cache : WorkCache, optional
+        cache of integrated work values, see :class:`WorkCache`.
+
+    Attributes
+    ----------
+    ndata : int
+        number of data points of a completed file.
+    accepted : list
+        completed files, in the order they were accepted.
+    work : list
+        the work values of the accepted files.
+    '''
+
+    def __init__(self, patterns, lambda0=0, invert_values=False, sigmoid=0.0,
+                 nproc=1, cache=None):
+        assert lambda0 in [0, 1]
+        self.patterns = list(patterns)
+        self.lambda0 = lambda0
+        self.invert_values = invert_values
+        self.sigmoid = sigmoid
+        self.nproc = nproc
+        self.cache = cache
+        self.ndata = 0
+        self.accepted = []
+        self.work = []
+        self._done = set()
+        self._seen = {}     # file -> (key at last read, work, ndata)
+
+    def files(self):
+        '''Returns the naturally sorted files matching the patterns.'''
+        found = set()
+        for p in self.patterns:
+            found.update(glob(p))
+        return natural_sort(found)
+
+    def poll(self):
+        '''Picks up new and changed files.
+
+        Returns
+        -------
+        work : list
+            work values accepted in this poll. If ``reset`` is True, all
+            accepted work values instead.
+        reset : bool
+            whether a longer file was found, so that files accepted before
+            turned out to be incomplete and were dropped.
+        '''
+        todo = []
+        for fn in self.files():
+            if fn in self._done:
+                continue
+            key = WorkCache.key(fn, self.lambda0, self.invert_values,
+                                self.sigmoid)
+            if key is None or (fn in self._seen and
+                               self._seen[fn][0] == key):
+                continue
+            todo.append((fn, key))
+
+        # stdout may carry the status of a watch, see analyze_dhdl
+        results = _integrate_dgdl_files([fn for fn, _ in todo], self.lambda0,
+                                        self.invert_values, self.sigmoid,
+                                        nproc=self.nproc, cache=self.cache,
+                                        stderr=True)
+        if self.cache is not None:
+            self.cache.save()
+        for (fn, key), (w, n) in zip(todo, results):
+            self._seen[fn] = (key, w, n)
+
+        ndata = max([n for _, w, n in self._seen.values() if w is not None]
+                    + [self.ndata])
+        reset = ndata > self.ndata
+        if reset is True:
+            self.ndata = ndata
+            self.accepted = []
+            self.work = []
+            self._done = set()
+            candidates = self.files()
+        else:
+            candidates = [fn for fn, _ in todo]
+
+        new = []
+        for fn in candidates:
+            if fn in self._done or fn not in self._seen:
+                continue
+            _, w, n = self._seen[fn]
+            if w is not None and n == self.ndata:
+                self._done.add(fn)
+                self.accepted.append(fn)
+                self.work.append(w)
+                new.append(w)
+        return new, reset
+
+
+def integrate_dgdl(fn, ndata=-1, lambda0=0, invert_values=False, sigmoid=0.0,
+                   stderr=False):
     '''Integrates the data in a dgdl.xvg file.
 
     Parameters
@@ -127,6 +390,9 @@ def integrate_dgdl(fn, ndata=-1, lambda0=0, invert_values=False, sigmoid=0.0):
         whether the simulations started from lambda 0 or 1. Default is 0.
     invert_values : bool
         whether to invert the sign of the returned work value.
+    stderr : bool, optional
+        whether to print the messages about files that cannot be used to
+        stderr instead of stdout. Default is False.
 
     Returns
     -------
@@ -139,28 +405,24 @@ def integrate_dgdl(fn, ndata=-1, lambda0=0, invert_values=False, sigmoid=0.0):
     # check lambda0 is either 0 or 1
     assert lambda0 in [0, 1]
 
-    lines = open(fn, encoding="ISO-8859-1").readlines()
-    if not lines:
-        return None, None
-
     # extract dgdl datapoints into r
     # TODO: we removed the check for file integrity. We could have an
     # optional files integrity check before calling this integration func
-
-    lines = [l for l in lines if l[0] not in '#@&']
-    r=[]
+    fp = sys.stderr if stderr else sys.stdout
     try:
-        r = list(map(lambda x: float(x.split()[1]), lines))
-    except:
-        print(' !! Error in reading %s' % (fn))
+        r = read_xvg_data(fn, usecols=1)
+    except ValueError:
+        print(' !! Error in reading %s' % (fn), file=fp)
+        return None, None
+    if len(r) == 0:
         return None, None
 
     if ndata != -1 and len(r) != ndata:
         try:
             print(' !! Skipping %s ( read %d data points, should be %d )'
-                  % (fn, len(r), ndata))
+                  % (fn, len(r), ndata), file=fp)
         except:
-            print(' !! Skipping %s ' % (fn))
+            print(' !! Skipping %s ' % (fn), file=fp)
         return None, None
     # convert time to lambda
     ndata = len(r)
@@ -171,21 +433,19 @@ def integrate_dgdl(fn, ndata=-1, lambda0=0, invert_values=False, sigmoid=0.0):
     # arrays for the integration
     # --------------------------
     # array of lambda values
-    x = [lambda0+i*dlambda for i, dgdl in enumerate(r)]
+    x = lambda0 + np.arange(ndata)*dlambda
 ##### VG VG VG ####
     if sigmoid != 0.0:
-        x = [1.0/(1.0+np.exp( -1.0*(lambda0+i*dlambda-0.5)*sigmoid ) ) for i, dgdl in enumerate(r)]
+        x = 1.0/(1.0+np.exp( -1.0*(x-0.5)*sigmoid ) )
         x[0] = lambda0
         x[-1] = 1.0-lambda0
-#    for i in x:
-#        print(i)
 ##### VG VG VG ####
     # array of dgdl
     y = r
 
     if lambda0 == 1:
-        x.reverse()
-        y.reverse()
+        x = x[::-1]
+        y = y[::-1]
 
     if invert_values is True:
         integr = simps(y, x) * (-1)
@@ -339,6 +599,9 @@ def plot_work_dist(wf, wr, fname='Wdist.png', nbins=20, dG=None, dGerr=None,
         y = np.convolve(w/w.sum(), s, mode='same')
         return y[window_len-1:-window_len+1]
 
+    # imported here as pyplot is slow to import and only needed for plots
+    from matplotlib import pyplot as plt
+
     plt.figure(figsize=(8, 6))
     x1 = list(range(len(wf)))
     x2 = list(range(len(wr)))
@@ -415,13 +678,9 @@ def plot_work_dist(wf, wr, fname='Wdist.png', nbins=20, dG=None, dGerr=None,
 
 def _check_dgdl(fn, lambda0, verbose=True):
     '''Prints some info about a dgdl.xvg file.'''
-    lines = open(fn, encoding="ISO-8859-1").readlines()
-    if not lines:
+    r = read_xvg_data(fn)
+    if len(r) == 0:
         return None
-    r = []
-    for line in lines:
-        if line[0] not in '#@&':
-            r.append([float(x) for x in line.split()])
     ndata = len(r)
     dlambda = 1./float(ndata)
     if lambda0 == 1:
@@ -56,132 +56,163 @@ from . import library
 from . import _pmx as _p
 from .library import pdb_format, pdb_format2
 
-__all__ = ['Atom']
-
-
-class Atom:
-    """Atom Class.
-
-    Parameters
-    ----------
-    line : str, optional
-        input line in PDB format. Default is None.
-    mol2line : str, optional
-        input line in MOL2 format.  Default is None.
-
-
-    Attributes
-    ----------
-    id : int
-        atom id
-    name : str
-        atom name
-    resname : str
-        name of residue atom is part of
-    chain_id : str
-        ID of the chain atom belongs to
-    x : array
-        atom coordinates
-    occ : float
-        occupancy
-    bfac : float
-        B-factor
-    symbol : str
-        chemical element of the atom
-    unity : str
-        unit of the coordinates, either 'A' or 'nm'. Default is 'A'.
-    """
-    def __init__(self, line=None, mol2line=None, **kwargs):
-
-        self.race = 'ATOM  '
-        self.id = 0
-        self.orig_id = 0
-        self.code = 0
-        self.name = ''
-        self.altloc = ''
-        self.resname = ''
-        self.chain_id = ' '
-        self.x = [0, 0, 0]
-        self.occ = 1.
-        self.bfac = 0.
-        self.vdw = 0.
-        self.vdw14 = 0.
-        self.atype = ''
-        self.hyb = ''
-        self.symbol = ''
-        self.bonds = []
-        self.b13 = []
-        self.b14 = []
-        self.connected = []
-        self.neighbors = []
-        self.order = 0
-        self.boxid = 0
-        self.molecule = None
-        self.chain = None
-        self.model = None
-        self.cgnr = 0.
-        self.v = [0, 0, 0]
-        self.f = []
-        self.m = 0.
-        self.q = 0.
-        self.mB = 0.
-        self.qB = 0.
-        self.type = ''
-        self.typeB = ''
-        self.resnr = 0
-        self.grpnr = ' '
-        self.atomtype = ''
-        self.atomtypeB = ''
-        self.ptype = ''
-        self.long_name = ''
-        self.unity = 'A'
-        for key, val in kwargs.items():
-            setattr(self, key, val)
-        if line is not None:
-            self.readPDBString(line)
-        if mol2line is not None:
-            self.read_mol2_line(mol2line)
-
-    def __str__(self):
-        """Prints the Atom in PDB format"""
-        if self.unity == 'nm':
-            coords = list(map(lambda x: x*10, self.x))
+__all__ = ['Atom', 'SlotAtom', 'pdb_string']
+
+
+def pdb_string(race, id, name, altloc, resname, chain_id, resnr, x, occ,
+               bfac, symbol, unity='A'):
+    """Formats the data of an atom as a PDB ATOM/HETATM record (see
+    Atom.__str__)."""
+    if unity == 'nm':
+        coords = [c*10 for c in x]
+    else:
+        coords = x
+    if len(resname) < 4:
+        resname = resname+' '  # [0:3]
+    if len(name) == 1:
+        name = ' '+name+'  '
+    elif len(name) == 2:
+        if name[0].isdigit():
+            name = name+'  '
         else:
-            coords = self.x
-        if len(self.resname) < 4:
-            resname = self.resname+' '  # [0:3]
+            name = ' '+name+' '
+    elif len(name) == 3:
+        if name[0].isdigit():
+            name = name+' '
         else:
-            resname = self.resname
-        if len(self.name) == 1:
-            name = ' '+self.name+'  '
-        elif len(self.name) == 2:
-            if self.name[0].isdigit():
-                name = self.name+'  '
-            else:
-                name = ' '+self.name+' '
-        elif len(self.name) == 3:
-            if self.name[0].isdigit():
-                name = self.name+' '
-            else:
-                name = ' '+self.name
+            name = ' '+name
+    idx = id % 100000
+    try:
+        resid = resnr % 10000
+    except:
+        resid = str(resnr)
+    try:
+        s = pdb_format % (race, idx, name, altloc,
+                          resname, chain_id, resid,
+                          coords[0], coords[1],
+                          coords[2], occ, bfac, symbol)
+    except:
+        s = pdb_format2 % (race, idx, name, altloc,
+                           resname, chain_id, resid,
+                           coords[0], coords[1], coords[2],
+                           occ, bfac)
+    return s
+
+
+# the lookup indexes of Atomselection (see Atomselection._lookup) that
+# depend on the attributes atoms and residues are looked up and selected
+# by ('resid' for the residue ID)
+_key_indexes = {'id': ('id', 'columns'), 'name': ('name', 'columns'),
+                'resname': ('columns',), 'chain_id': ('columns',),
+                'resnr': ('columns',), 'symbol': ('columns',),
+                'resid': ('resid',)}
+
+# values of _indexed: the object is only in lookup indexes of the Molecule,
+# Chain and Model it belongs to, which a change of its attributes drops
+# right away, or also in those of other selections. The changes of the
+# latter are counted per attribute in _key_changes, and the indexes of
+# other selections made before the last change are not used anymore.
+_OWNED, _SHARED = 1, 2
+_key_changes = dict.fromkeys(_key_indexes, 0)
+
+
+class _key_attribute(object):
+    """Attribute whose changes drop the lookup indexes it is in (see
+    _key_changed). Only setting it goes through this descriptor, the value
+    is kept in the instance dictionary, so reading it is as fast as for a
+    plain attribute."""
+
+    def __init__(self, name, key=None):
+        self.name = name
+        self.key = key or name
+
+    def __set__(self, obj, val):
+        d = obj.__dict__
+        if d.get('_indexed'):
+            obj._key_changed(self.key)
+        d[self.name] = val
+
+
+def _key_slot(name):
+    """Property for a slot (named _<name>) whose changes drop the lookup
+    indexes it is in."""
+    slot = '_' + name
+
+    def fget(self):
+        return getattr(self, slot)
+
+    def fset(self, val):
+        if self._indexed:
+            self._key_changed(name)
+        setattr(self, slot, val)
+    return property(fget, fset)
+
+
+class _AtomBase:
+    """Methods shared by Atom and SlotAtom."""
+    __slots__ = ()
+    # coordinate store of the atom and its row in it, set when a selection
+    # keeps the coordinates of its atoms in one array (see
+    # Atomselection.store_coords)
+    _store = None
+    _row = 0
+    # whether the atom is in a lookup index (_OWNED or _SHARED)
+    _indexed = False
+
+    def _key_changed(self, key):
+        """Drops the lookup indexes that a change of attribute key makes
+        out of date: those of the Molecule of the atom and of its Chain and
+        Model, and of all other selections if the atom is in theirs."""
+        if self.molecule is not None:
+            self.molecule._drop_indexes(_key_indexes[key])
+        if self._indexed == _SHARED:
+            _key_changes[key] += 1
+
+    @property
+    def x(self):
+        """Coordinates of the atom. For an atom in a coordinate store this is
+        a view of its row (slices like x[:] are views too, use list(x) for
+        a copy), and assigning to it writes into the row."""
+        if self._store is None:
+            return self._x
+        return self._store.xyz[self._row]
+
+    @x.setter
+    def x(self, val):
+        if self._store is None:
+            self._x = val
         else:
-            name = self.name
-        idx = self.id % 100000
-        try:
-            resid = self.resnr % 10000
-        except:
-            resid = str(self.resnr)
-        try:
-            s = pdb_format % (self.race, idx, name, self.altloc,
-                              resname, self.chain_id, resid,
-                              coords[0], coords[1],
-                              coords[2], self.occ, self.bfac, self.symbol)
-        except:
-            s = pdb_format2 % (self.race, idx, name, self.altloc,
-                               resname, self.chain_id, resid,
-                               coords[0], coords[1], coords[2],
-                               self.occ, self.bfac)
-        return s
+            self._store.xyz[self._row] = val
+
+    def __getstate__(self):
+        """State for copy and pickle. An atom in a coordinate store is
+        detached from it, with its coordinates as a list, so that a copy
+        of the atom does not copy the whole store."""
+        state = dict(getattr(self, '__dict__', {}))
+        for name in getattr(type(self), '__slots__', ()):
+            if name != '__dict__' and hasattr(self, name):
+                state[name] = getattr(self, name)
+        if self._store is not None:
+            state['_x'] = self.x.tolist()
+        state.pop('_store', None)
+        state.pop('_row', None)
+        return state
+
+    def __setstate__(self, state):
+        self._store = None
+        self._row = 0
+        self._indexed = False
+        for name, val in state.items():
+            if name != '_indexed':
+                setattr(self, name, val)
+        # the copy is in the copied indexes, if any
+        self._indexed = state.get('_indexed', False)
+
+    def __str__(self):
+        """Prints the Atom in PDB format"""
+        return pdb_string(self.race, self.id, self.name, self.altloc,
+                          self.resname, self.chain_id, self.resnr, self.x,
+                          self.occ, self.bfac, self.symbol, self.unity)
 
     def __sub__(self, other):
         """ Overloading of the '-' operator for using
@@ -528,3 +559,201 @@ class Atom:
         """Change the chain identifier.
         """
         self.chain_id = chain_id
+
+
+class Atom(_AtomBase):
+    """Atom Class.
+
+    Parameters
+    ----------
+    line : str, optional
+        input line in PDB format. Default is None.
+    mol2line : str, optional
+        input line in MOL2 format.  Default is None.
+
+
+    Attributes
+    ----------
+    id : int
+        atom id
+    name : str
+        atom name
+    resname : str
+        name of residue atom is part of
+    chain_id : str
+        ID of the chain atom belongs to
+    x : array
+        atom coordinates
+    occ : float
+        occupancy
+    bfac : float
+        B-factor
+    symbol : str
+        chemical element of the atom
+    unity : str
+        unit of the coordinates, either 'A' or 'nm'. Default is 'A'.
+    """
+    id = _key_attribute('id')
+    name = _key_attribute('name')
+    resname = _key_attribute('resname')
+    chain_id = _key_attribute('chain_id')
+    resnr = _key_attribute('resnr')
+    symbol = _key_attribute('symbol')
+
+    def __init__(self, line=None, mol2line=None, **kwargs):
+
+        self.race = 'ATOM  '
+        self.id = 0
+        self.orig_id = 0
+        self.code = 0
+        self.name = ''
+        self.altloc = ''
+        self.resname = ''
+        self.chain_id = ' '
+        self.x = [0, 0, 0]
+        self.occ = 1.
+        self.bfac = 0.
+        self.vdw = 0.
+        self.vdw14 = 0.
+        self.atype = ''
+        self.hyb = ''
+        self.symbol = ''
+        self.bonds = []
+        self.b13 = []
+        self.b14 = []
+        self.connected = []
+        self.neighbors = []
+        self.order = 0
+        self.boxid = 0
+        self.molecule = None
+        self.chain = None
+        self.model = None
+        self.cgnr = 0.
+        self.v = [0, 0, 0]
+        self.f = []
+        self.m = 0.
+        self.q = 0.
+        self.mB = 0.
+        self.qB = 0.
+        self.type = ''
+        self.typeB = ''
+        self.resnr = 0
+        self.grpnr = ' '
+        self.atomtype = ''
+        self.atomtypeB = ''
+        self.ptype = ''
+        self.long_name = ''
+        self.unity = 'A'
+        for key, val in kwargs.items():
+            setattr(self, key, val)
+        if line is not None:
+            self.readPDBString(line)
+        if mol2line is not None:
+            self.read_mol2_line(mol2line)
+
+
+def _lazy_list(name, default=()):
+    """Property for a list attribute that is only allocated when used."""
+    slot = '_' + name
+
+    def fget(self):
+        val = getattr(self, slot)
+        if val is None:
+            val = list(default)
+            setattr(self, slot, val)
+        return val
+
+    def fset(self, val):
+        setattr(self, slot, val)
+    return property(fget, fset)
+
+
+class SlotAtom(_AtomBase):
+    """Compact variant of :class:`Atom` for large systems.
+
+    The standard attributes are kept in ``__slots__`` instead of a
+    per-instance dictionary, and the lists (bonds, b13, b14, connected,
+    neighbors, v and f) are only allocated when they are first used. It
+    takes the same arguments as Atom and has the same methods; attributes
+    that are not standard can still be set.
+
+    Examples
+    --------
+    >>> model = Model('membrane.gro', atom_class=SlotAtom)
+    """
+    __slots__ = ('race', '_id', 'orig_id', 'code', '_name', 'altloc',
+                 '_resname', '_chain_id', '_x', 'occ', 'bfac', 'vdw', 'vdw14',
+                 'atype', 'hyb', '_symbol', '_bonds', '_b13', '_b14',
+                 '_connected', '_neighbors', 'order', 'boxid', 'molecule',
+                 'chain', 'model', 'cgnr', '_v', '_f', 'm', 'q', 'mB', 'qB',
+                 'type', 'typeB', '_resnr', 'grpnr', 'atomtype', 'atomtypeB',
+                 'ptype', 'long_name', 'unity', '_store', '_row', '_indexed',
+                 '__dict__')
+
+    id = _key_slot('id')
+    name = _key_slot('name')
+    resname = _key_slot('resname')
+    chain_id = _key_slot('chain_id')
+    resnr = _key_slot('resnr')
+    symbol = _key_slot('symbol')
+    bonds = _lazy_list('bonds')
+    b13 = _lazy_list('b13')
+    b14 = _lazy_list('b14')
+    connected = _lazy_list('connected')
+    neighbors = _lazy_list('neighbors')
+    v = _lazy_list('v', (0, 0, 0))
+    f = _lazy_list('f')
+
+    def __init__(self, line=None, mol2line=None, **kwargs):
+
+        self._store = None
+        self._row = 0
+        self._indexed = False
+        self.race = 'ATOM  '
+        self._id = 0
+        self.orig_id = 0
+        self.code = 0
+        self._name = ''
+        self.altloc = ''
+        self._resname = ''
+        self._chain_id = ' '
+        self._x = [0, 0, 0]
+        self.occ = 1.
+        self.bfac = 0.
+        self.vdw = 0.
+        self.vdw14 = 0.
+        self.atype = ''
+        self.hyb = ''
+        self._symbol = ''
+        self._bonds = None
+        self._b13 = None
+        self._b14 = None
+        self._connected = None
+        self._neighbors = None
+        self.order = 0
+        self.boxid = 0
+        self.molecule = None
+        self.chain = None
+        self.model = None
+        self.cgnr = 0.
+        self._v = None
+        self._f = None
+        self.m = 0.
+        self.q = 0.
+        self.mB = 0.
+        self.qB = 0.
+        self.type = ''
+        self.typeB = ''
+        self._resnr = 0
+        self.grpnr = ' '
+        self.atomtype = ''
+        self.atomtypeB = ''
+        self.ptype = ''
+        self.long_name = ''
+        self.unity = 'A'
+        for key, val in kwargs.items():
+            setattr(self, key, val)
+        if line is not None:
+            self.readPDBString(line)
+        if mol2line is not None:
+            self.read_mol2_line(mol2line)
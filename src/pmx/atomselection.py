@@ -38,15 +38,74 @@ Take a look there for details...
 import sys
 import random
 import copy as cp
+import numpy as np
+from operator import attrgetter
 from . import library
 from . import _pmx
-from .atom import Atom
-from .geometry import Rotation
+from .atom import Atom, _key_changes, _OWNED, _SHARED
+from .geometry import Rotation, neighbor_pairs, bond_graph, bonded_neighbors
+from .columns import atom_columns
+from .selection import Selection, compile_selection
+
+
+_atom_id = attrgetter('id')
+
+
+def _columns_changes():
+    """Number of changes of the atom attributes used by selections, see
+    Atomselection._atom_columns."""
+    return sum(_key_changes.values()) - _key_changes['resid']
+
+
+class CoordStore:
+    """Coordinates of a list of atoms in one contiguous (natoms, 3) float64
+    array. The x of every atom becomes a view of its row of the array.
+
+    Parameters
+    ----------
+    atoms : list
+        list of Atom instances. An atom can only be in one store; atoms of
+        another store are moved into this one.
+
+    Attributes
+    ----------
+    atoms : list
+        the atom list the store was made for.
+    xyz : ndarray
+        the coordinates.
+    moved : int
+        number of atoms that were moved into other stores since. The
+        store is only used while it is 0.
+    """
+
+    def __init__(self, atoms):
+        self.atoms = atoms
+        self.moved = 0
+        self.xyz = np.array([a.x[:3] for a in atoms],
+                            dtype=np.float64).reshape(-1, 3)
+        for i, atom in enumerate(atoms):
+            old = atom._store
+            if old is not None and old is not self:
+                old.moved += 1
+            atom._store = self
+            atom._row = i
+
+    def release(self):
+        """Gives the atoms their own coordinate lists again."""
+        for atom in self.atoms:
+            if atom._store is self:
+                x = self.xyz[atom._row].tolist()
+                atom._store = None
+                atom.x = x
 
 
 class Atomselection:
     """ Basic class to handle sets of atoms. Atoms are stored
     in a list <atoms>"""
+    # coordinate store of the atoms, see store_coords
+    _coord_store = None
+    # lookup dictionaries, see _lookup
+    _indexes = None
 
     def __init__(self, **kwargs):
         self.atoms = []
@@ -96,10 +155,18 @@ class Atomselection:
             box_line = _pmx.box_as_cryst1(self.box)
             print(box_line, file=fp)
 
+        for line in self._pdb_records(bPDBTER, bAssignChainIDs, resnrlist):
+            print(line, file=fp)
+        print('ENDMDL', file=fp)
+        fp.close()
+
+    def _pdb_records(self, bPDBTER=False, bAssignChainIDs=False,
+                     resnrlist=[]):
+        """Yields the ATOM/HETATM (and TER) lines written by writePDB."""
         chainID = self.atoms[0].chain_id
         for atom in self.atoms:
             if (bPDBTER is True) and (atom.chain_id != chainID):
-                print('TER', file=fp)
+                yield 'TER'
                 chainID = atom.chain_id
             if (len(resnrlist) > 0) and (atom.resnr not in resnrlist):
                 continue
@@ -111,11 +178,9 @@ class Atomselection:
             if (len(atom.name) > 4):  # too long atom name
                 foo = cp.deepcopy(atom)
                 foo.name = foo.name[:4]
-                print(foo, file=fp)
+                yield str(foo)
             else:
-                print(atom, file=fp)
-        print('ENDMDL', file=fp)
-        fp.close()
+                yield str(atom)
 
     def writeGRO(self, filename, title=''):
         fp = open(filename, 'w')
@@ -129,7 +194,30 @@ class Atomselection:
             else:
                 title = str(self.__class__)+' '+str(self)
         print(title, file=fp)
-        print("%5d" % len(self.atoms), file=fp)
+        for line in self._gro_records(fac):
+            print(line, file=fp)
+
+        if not hasattr(self, "box"):
+            self.box = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
+        if self.box[0][1] or self.box[0][2] or self.box[1][0] or \
+           self.box[1][2] or self.box[2][0] or self.box[2][1]:
+            bTric = False
+            ff = "%10.5f%10.5f%10.5f%10.5f%10.5f%10.5f%10.5f%10.5f%10.5f"
+        else:
+            bTric = True
+            ff = "%10.5f%10.5f%10.5f"
+        if bTric:
+            print(ff % (self.box[0][0], self.box[1][1], self.box[2][2]), file=fp)
+        else:
+            print(ff % (self.box[0][0], self.box[1][1], self.box[2][2],
+                        self.box[0][1], self.box[0][2], self.box[1][0],
+                        self.box[1][2], self.box[2][0], self.box[2][1]), file=fp)
+        fp.close()
+
+    def _gro_records(self, fac=1.):
+        """Yields the number of atoms line and the atom lines written by
+        writeGRO, with the coordinates scaled by fac."""
+        yield "%5d" % len(self.atoms)
         if self.atoms[0].v[0] != 0.000:
             bVel = True
         else:
@@ -153,24 +241,7 @@ class Atomselection:
                 ff += gro_format % (atom.x[0]*fac,
                                     atom.x[1]*fac,
                                     atom.x[2]*fac)
-            print(ff, file=fp)
-
-        if not hasattr(self, "box"):
-            self.box = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
-        if self.box[0][1] or self.box[0][2] or self.box[1][0] or \
-           self.box[1][2] or self.box[2][0] or self.box[2][1]:
-            bTric = False
-            ff = "%10.5f%10.5f%10.5f%10.5f%10.5f%10.5f%10.5f%10.5f%10.5f"
-        else:
-            bTric = True
-            ff = "%10.5f%10.5f%10.5f"
-        if bTric:
-            print(ff % (self.box[0][0], self.box[1][1], self.box[2][2]), file=fp)
-        else:
-            print(ff % (self.box[0][0], self.box[1][1], self.box[2][2],
-                        self.box[0][1], self.box[0][2], self.box[1][0],
-                        self.box[1][2], self.box[2][0], self.box[2][1]), file=fp)
-        fp.close()
+            yield ff
 
     def write(self, fn, title='', nr=1):
         ext = fn.split('.')[-1]
@@ -184,6 +255,18 @@ class Atomselection:
 
     def com(self, vector_only=False):
         """move atoms to center of mass or return vector only"""
+        xyz = self._stored_coords()
+        if xyz is not None:
+            m = np.array([a.m for a in self.atoms], dtype=np.float64)
+            for i in np.flatnonzero(m == 0):
+                print(" Warning: Atom has zero mass: setting mass to 1.", file=sys.stderr)
+                self.atoms[i].m = 1.
+            m[m == 0] = 1.
+            c = m.dot(xyz) / m.sum()
+            if vector_only:
+                return c.tolist()
+            xyz -= c
+            return
         for atom in self.atoms:
             if atom.m == 0:
                 print(" Warning: Atom has zero mass: setting mass to 1.", file=sys.stderr)
@@ -221,10 +304,32 @@ class Atomselection:
         start : int, optional
             integer from which to start the indexing of the atoms
         """
-        for i, atom in enumerate(self.atoms):
-            if not hasattr(atom, "orig_id") or atom.orig_id == 0:
-                atom.orig_id = atom.id
-            atom.id = i+1
+        # the IDs of Atom objects are written to their dictionaries, which
+        # is much faster than going through the attribute that drops the
+        # indexes the atom is in (see Atom._key_changed). The id indexes
+        # are dropped at the end, those of other selections by counting
+        # the change.
+        changed = False
+        for i, atom in enumerate(self.atoms, 1):
+            old = atom.id
+            if getattr(atom, "orig_id", 0) == 0:
+                atom.orig_id = old
+            if old != i:
+                changed = True
+                d = atom.__dict__
+                if 'id' in d:
+                    d['id'] = i
+                else:
+                    indexed = atom._indexed
+                    atom._indexed = False
+                    atom.id = i
+                    atom._indexed = indexed
+        if changed:
+            _key_changes['id'] += 1
+            for owner in self._index_owners():
+                if owner is not None and owner._indexes:
+                    Atomselection._drop_indexes(owner, ('id', 'columns'))
+        self.invalidate_indexes()
 
     def rename_atoms_to_gmx(self):
         """Renames atoms to comply with Gromacs syntax. If the name starts with
@@ -234,10 +339,18 @@ class Atomselection:
         for atom in self.atoms:
             if atom.name[0].isdigit():
                 atom.name = atom.name[1:]+atom.name[0]
+        self.invalidate_indexes()
 
     def a2nm(self):
         if self.unity == 'nm':
             return
+        xyz = self._stored_coords()
+        if xyz is not None:
+            xyz *= .1
+            for atom in self.atoms:
+                atom.unity = 'nm'
+            self.unity = 'nm'
+            return
         for atom in self.atoms:
             atom.x[0] *= .1
             atom.x[1] *= .1
@@ -248,6 +361,13 @@ class Atomselection:
     def nm2a(self):
         if self.unity == 'A':
             return
+        xyz = self._stored_coords()
+        if xyz is not None:
+            xyz *= 10.
+            for atom in self.atoms:
+                atom.unity = 'A'
+            self.unity = 'A'
+            return
         for atom in self.atoms:
             atom.x[0] *= 10.
             atom.x[1] *= 10.
@@ -268,6 +388,11 @@ class Atomselection:
             atom.get_order()
 
     def max_crd(self):
+        xyz = self._stored_coords()
+        if xyz is not None:
+            lo = xyz.min(axis=0).tolist()
+            hi = xyz.max(axis=0).tolist()
+            return tuple(zip(lo, hi))
         x = list(map(lambda a: a.x[0], self.atoms))
         y = list(map(lambda a: a.x[1], self.atoms))
         z = list(map(lambda a: a.x[2], self.atoms))
@@ -280,6 +405,97 @@ class Atomselection:
             self.nm2a()
         _pmx.search_neighbors(self.atoms, cutoff, build_bonds)
 
+    def neighbor_pairs(self, cutoff, other=None, pbc=False):
+        """Pairs of atoms closer than cutoff, as arrays. Unlike
+        search_neighbors this does not change the atoms.
+
+        Parameters
+        ----------
+        cutoff : float
+            distance cutoff, in the units of the coordinates (unity).
+        other : Atomselection, optional
+            if given, the pairs between the atoms of this selection and
+            those of other are searched, otherwise the pairs within this
+            selection.
+        pbc : bool, optional
+            whether to use the minimum image distances in the box of the
+            selection (self.box, in nm). Default is False.
+
+        Returns
+        -------
+        i, j, d : ndarray
+            indices in atoms, indices in other.atoms (or in atoms with
+            i < j) and the distances, see pmx.geometry.neighbor_pairs.
+        """
+        box = None
+        if pbc:
+            box = np.array(getattr(self, 'box', np.zeros((3, 3))),
+                           dtype=np.float64)
+            if not np.linalg.det(box):
+                raise ValueError('pbc=True needs a box')
+            if self.unity == 'A':
+                box *= 10.
+        ref = None
+        if other is not None:
+            ref = other._coords_array()
+            if other.unity != self.unity:
+                ref = ref * (10. if other.unity == 'nm' else 0.1)
+        return neighbor_pairs(self._coords_array(), cutoff, box=box, ref=ref)
+
+    def perceive_bonds(self, pbc=False):
+        """Finds the bonds from the distances of the atoms and sets the
+        bonds, b13 and b14 lists of every atom, replacing their contents.
+        This is what search_neighbors does with build_bonds, without the
+        neighbor lists; see pmx.geometry.bond_graph.
+
+        Most of the time goes to making the three lists of every atom; for
+        large systems use the returned graphs, or bond_graph and
+        bonded_neighbors on arrays, where the lists are not needed.
+
+        Parameters
+        ----------
+        pbc : bool, optional
+            whether to find bonds across the box (self.box). Default is
+            False.
+
+        Returns
+        -------
+        bonds, b13, b14 : csr_matrix
+            the graphs of bonds, 1-3 and 1-4 pairs, with rows and columns
+            in the order of atoms.
+        """
+        cols = self._atom_columns()
+        symbols = cols.symbol.tolist()
+        # atoms named like H1 or 1HB may get a digit as symbol
+        bad = set(s for s in set(symbols) if not s or not s[0].isalpha())
+        if bad:
+            names = cols.name
+            for k in [k for k, s in enumerate(symbols) if s in bad]:
+                symbols[k] = names[k].lstrip('0123456789')[:1]
+        x = self._coords_array()
+        box = None
+        if pbc:
+            box = np.array(getattr(self, 'box', np.zeros((3, 3))),
+                           dtype=np.float64) * 10.
+            if not np.linalg.det(box):
+                raise ValueError('pbc=True needs a box')
+        if self.unity == 'nm':
+            x = x * 10.
+        bonds = bond_graph(x, symbols, box=box)
+        b13, b14 = bonded_neighbors(bonds)
+
+        atoms = self.atoms
+        lists = []
+        for graph in (bonds, b13, b14):
+            items = list(map(atoms.__getitem__, graph.indices.tolist()))
+            ptr = graph.indptr.tolist()
+            lists.append([items[a:b] for a, b in zip(ptr, ptr[1:])])
+        for atom, bl, l13, l14 in zip(atoms, *lists):
+            atom.bonds = bl
+            atom.b13 = l13
+            atom.b14 = l14
+        return bonds, b13, b14
+
     def coords(self):
         return list(map(lambda a: a.x, self.atoms))
 
@@ -309,6 +525,9 @@ class Atomselection:
         result = []
         if not hasattr(key, "append"):
             key = [key]
+        if how == 'byid' and not inv and len(key) == 1:
+            k = int(key[0])
+            return list(self._lookup('id', self.atoms, _atom_id).get(k, []))
         if how == 'byname':
             for atom in self.atoms:
                 for k in key:
@@ -355,11 +574,211 @@ class Atomselection:
                         at3.b14.append(atom)
 
     def translate(self, vec):
+        xyz = self._stored_coords()
+        if xyz is not None:
+            xyz += np.asarray(vec[:3], dtype=np.float64)
+            return
         for atom in self.atoms:
             atom.x[0] += vec[0]
             atom.x[1] += vec[1]
             atom.x[2] += vec[2]
 
+    def rotate(self, R, origin=(0, 0, 0)):
+        """Rotates the atoms with the rotation matrix R around origin."""
+        R = np.asarray(R, dtype=np.float64)
+        origin = np.asarray(origin, dtype=np.float64)
+        xyz = self._stored_coords()
+        if xyz is not None:
+            xyz[:] = (xyz - origin).dot(R.T) + origin
+            return
+        for atom in self.atoms:
+            atom.x = (R.dot(np.asarray(atom.x) - origin) + origin).tolist()
+
+    # ----------------
+    # Coordinate store
+    # ----------------
+    def store_coords(self):
+        """Keeps the coordinates of the atoms in one contiguous
+        (natoms, 3) float64 array, which is returned. The x of every atom
+        becomes a view of its row, so code working on single atoms keeps
+        working, while translate, rotate, com, max_crd, a2nm, nm2a and
+        Frame.update work on the whole array at once.
+
+        If the atom list is replaced or its length changes, or some of the
+        atoms were moved into the store of another selection (e.g. of one
+        residue of the model), the coordinates are stored again the next
+        time they are needed.
+
+        Note that atom.x is then a numpy row and not a list, which changes
+        the meaning of some list operations: atom.x + [v] adds element-wise
+        instead of concatenating, atom.x[:] is a view and not a copy, and
+        atom.x == y compares element-wise, so it raises ValueError in an
+        if, as does atom.x in [...]. Use list(atom.x) or atom.x.tolist()
+        where a list is needed.
+        """
+        if self._coord_store is not None:
+            self._coord_store.release()
+        self._coord_store = CoordStore(self.atoms)
+        return self._coord_store.xyz
+
+    def release_coords(self):
+        """Gives the atoms their own coordinate lists again."""
+        if self._coord_store is not None:
+            self._coord_store.release()
+            self._coord_store = None
+
+    def _stored_coords(self):
+        """Returns the coordinate array if the coordinates are stored (see
+        store_coords), otherwise None."""
+        store = self._coord_store
+        if store is None:
+            return None
+        atoms = self.atoms
+        if not atoms:
+            return None
+        if (atoms is not store.atoms or len(atoms) != len(store.xyz) or
+                store.moved or atoms[0]._store is not store or
+                atoms[-1]._store is not store):
+            # the atoms have changed since they were stored
+            return self.store_coords()
+        return store.xyz
+
+    # --------------
+    # Lookup indexes
+    # --------------
+    def _lookup(self, name, items, key):
+        """Returns a dictionary that maps key(item) to the list of items
+        of the list items having that key, in list order. It is made the
+        first time and kept until items is replaced, its length changes,
+        invalidate_indexes is called or, for the name and id indexes of
+        atoms and the resid index of residues, the name or ID of one of
+        the items is set.
+        """
+        indexes = self._indexes
+        if indexes is None:
+            indexes = self._indexes = {}
+        entry = indexes.get(name)
+        if entry is not None and entry[0] is items and \
+           entry[1] == len(items) and \
+           (entry[2] is None or entry[2] == _key_changes[name]):
+            return entry[3]
+        else:
+            changes = None if self._mark_indexed(items, name == 'resid') \
+                else _key_changes[name]
+            index = {}
+            for item in items:
+                k = key(item)
+                if k in index:
+                    index[k].append(item)
+                else:
+                    index[k] = [item]
+            indexes[name] = (items, len(items), changes, index)
+            return index
+
+    def _mark_indexed(self, items, residues=False):
+        """Flags the atoms, or residues, in items as being in a lookup
+        index of the selection, and returns whether they all belong to
+        it. Changes of the items then drop the index through their
+        Molecule (see Atom._key_changed), otherwise the index is only used
+        as long as _key_changes does not change."""
+        owned = True
+        for item in items:
+            mol = item if residues else item.molecule
+            if mol is not None and (mol is self or mol.chain is self or
+                                    mol.model is self):
+                if not item._indexed:
+                    item._indexed = _OWNED
+            else:
+                item._indexed = _SHARED
+                owned = False
+        return owned
+
+    def _index_owners(self):
+        """The selections whose lookup indexes hold atoms of this one as
+        their own: the Molecules of the atoms and their Chains and Models
+        (see _mark_indexed)."""
+        owners = set()
+        for mol in set(atom.molecule for atom in self.atoms):
+            if mol is not None:
+                owners.update((mol, mol.chain, mol.model))
+        return owners
+
+    def invalidate_indexes(self):
+        """Drops the dictionaries used to look up atoms and residues by
+        name or ID. Inserting, removing, renaming and renumbering atoms
+        and residues does this already; call it after replacing items of
+        the atom or residue lists in place."""
+        self._indexes = None
+
+    def _drop_indexes(self, names):
+        """Drops the lookup indexes in names, see _key_changed."""
+        indexes = self._indexes
+        if indexes:
+            for name in names:
+                indexes.pop(name, None)
+
+    # ---------
+    # Selection
+    # ---------
+    def select(self, selection, x=None, indices=False):
+        """Selects atoms with the selection language of pmx.selection,
+        e.g. ``"name CA and chain A"``.
+
+        Parameters
+        ----------
+        selection : str or Selection
+            the selection. Strings are compiled once and cached.
+        x : ndarray, optional
+            (natoms, 3) coordinates to use for ``within`` instead of those
+            of the atoms, e.g. those of a trajectory frame.
+        indices : bool, optional
+            whether to return the indices of the selected atoms instead of
+            an Atomselection. Default is False.
+
+        Returns
+        -------
+        sel : Atomselection or ndarray
+            Atomselection with the selected atoms (the same Atom objects),
+            or their indices in atoms.
+        """
+        if not isinstance(selection, Selection):
+            selection = compile_selection(selection)
+        cols = self._atom_columns()
+        if x is None:
+            x = cols.x if cols.x is not None else self._coords_array
+        idx = selection.indices(cols, x)
+        if indices:
+            return idx
+        atoms = self.atoms
+        return Atomselection(atoms=[atoms[i] for i in idx.tolist()],
+                             unity=self.unity)
+
+    def _atom_columns(self):
+        """AtomColumns of the atoms for selections. They are kept like the
+        lookup dictionaries of _lookup, until any of the atom attributes
+        selections use is set."""
+        indexes = self._indexes
+        if indexes is None:
+            indexes = self._indexes = {}
+        atoms = self.atoms
+        entry = indexes.get('columns')
+        if entry is None or entry[0] is not atoms or \
+           entry[1] != len(atoms) or \
+           (entry[2] is not None and entry[2] != _columns_changes()):
+            changes = None if self._mark_indexed(atoms) \
+                else _columns_changes()
+            entry = indexes['columns'] = (atoms, len(atoms), changes,
+                                          atom_columns(atoms))
+        return entry[3]
+
+    def _coords_array(self):
+        """The coordinates of the atoms as a (natoms, 3) array."""
+        xyz = self._stored_coords()
+        if xyz is None:
+            xyz = np.array([a.x for a in self.atoms],
+                           dtype=np.float64).reshape(-1, 3)
+        return xyz
+
     def random_rotation(self):
         vec = self.com(vector_only=True)
         self.com()
@@ -66,6 +66,13 @@ import sys
 __all__ = ['Chain']
 
 
+def _resid(res):
+    """Residue ID as fetch_residue compares it."""
+    if isinstance(res.id, str):
+        return res.id.replace(" ", "")
+    return res.id
+
+
 class Chain(Atomselection):
     """Chain Class.
 
@@ -170,13 +177,11 @@ class Chain(Atomselection):
             mol.set_chain_id(self.id)
             mol.chain = self
             if pos == len(self.residues):
-                m = self.residues[-1]
                 if have_model:
-                    idx_model = self.model.residues.index(m)+1
+                    idx_model = self._model_position(pos-1)+1
             else:
-                m = self.residues[pos]
                 if have_model:
-                    idx_model = self.model.residues.index(m)
+                    idx_model = self._model_position(pos)
                     mol.model = self.model
             if have_model:
                 self.model.residues.insert(idx_model, mol)
@@ -196,12 +201,46 @@ class Chain(Atomselection):
                     self.renumber_residues()
                 self.al_from_resl()
                 self.renumber_atoms()
+        self.invalidate_indexes()
         self.make_residue_tree()
 
     def renumber_residues(self):
         """Renumbers residues from 1."""
         for i, res in enumerate(self.residues):
             res.set_resid(i+1)
+        self.invalidate_indexes()
+
+    def invalidate_indexes(self):
+        """Drops the lookup dictionaries of the Chain and of the Model it
+        is part of."""
+        Atomselection.invalidate_indexes(self)
+        if self.model is not None:
+            self.model.invalidate_indexes()
+
+    def _index_owners(self):
+        return [self, self.model] + self.residues
+
+    def _drop_indexes(self, names):
+        """Drops the lookup indexes in names of the Chain and of the Model
+        it is part of."""
+        Atomselection._drop_indexes(self, names)
+        if self.model is not None:
+            self.model._drop_indexes(names)
+
+    def _model_position(self, pos):
+        """Returns the index in model.residues of the residue at position
+        pos of the Chain. The residues of the Model are those of its chains
+        one after the other, so this is checked first before searching."""
+        res = self.residues[pos]
+        residues = self.model.residues
+        idx = pos
+        for ch in self.model.chains:
+            if ch is self:
+                break
+            idx += len(ch.residues)
+        if idx < len(residues) and residues[idx] is res:
+            return idx
+        return residues.index(res)
 
     def insert_chain(self, pos, chain):
         """Inserts a Chain into the Model the current Chain is part of (?)"""
@@ -218,13 +257,11 @@ class Chain(Atomselection):
             raise(ValueError, 'Chain has only %d residues' %
                   len(self.residues))
         if pos == len(self.residues):
-            m = self.residues[-1]
             if have_model:
-                idx_model = self.model.residues.index(m)+1
+                idx_model = self._model_position(pos-1)+1
         else:
-            m = self.residues[pos]
             if have_model:
-                idx_model = self.model.residues.index(m)
+                idx_model = self._model_position(pos)
 
         first = self.residues[:pos]
         last = self.residues[pos:]
@@ -249,6 +286,7 @@ class Chain(Atomselection):
         else:
             self.renumber_atoms()
             self.renumber_residues()
+        self.invalidate_indexes()
         self.make_residue_tree()
 
     def remove_residue(self, residue, renumber_atoms=True, renumber_residues=True):
@@ -267,20 +305,14 @@ class Chain(Atomselection):
         """
         idx = self.residues.index(residue)
         try:
-            midx = self.model.residues.index(residue)
+            midx = self._model_position(idx)
         except:
             midx = -1
         del self.residues[idx]
         if midx != -1:
             del self.model.residues[midx]
-            self.model.atoms = []
-            for r in self.model.residues:
-                for atom in r.atoms:
-                    self.model.atoms.append(atom)
-        self.atoms = []
-        for r in self.residues:
-            for atom in r.atoms:
-                self.atoms.append(atom)
+            self.model.al_from_resl()
+        self.atoms = [atom for r in self.residues for atom in r.atoms]
         if midx != -1: # renumber in the model
             if renumber_atoms is True:
                 self.model.renumber_atoms()
@@ -291,6 +323,7 @@ class Chain(Atomselection):
                 self.renumber_atoms()
             if renumber_residues is True:
                 self.renumber_residues()
+        self.invalidate_indexes()
         self.make_residue_tree()
 
     def replace_residue(self, residue, new, bKeepResNum=False):
@@ -306,16 +339,34 @@ class Chain(Atomselection):
             whether to keep residue ID of the residue that is inserted.
             Default is False
         """
+        # the new residue takes the place of the old one, which gives the
+        # same as inserting it and removing the old one, but the atoms are
+        # renumbered and the residue tree is checked only once
         idx = self.residues.index(residue)
         if bKeepResNum is True:
-            self.insert_residue(idx, new, residue.id)
+            new.set_resid(residue.id)
         else:
-            self.insert_residue(idx, new)
-
-        bRenumberRes = True
-        if bKeepResNum==True:
-            bRenumberRes = False
-        self.remove_residue(residue, renumber_residues=bRenumberRes)
+            new.set_resid(-999)
+        new.set_chain_id(self.id)
+        new.chain = self
+        if self.model is not None:
+            idx_model = self._model_position(idx)
+            new.model = self.model
+            self.model.residues[idx_model] = new
+            self.residues[idx] = new
+            if bKeepResNum is not True:
+                self.model.renumber_residues()
+            self.model.al_from_resl()
+            self.model.renumber_atoms()
+            self.al_from_resl()
+        else:
+            self.residues[idx] = new
+            if bKeepResNum is not True:
+                self.renumber_residues()
+            self.al_from_resl()
+            self.renumber_atoms()
+        self.invalidate_indexes()
+        self.make_residue_tree()
 
     def remove_atom(self, atom):
         m = atom.molecule
@@ -335,6 +386,10 @@ class Chain(Atomselection):
             Molecule instance of the residue found.                                                                    
         """                                                                                                            
                                                                                                                        
+        found = self._lookup('resid', self.residues, _resid).get(idx, [])
+        if len(found) == 1 and found[0].id == idx:
+            return found[0]
+
         # check idx is a valid selection                                                                               
         if idx not in [r.id for r in self.residues]:                                                                   
             raise ValueError('resid %s not found in Model residues' % idx)                                             
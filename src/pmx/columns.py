@@ -0,0 +1,563 @@
+#!/usr/bin/env python
+
+"""Column-wise reading of PDB and GRO structure files.
+
+The atom records are parsed in one pass into NumPy column arrays (names,
+residue numbers, coordinates, ...), without creating an Atom object per
+line. The boundaries of chains and residues are then found on the columns,
+and only at the end Atom, Molecule and Chain objects are made, if they are
+needed at all. :class:`pmx.model.Model` reads files through this module.
+
+Examples
+--------
+Read the columns only:
+
+    >>> cols = read_gro('conf.gro')
+    >>> nwat = np.sum((cols.resname == 'SOL') & (cols.name == 'OW'))
+    >>> cols.x.shape
+    (52412, 3)
+
+Make the atoms later on:
+
+    >>> atoms = make_atoms(cols)
+
+"""
+
+import gc
+import numpy as np
+from . import library
+from .atom import Atom, pdb_string
+
+__all__ = ['AtomColumns', 'read_gro', 'read_pdb', 'segment_starts',
+           'make_atoms', 'atom_columns', 'expand', 'moltypes', 'objects',
+           'pdb_records', 'gro_records']
+
+
+class AtomColumns:
+    """Per-atom data of a structure as column arrays.
+
+    Attributes
+    ----------
+    race, name, altloc, resname, chain_id, symbol, long_name : ndarray
+        string columns.
+    id, orig_id : ndarray
+        integer columns.
+    resnr : ndarray
+        residue numbers. Integers, or an object array if some of them
+        contain insertion codes (these are kept as the string from the
+        file, like Atom.readPDBString does).
+    x : ndarray
+        (natoms, 3) coordinates.
+    v : ndarray or None
+        (natoms, 3) velocities (GRO files).
+    occ, bfac : ndarray
+        occupancies and B-factors.
+    unity : str
+        unit of the coordinates, 'A' or 'nm'.
+    box : list
+        3x3 box.
+    title : str
+        title line of GRO files.
+    """
+    fields = ('race', 'id', 'orig_id', 'name', 'altloc', 'resname',
+              'chain_id', 'resnr', 'x', 'v', 'occ', 'bfac', 'symbol',
+              'long_name')
+
+    def __init__(self, **kwargs):
+        for f in self.fields:
+            setattr(self, f, None)
+        self.unity = 'A'
+        self.box = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
+        self.title = ''
+        for key, val in kwargs.items():
+            setattr(self, key, val)
+
+    def __len__(self):
+        return len(self.name)
+
+    def take(self, idx):
+        """Returns the columns of the atoms idx (an index array, a boolean
+        mask or a slice) as new AtomColumns."""
+        new = AtomColumns(unity=self.unity, box=self.box, title=self.title)
+        for f in self.fields:
+            col = getattr(self, f)
+            if col is not None:
+                setattr(new, f, col[idx])
+        return new
+
+
+# ==============
+# Column parsing
+# ==============
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[[9, 10, 11, 12, 13, 32]] = True
+
+
+class _Lines:
+    """The lines of a text as one byte buffer with the start and end offset
+    of every line (the end excludes the newline). Characters that are not
+    ASCII take one byte each, so that columns are counted as in str."""
+
+    def __init__(self, text):
+        if text.isascii():
+            self.data = text.encode('ascii')
+        else:
+            self.data = text.encode('latin-1', 'replace')
+        self.buf = np.frombuffer(self.data, dtype=np.uint8)
+        nl = np.flatnonzero(self.buf == 10)
+        self.starts = np.concatenate([[0], nl + 1])
+        self.ends = np.concatenate([nl, [len(self.data)]])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line(self, i):
+        return self.data[self.starts[i]:self.ends[i]].decode('latin-1')
+
+    def field(self, rows, a, b):
+        """Columns a:b of the lines rows as a bytes array. Like slicing a
+        str, the field is shorter where a line ends before column b."""
+        starts = self.starts[rows]
+        idx = starts[:, None] + np.arange(a, b)
+        out = self.buf.take(idx, mode='clip')
+        # trailing NUL bytes are not part of numpy bytes strings
+        out[idx >= self.ends[rows][:, None]] = 0
+        return out.view('S%d' % (b - a)).reshape(len(starts))
+
+    def numbers(self, rows, a):
+        """Whitespace separated numbers from column a to the end of the
+        lines rows. Returns the numbers and how many are on each line."""
+        n = len(rows)
+        lo = np.minimum(self.starts[rows] + a, self.ends[rows])
+        edges = np.zeros(len(self.buf) + 1, dtype=np.int8)
+        edges[lo] += 1
+        edges[self.ends[rows]] -= 1
+        inside = np.cumsum(edges[:-1], dtype=np.int8) > 0
+        space = np.ones(len(self.buf) + 2, dtype=bool)
+        space[1:-1] = ~inside | _WHITESPACE[self.buf]
+        edge = np.flatnonzero(space[1:] != space[:-1])
+        first, last = edge[::2], edge[1::2]
+        counts = np.bincount(np.searchsorted(lo, first, side='right') - 1,
+                             minlength=n)
+        # convert all numbers at once as fixed-width bytes fields
+        width = (last - first).max() if len(first) else 1
+        idx = first[:, None] + np.arange(width)
+        tokens = self.buf.take(idx, mode='clip')
+        tokens[idx >= last[:, None]] = 0
+        values = tokens.view('S%d' % width).reshape(len(first))
+        values = values.astype(np.float64)
+        return values, counts
+
+
+def _strings(field, strip=True):
+    """Decodes a bytes field into an object array of str. Every distinct
+    value is decoded only once and shared by all atoms having it. Returns
+    the strings and the index of each atom's value among the distinct
+    ones."""
+    uniq, codes = np.unique(field, return_inverse=True)
+    values = [s.decode('latin-1') for s in uniq.tolist()]
+    if strip:
+        values = [s.strip() for s in values]
+    values = objects(values)
+    return values[codes], codes
+
+
+def objects(values):
+    """Object array of a list of values."""
+    a = np.empty(len(values), dtype=object)
+    a[:] = values
+    return a
+
+
+def _floats(field, default):
+    """Converts a bytes field to floats; values that are not numbers get
+    the default value."""
+    try:
+        return field.astype(np.float64)
+    except ValueError:
+        res = np.empty(len(field))
+        for i, s in enumerate(field.tolist()):
+            try:
+                res[i] = float(s)
+            except ValueError:
+                res[i] = default
+        return res
+
+
+def _resnrs(field):
+    """Residue numbers, keeping the fields that are not integers (they
+    contain an insertion code) as strings."""
+    try:
+        return field.astype(np.int64)
+    except ValueError:
+        res = []
+        for s in field.tolist():
+            try:
+                res.append(int(s))
+            except ValueError:
+                res.append(s.decode('latin-1'))
+        return objects(res)
+
+
+def _long_names_and_symbols(resname, rcodes, name, ncodes, symbol=None):
+    """Atom.make_long_name and Atom.get_symbol for every atom, done once
+    per distinct (resname, name) pair. Atoms with a symbol keep it and get
+    no long name, as in Atom.readPDBString."""
+    n = len(name)
+    long_name = objects([''] * n)
+    if symbol is None:
+        symbol = objects([''] * n)
+        todo = np.arange(n)
+    else:
+        symbol = symbol.copy()
+        todo = np.flatnonzero(symbol == '')
+    if len(todo) == 0:
+        return long_name, symbol
+    pair = rcodes[todo] * (ncodes.max() + 1) + ncodes[todo]
+    upair, first, inv = np.unique(pair, return_index=True,
+                                  return_inverse=True)
+    ln, sym = [], []
+    for i in todo[first].tolist():
+        atom = Atom(resname=resname[i], name=name[i])
+        atom.get_symbol()
+        ln.append(atom.long_name)
+        sym.append(atom.symbol)
+    long_name[todo] = objects(ln)[inv]
+    symbol[todo] = objects(sym)[inv]
+    return long_name, symbol
+
+
+def read_gro(filename):
+    """Reads a GRO file into AtomColumns (coordinates in nm).
+
+    Parameters
+    ----------
+    filename : str
+        GRO file.
+
+    Returns
+    -------
+    cols : AtomColumns
+    """
+    with open(filename) as fp:
+        lines = _Lines(fp.read())
+    title = lines.line(0).rstrip()
+    natoms = int(lines.line(1))
+    if len(lines) < natoms + 3:
+        raise IOError('%s: expected %d atoms' % (filename, natoms))
+    rows = np.arange(2, 2 + natoms)
+
+    resnr = lines.field(rows, 0, 5).astype(np.int64)
+    resname, rcodes = _strings(lines.field(rows, 5, 9))
+    name, ncodes = _strings(lines.field(rows, 10, 15))
+    ids = lines.field(rows, 15, 20).astype(np.int64)
+    values, counts = lines.numbers(rows, 20)
+    if np.all(counts == 3):
+        x = values.reshape(natoms, 3)
+        v = None
+    elif np.all(counts == 6):
+        values = values.reshape(natoms, 6)
+        x = values[:, :3].copy()
+        v = values[:, 3:].copy()
+    elif np.all((counts == 3) | (counts == 6)):
+        # only some lines have velocities
+        first = np.cumsum(counts) - counts
+        x = values[first[:, None] + np.arange(3)]
+        v = np.zeros((natoms, 3))
+        vel = np.flatnonzero(counts == 6)
+        v[vel] = values[first[vel, None] + np.arange(3, 6)]
+    else:
+        i = np.flatnonzero((counts != 3) & (counts != 6))[0]
+        raise IOError('%s: cannot read line "%s"'
+                      % (filename, lines.line(rows[i])))
+    long_name, symbol = _long_names_and_symbols(resname, rcodes,
+                                                name, ncodes)
+
+    box_line = [float(i) for i in lines.line(2 + natoms).split()]
+    if len(box_line) not in [3, 9]:
+        raise IOError('%s: cannot read the box line' % filename)
+    box = [[box_line[0], 0, 0], [0, box_line[1], 0], [0, 0, box_line[2]]]
+    if len(box_line) == 9:
+        box[0][1] = box_line[3]
+        box[0][2] = box_line[4]
+        box[1][0] = box_line[5]
+        box[1][2] = box_line[6]
+        box[2][0] = box_line[7]
+        box[2][1] = box_line[8]
+
+    n = natoms
+    return AtomColumns(race=objects(['ATOM  '] * n), id=ids,
+                       orig_id=np.zeros(n, dtype=np.int64), name=name,
+                       altloc=objects([''] * n), resname=resname,
+                       chain_id=objects([' '] * n), resnr=resnr, x=x, v=v,
+                       occ=np.ones(n), bfac=np.zeros(n), symbol=symbol,
+                       long_name=long_name, unity='nm', box=box, title=title)
+
+
+def read_pdb(filename=None, pdbline=None):
+    """Reads the ATOM/HETATM records of a PDB file into AtomColumns
+    (coordinates in Angstrom).
+
+    Parameters
+    ----------
+    filename : str, optional
+        PDB file.
+    pdbline : str, optional
+        contents of a PDB file, instead of filename.
+
+    Returns
+    -------
+    cols : AtomColumns
+        besides the columns, ``ter`` is a boolean array that tells which
+        atoms come after a line containing 'TER' (or are on such a line),
+        and ``box`` is taken from the CRYST1 record.
+    """
+    from . import _pmx
+    if pdbline:
+        lines = _Lines(pdbline)
+    else:
+        with open(filename) as fp:
+            lines = _Lines(fp.read())
+
+    everything = np.arange(len(lines))
+    record = lines.field(everything, 0, 6)
+    rows = np.flatnonzero((lines.field(everything, 0, 4) == b'ATOM') |
+                          (record == b'HETATM'))
+    box = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
+    cryst = np.flatnonzero(record == b'CRYST1')
+    if len(cryst):
+        box = _pmx.box_from_cryst1(lines.line(cryst[-1]))
+
+    # lines with 'TER' anywhere in them, and whether there is one since
+    # the previous atom
+    buf = lines.buf
+    pos = np.flatnonzero((buf[:-2] == ord('T')) & (buf[1:-1] == ord('E')) &
+                         (buf[2:] == ord('R')))
+    nter = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.add.at(nter, np.searchsorted(lines.starts, pos, side='right'), 1)
+    nter = np.cumsum(nter)
+    ter = nter[rows + 1] > nter[np.concatenate([[0], rows[:-1] + 1])]
+
+    n = len(rows)
+    name, ncodes = _strings(lines.field(rows, 12, 16))
+    resname, rcodes = _strings(lines.field(rows, 17, 21))
+    x = np.column_stack([lines.field(rows, a, a + 8).astype(np.float64)
+                         for a in (30, 38, 46)])
+    symbol, _ = _strings(lines.field(rows, 70, 73))
+    long_name, symbol = _long_names_and_symbols(resname, rcodes,
+                                                name, ncodes, symbol)
+    return AtomColumns(race=_strings(lines.field(rows, 0, 6), False)[0],
+                       id=lines.field(rows, 6, 11).astype(np.int64),
+                       orig_id=np.zeros(n, dtype=np.int64), name=name,
+                       altloc=_strings(lines.field(rows, 16, 17), False)[0],
+                       resname=resname,
+                       chain_id=_strings(lines.field(rows, 21, 22), False)[0],
+                       resnr=_resnrs(lines.field(rows, 22, 27)),
+                       x=x.reshape(n, 3), v=None,
+                       occ=_floats(lines.field(rows, 54, 60), 1.),
+                       bfac=_floats(lines.field(rows, 61, 66), 0.),
+                       symbol=symbol, long_name=long_name,
+                       ter=ter, unity='A', box=box)
+
+
+# ==========================
+# Chain and residue building
+# ==========================
+def segment_starts(*keys):
+    """Returns the indices where any of the key columns changes value,
+    i.e. the starts of the runs of equal values, beginning with 0."""
+    n = len(keys[0])
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    change = np.zeros(n, dtype=bool)
+    change[0] = True
+    for k in keys:
+        change[1:] |= np.asarray(k[1:] != k[:-1], dtype=bool)
+    return np.flatnonzero(change)
+
+
+def make_atoms(cols, atom_class=Atom, **kwargs):
+    """Makes the Atom objects of the columns.
+
+    Parameters
+    ----------
+    cols : AtomColumns
+    atom_class : class, optional
+        Atom (default) or SlotAtom.
+    kwargs :
+        per-atom sequences of further attributes (e.g. molecule=...).
+
+    Returns
+    -------
+    atoms : list
+    """
+    n = len(cols)
+    if n == 0:
+        return []
+    attrs = {}
+    constants = {}
+    for f in cols.fields:
+        col = getattr(cols, f)
+        if col is None:
+            continue
+        if col.ndim == 1 and np.all(col == col[0]):
+            constants[f] = col[0].item() if col.dtype != object else col[0]
+        else:
+            attrs[f] = col.tolist()
+    for key, val in kwargs.items():
+        attrs[key] = val
+    if 'x' in attrs:
+        attrs['_x'] = attrs.pop('x')
+    keys = list(attrs)
+    values = [attrs[k] for k in keys]
+
+    # allocating many objects with the garbage collector on is slow
+    gcon = gc.isenabled()
+    gc.disable()
+    try:
+        atoms = []
+        append = atoms.append
+        if atom_class is Atom:
+            # copy a filled instance dictionary instead of setting one
+            # attribute at a time in Atom.__init__
+            template = Atom(unity=cols.unity).__dict__
+            template.update(constants)
+            copy = template.copy
+            update = dict.update
+            new = Atom.__new__
+            for row in zip(*values):
+                d = copy()
+                update(d, bonds=[], b13=[], b14=[], connected=[],
+                       neighbors=[], f=[], v=[0, 0, 0])
+                update(d, zip(keys, row))
+                a = new(Atom)
+                a.__dict__ = d
+                append(a)
+        else:
+            # set the slots behind the properties of SlotAtom directly,
+            # the new atoms are in no lookup index yet
+            slots = getattr(atom_class, '__slots__', ())
+            keys = ['_' + k if '_' + k in slots else k for k in keys]
+            for row in zip(*values):
+                a = atom_class(unity=cols.unity, **constants)
+                for k, val in zip(keys, row):
+                    setattr(a, k, val)
+                append(a)
+    finally:
+        if gcon:
+            gc.enable()
+    return atoms
+
+
+class _ObjectColumns(AtomColumns):
+    """AtomColumns of a list of atoms. A column is made from the atom
+    attributes the first time it is used."""
+
+    def __init__(self, atoms):
+        self.atoms = atoms
+        self.x = None
+        self.v = None
+
+    def __len__(self):
+        return len(self.atoms)
+
+    def __getattr__(self, name):
+        if name not in self.fields:
+            raise AttributeError(name)
+        values = [getattr(a, name, None) for a in self.atoms]
+        if name in ('id', 'orig_id', 'resnr') and \
+           all(type(v) is int for v in values):
+            col = np.array(values, dtype=np.int64)
+        else:
+            col = objects(values)
+        setattr(self, name, col)
+        return col
+
+
+def atom_columns(atoms):
+    """The opposite of make_atoms: AtomColumns of a list of atoms. The
+    columns (except x and v, which are None) are made from the atom
+    attributes when they are first used."""
+    return _ObjectColumns(atoms)
+
+
+def expand(values, counts):
+    """List with every value repeated as many times as given in counts,
+    e.g. the residue of each atom from the residues and their sizes."""
+    res = []
+    for val, k in zip(values, counts):
+        res += [val] * k
+    return res
+
+
+def moltypes(resnames):
+    """Molecule.assign_moltype for a list of residue names."""
+    cache = {}
+    res = []
+    for r in resnames:
+        if r not in cache:
+            if r in library._protein_residues_incl_pmx_mut:
+                cache[r] = 'protein'
+            elif r in library._dna_residues_incl_pmx_mut:
+                cache[r] = 'dna'
+            elif r in library._rna_residues_incl_pmx_mut:
+                cache[r] = 'rna'
+            elif r in library._water:
+                cache[r] = 'water'
+            elif r in library._ions:
+                cache[r] = 'ion'
+            else:
+                cache[r] = 'unknown'
+        res.append(cache[r])
+    return res
+
+
+# =======
+# Writing
+# =======
+def pdb_records(cols, bPDBTER=False, bAssignChainIDs=False, resnrlist=[]):
+    """Yields the ATOM/HETATM (and TER) lines of the atoms in the columns,
+    as Atomselection.writePDB writes them for Atom objects."""
+    n = len(cols)
+    race, ids, names, altloc, resname, chain_id, resnr, occ, bfac, symbol = \
+        [getattr(cols, f).tolist() for f in
+         ('race', 'id', 'name', 'altloc', 'resname', 'chain_id', 'resnr',
+          'occ', 'bfac', 'symbol')]
+    x = cols.x.tolist()
+    unity = cols.unity
+    chainID = chain_id[0]
+    for i in range(n):
+        if (bPDBTER is True) and (chain_id[i] != chainID):
+            yield 'TER'
+            chainID = chain_id[i]
+        if (len(resnrlist) > 0) and (resnr[i] not in resnrlist):
+            continue
+        if chain_id[i].startswith('pmx') and bAssignChainIDs is False:
+            cols.chain_id[i] = ''
+            chain_id[i] = ''
+        yield pdb_string(race[i], ids[i], names[i][:4], altloc[i],
+                         resname[i], chain_id[i], resnr[i], x[i], occ[i],
+                         bfac[i], symbol[i], unity)
+
+
+def gro_records(cols, fac=1.):
+    """Yields the number of atoms line and the atom lines of the columns,
+    as Atomselection.writeGRO writes them for Atom objects."""
+    n = len(cols)
+    yield "%5d" % n
+    x = (cols.x * fac).tolist()
+    resnr = cols.resnr.tolist()
+    ids = cols.id.tolist()
+    resname = cols.resname.tolist()
+    name = cols.name.tolist()
+    if cols.v is not None and cols.v[0][0] != 0.000:
+        fmt = "%5d%-5.5s%5.5s%5d%8.3f%8.3f%8.3f%8.4f%8.4f%8.4f"
+        v = cols.v.tolist()
+        for i in range(n):
+            yield fmt % ((resnr[i] % 100000, resname[i], name[i],
+                          ids[i] % 100000) + tuple(x[i]) + tuple(v[i]))
+    else:
+        fmt = "%5d%-5.5s%5.5s%5d%8.3f%8.3f%8.3f"
+        for i in range(n):
+            yield fmt % ((resnr[i] % 100000, resname[i], name[i],
+                          ids[i] % 100000) + tuple(x[i]))
@@ -1,14 +1,132 @@
+import os
 import numpy as np
-import sys
-from scipy.optimize import fmin
-import scipy.stats
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from scipy.special import logsumexp, expit
 from .utils import data2gauss
 
-__all__ = ['Jarz', 'JarzGauss', 'Crooks', 'BAR']
+__all__ = ['Jarz', 'JarzGauss', 'Crooks', 'BAR', 'RunningEstimates']
 
 # Constants
 kb = 0.00831447215   # kJ/(K*mol)
 
+# upper bound on the number of resampled work values held in memory at once
+# by the bootstrap engine (~32 MB per sample of float64)
+_BOOT_MAX_ELEMENTS = 2**22
+# default maximum number of bootstrap replicates per chunk. Chunks are the
+# unit of both the random streams and the work handed to parallel workers,
+# so this must not depend on the number of workers.
+_BOOT_CHUNK = 256
+
+
+def _sem(x):
+    '''Standard error of the mean, as scipy.stats.sem(x, ddof=1), without
+    the cost of importing scipy.stats.'''
+    x = np.asarray(x, dtype=float)
+    return np.std(x, ddof=1) / np.sqrt(len(x))
+
+
+# ===================
+# Bootstrap machinery
+# ===================
+def _seed_sequence(seed):
+    '''Returns a SeedSequence from None, an int, a SeedSequence, or a
+    Generator (from which fresh entropy is drawn).'''
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(seed.integers(2**63))
+    return np.random.SeedSequence(seed)
+
+
+def _resample(rng, samples, nboots, parametric=False):
+    '''Draws nboots resamples of each sample as a (nboots, n) array. For the
+    nonparametric bootstrap the samples are arrays of values resampled with
+    replacement; for the parametric one they are (mean, std, n) tuples of
+    the Gaussians to draw from.'''
+    if parametric is True:
+        return [rng.normal(loc=m, scale=s, size=(nboots, n))
+                for m, s, n in samples]
+    return [w[rng.integers(0, len(w), size=(nboots, len(w)))]
+            for w in samples]
+
+
+def _bootstrap_chunk(stat, samples, nboots, seed, parametric=False):
+    rng = np.random.default_rng(seed)
+    boots = _resample(rng, samples, nboots, parametric=parametric)
+    return np.asarray(stat(*boots), dtype=float)
+
+
+def _bootstrap(stat, samples, nboots, seed=None, chunksize=None,
+               parametric=False, n_jobs=1):
+    '''Bootstrap engine shared by all estimators.
+
+    The resample indices of all bootstrap replicates are drawn at once as a
+    (nboots, n) integer matrix per sample, and ``stat`` is evaluated over the
+    whole batch, i.e. it has to reduce along the last axis and return one
+    value per replicate. The replicates are processed in chunks of at most
+    ``chunksize`` rows to bound memory use; each chunk draws from its own
+    stream spawned from ``seed``, so results are reproducible for a given
+    seed and chunk size. With ``n_jobs``>1 the chunks are distributed over a
+    process pool; since the streams belong to the chunks and not to the
+    workers, the results do not depend on the number of workers.
+
+    Parameters
+    ----------
+    stat : callable
+        vectorized statistic, called as ``stat(*boots)`` with one
+        (nchunk, n) array per sample, returning an array of nchunk values.
+        It has to be picklable (e.g. a ``functools.partial`` of a module
+        level function or static method) when ``n_jobs``>1.
+    samples : list
+        arrays of values to resample, or (mean, std, n) tuples if
+        ``parametric`` is True.
+    nboots : int
+        number of bootstrap replicates.
+    seed : None, int, SeedSequence or Generator, optional
+        seed of the random number generator. Default is None (fresh entropy).
+    chunksize : int, optional
+        maximum number of replicates evaluated at once. Default is None,
+        which uses ``_BOOT_CHUNK`` replicates, or fewer to keep about
+        ``_BOOT_MAX_ELEMENTS`` resampled values in memory.
+    parametric : bool, optional
+        whether to draw from Gaussians instead of resampling with
+        replacement. Default is False.
+    n_jobs : int, optional
+        number of worker processes. Values smaller than one use all
+        available cores. Default is 1 (serial).
+
+    Returns
+    -------
+    stats : ndarray
+        the statistic for each of the nboots replicates.
+    '''
+    if parametric is True:
+        samples = [(float(m), float(s), int(n)) for m, s, n in samples]
+        nvals = sum(n for _, _, n in samples)
+    else:
+        samples = [np.asarray(w, dtype=float) for w in samples]
+        nvals = sum(len(w) for w in samples)
+
+    if chunksize is None:
+        chunksize = max(1, min(_BOOT_CHUNK,
+                               _BOOT_MAX_ELEMENTS // max(nvals, 1)))
+    chunks = [min(chunksize, nboots - i) for i in range(0, nboots, chunksize)]
+    seeds = _seed_sequence(seed).spawn(len(chunks))
+
+    if n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(chunks))
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            res = list(pool.map(partial(_bootstrap_chunk, stat, samples,
+                                        parametric=parametric),
+                                chunks, seeds))
+    else:
+        res = [_bootstrap_chunk(stat, samples, n, ss, parametric=parametric)
+               for n, ss in zip(chunks, seeds)]
+    return np.concatenate(res) if res else np.zeros(0)
+
 
 class Jarz:
     '''Jarzynski estimator. [1]_
@@ -33,6 +151,13 @@ class Jarz:
     nblocks : int, optional
         how many blocks to divide the input work values into for the estimation
         of the standard error. Default is one (do not estimate the error).
+    seed : None, int, SeedSequence or Generator, optional
+        seed for the random number generator used in the bootstrap. Pass a
+        value to get reproducible bootstrap errors. Default is None.
+    n_jobs : int, optional
+        number of processes to spread the bootstrap samples over; values
+        smaller than one use all cores. The results do not depend on it.
+        Default is 1.
 
     Examples
     --------
@@ -65,12 +190,15 @@ class Jarz:
         separating the input work values into groups/blocks.
     '''
 
-    def __init__(self, wf, wr, T=298.15, nboots=0, nblocks=1):
+    def __init__(self, wf, wr, T=298.15, nboots=0, nblocks=1, seed=None,
+                 n_jobs=1):
         self.wf = np.array(wf)
         self.wr = np.array(wr)
         self.T = float(T)
         self.nboots = nboots
         self.nblocks = nblocks
+        self.seed = seed
+        self.n_jobs = n_jobs
 
         # Calculate all Jarz properties available
         self.dg_for = self.calc_dg(w=self.wf, T=self.T, bReverse=False)
@@ -78,12 +206,17 @@ class Jarz:
         self.dg_mean = (self.dg_for + self.dg_rev) * 0.5
 
         if nboots > 0:
+            ss_for, ss_rev = _seed_sequence(seed).spawn(2)
             self.err_boot_for = self.calc_err_boot(w=self.wf, T=self.T,
                                                    nboots=self.nboots,
-                                                   bReverse=False)
+                                                   bReverse=False,
+                                                   seed=ss_for,
+                                                   n_jobs=self.n_jobs)
             self.err_boot_rev = self.calc_err_boot(w=self.wr, T=self.T,
                                                    nboots=self.nboots,
-                                                   bReverse=True)
+                                                   bReverse=True,
+                                                   seed=ss_rev,
+                                                   n_jobs=self.n_jobs)
 
         if nblocks > 1:
             self.err_blocks_for = self.calc_err_blocks(w=self.wf,
@@ -103,7 +236,7 @@ class Jarz:
         Parameters
         ----------
         w : array_like
-            array of work values.
+            array of work values. If 2D, one estimate is returned per row.
         T : float
             temperature in Kelvin.
         bReverse : bool, optional
@@ -113,7 +246,7 @@ class Jarz:
 
         Returns
         -------
-        dg : float
+        dg : float or ndarray
             estimate of the free energy difference.
         '''
 
@@ -123,16 +256,13 @@ class Jarz:
             c = -1.0
 
         beta = 1./(kb*T)
-        n = float(len(w))
-        mexp = 0.0
-        m = 0.0
-        m2 = 0.0
+        w = np.asarray(w, dtype=float)
+        n = float(w.shape[-1])
 
-        w = np.array(w)
-        median = np.median(w)
-        for i in w:
-            mexp = mexp + np.exp( -beta*c*i - (-beta*c*median) )
-#            mexp = mexp + np.exp(-beta*c*i)
+        # exponentials are shifted by the median to avoid overflow
+        median = np.median(w, axis=-1)
+        mexp = np.sum(np.exp(-beta*c*w - (-beta*c*median[..., None])),
+                      axis=-1)
 
         # Jarzynski estimator
         dg = c*median -kb*T*np.log(mexp) + kb*T*np.log(n)
@@ -140,7 +270,8 @@ class Jarz:
         return c * dg
 
     @staticmethod
-    def calc_err_boot(w, T, nboots, bReverse=False):
+    def calc_err_boot(w, T, nboots, bReverse=False, seed=None,
+                      chunksize=None, n_jobs=1):
         '''Calculates the standard error via bootstrap. The work values are
         resampled randomly with replacement multiple (nboots) times,
         and the Jarzinski free energy recalculated for each bootstrap samples.
@@ -159,23 +290,23 @@ class Jarz:
             True.
         nboots: int
             number of bootstrap samples to use for the error estimate.
+        seed : None, int, SeedSequence or Generator, optional
+            seed for the random number generator. Default is None.
+        chunksize : int, optional
+            maximum number of bootstrap samples evaluated at once. Default is
+            None (bounded automatically).
+        n_jobs : int, optional
+            number of processes the bootstrap samples are distributed over.
+            Default is 1.
 
         Returns
         ----------
         sderr : float
             the standard error of the estimate.
         '''
-        dg_boots = []
-        n = len(w)
-        for k in range(nboots):
-            sys.stdout.write('\r  Bootstrap (Std Err): iteration %s/%s'
-                             % (k+1, nboots))
-            sys.stdout.flush()
-
-            boot = np.random.choice(w, size=n, replace=True)
-            dg_boot = Jarz.calc_dg(w=boot, T=T, bReverse=bReverse)
-            dg_boots.append(dg_boot)
-        sys.stdout.write('\n')
+        dg_boots = _bootstrap(partial(Jarz.calc_dg, T=T, bReverse=bReverse),
+                              [w], nboots, seed=seed, chunksize=chunksize,
+                              n_jobs=n_jobs)
         err = np.std(dg_boots)
         return err
 
@@ -217,7 +348,7 @@ class Jarz:
             dg_blocks.append(dg_block)
 
         # get std err
-        err_blocks = scipy.stats.sem(dg_blocks, ddof=1)
+        err_blocks = _sem(dg_blocks)
 
         return err_blocks
 
@@ -246,6 +377,13 @@ class JarzGauss:
     nblocks : int, optional
         how many blocks to divide the input work values into for the estimation
         of the standard error. Default is one (do not estimate the error).
+    seed : None, int, SeedSequence or Generator, optional
+        seed for the random number generator used in the bootstrap. Pass a
+        value to get reproducible bootstrap errors. Default is None.
+    n_jobs : int, optional
+        number of processes to spread the bootstrap samples over; values
+        smaller than one use all cores. The results do not depend on it.
+        Default is 1.
 
     Examples
     --------
@@ -282,12 +420,15 @@ class JarzGauss:
         separating the input work values into groups/blocks.
     '''
 
-    def __init__(self, wf, wr, T=298.15, nboots=0, nblocks=1):
+    def __init__(self, wf, wr, T=298.15, nboots=0, nblocks=1, seed=None,
+                 n_jobs=1):
         self.wf = np.array(wf)
         self.wr = np.array(wr)
         self.T = float(T)
         self.nboots = nboots
         self.nblocks = nblocks
+        self.seed = seed
+        self.n_jobs = n_jobs
 
         # Calculate all Jarz properties available
         self.dg_for = self.calc_dg(w=self.wf, T=self.T, bReverse=False)
@@ -297,12 +438,17 @@ class JarzGauss:
         self.err_rev = self.calc_err(w=self.wr, T=self.T, bReverse=True)
 
         if nboots > 0:
+            ss_for, ss_rev = _seed_sequence(seed).spawn(2)
             self.err_boot_for = self.calc_err_boot(w=self.wf, T=self.T,
                                                    nboots=self.nboots,
-                                                   bReverse=False)
+                                                   bReverse=False,
+                                                   seed=ss_for,
+                                                   n_jobs=self.n_jobs)
             self.err_boot_rev = self.calc_err_boot(w=self.wr, T=self.T,
                                                    nboots=self.nboots,
-                                                   bReverse=True)
+                                                   bReverse=True,
+                                                   seed=ss_rev,
+                                                   n_jobs=self.n_jobs)
 
         if nblocks > 1:
             self.err_blocks_for = self.calc_err_blocks(w=self.wf,
@@ -322,7 +468,7 @@ class JarzGauss:
         Parameters
         ----------
         w : array_like
-            array of work values.
+            array of work values. If 2D, one estimate is returned per row.
         T : float
             temperature in Kelvin.
         bReverse : bool, optional
@@ -332,7 +478,7 @@ class JarzGauss:
 
         Returns
         -------
-        dg : float
+        dg : float or ndarray
             estimate of the free energy difference.
         '''
         beta = 1./(kb*T)
@@ -341,7 +487,9 @@ class JarzGauss:
         elif bReverse is True:
             c = -1.0
 
-        dg = np.mean(c*w) - (beta * np.var(c*w, ddof=1)) * 0.5
+        w = np.asarray(w, dtype=float)
+        dg = (np.mean(c*w, axis=-1) -
+              (beta * np.var(c*w, ddof=1, axis=-1)) * 0.5)
         return c * dg
 
     @staticmethod
@@ -375,7 +523,8 @@ class JarzGauss:
         return dg_stderr
 
     @staticmethod
-    def calc_err_boot(w, T, nboots, bReverse=False):
+    def calc_err_boot(w, T, nboots, bReverse=False, seed=None,
+                      chunksize=None, n_jobs=1):
         '''Calculates the standard error via bootstrap. The work values are
         resampled randomly with replacement multiple (nboots) times,
         and the Gaussian approximation for Jarzinski free energy
@@ -395,23 +544,24 @@ class JarzGauss:
             whether the work values provided are for the reverse transition.
             Default if False. If they are for the reverse transition, set it to
             True.
+        seed : None, int, SeedSequence or Generator, optional
+            seed for the random number generator. Default is None.
+        chunksize : int, optional
+            maximum number of bootstrap samples evaluated at once. Default is
+            None (bounded automatically).
+        n_jobs : int, optional
+            number of processes the bootstrap samples are distributed over.
+            Default is 1.
 
         Returns
         -------
         err : float
             standard error of the mean.
         '''
-        dg_boots = []
-        n = len(w)
-        for k in range(nboots):
-            sys.stdout.write('\r  Bootstrap (Std Err): iteration %s/%s'
-                             % (k+1, nboots))
-            sys.stdout.flush()
-
-            boot = np.random.choice(w, size=n, replace=True)
-            dg_boot = JarzGauss.calc_dg(boot, T, bReverse)
-            dg_boots.append(dg_boot)
-        sys.stdout.write('\n')
+        dg_boots = _bootstrap(partial(JarzGauss.calc_dg, T=T,
+                                      bReverse=bReverse),
+                              [w], nboots, seed=seed, chunksize=chunksize,
+                              n_jobs=n_jobs)
         err = np.std(dg_boots)
         return err
 
@@ -453,7 +603,7 @@ class JarzGauss:
             dg_blocks.append(dg_block)
 
         # get std err
-        err_blocks = scipy.stats.sem(dg_blocks, ddof=1)
+        err_blocks = _sem(dg_blocks)
 
         return err_blocks
 
@@ -486,6 +636,13 @@ class Crooks:
     nblocks : int, optional
         how many blocks to divide the input work values into for the estimation
         of the standard error. Default is one (do not estimate the error).
+    seed : None, int, SeedSequence or Generator, optional
+        seed for the random number generator used in the bootstrap. Pass a
+        value to get reproducible bootstrap errors. Default is None.
+    n_jobs : int, optional
+        number of processes to spread the bootstrap samples over; values
+        smaller than one use all cores. The results do not depend on it.
+        Default is 1.
 
     Examples
     --------
@@ -526,13 +683,15 @@ class Crooks:
 
     '''
 
-    def __init__(self, wf, wr, nboots=0, nblocks=1):
+    def __init__(self, wf, wr, nboots=0, nblocks=1, seed=None, n_jobs=1):
 
         # inputs
         self.wf = np.array(wf)
         self.wr = np.array(wr)
         self.nboots = nboots
         self.nblocks = nblocks
+        self.seed = seed
+        self.n_jobs = n_jobs
         # params of the gaussians
         self.mf, self.devf, self.Af = data2gauss(wf)
         self.mr, self.devr, self.Ar = data2gauss(wr)
@@ -541,12 +700,17 @@ class Crooks:
         self.dg, self.inters_bool = self.calc_dg(wf=self.wf, wr=self.wr)
 
         if nboots > 0:
+            ss_boot1, ss_boot2 = _seed_sequence(seed).spawn(2)
             self.err_boot1 = self.calc_err_boot1(m1=self.mf, s1=self.devf,
                                                  n1=len(wf), m2=self.mr,
                                                  s2=self.devr, n2=len(wr),
-                                                 nboots=nboots)
+                                                 nboots=nboots,
+                                                 seed=ss_boot1,
+                                                 n_jobs=self.n_jobs)
             self.err_boot2 = self.calc_err_boot2(wf=self.wf, wr=self.wr,
-                                                 nboots=nboots)
+                                                 nboots=nboots,
+                                                 seed=ss_boot2,
+                                                 n_jobs=self.n_jobs)
 
         if nblocks > 1:
             self.err_blocks = self.calc_err_blocks(self.wf, self.wr, nblocks)
@@ -598,12 +762,38 @@ class Crooks:
             dg = (m1 + m2) * 0.5
             return dg, False
 
+    @staticmethod
+    def _calc_dg_batch(wf, wr):
+        '''Vectorized version of calc_dg: returns one CGI estimate per row of
+        the 2D arrays wf and wr.'''
+        return Crooks._intersect(np.mean(wf, axis=-1), np.std(wf, axis=-1),
+                                 np.mean(wr, axis=-1), np.std(wr, axis=-1))
+
+    @staticmethod
+    def _intersect(m1, s1, m2, s2):
+        # intersection of the Gaussians with means m1, m2 and standard
+        # deviations s1, s2 (scalars or arrays), as chosen in calc_dg
+        with np.errstate(invalid='ignore', divide='ignore'):
+            p1 = m1/s1**2-m2/s2**2
+            p2 = np.sqrt(1/(s1**2*s2**2)*(m1-m2)**2 +
+                         2*(1/s1**2-1/s2**2)*np.log(s2/s1))
+            p3 = 1/s1**2-1/s2**2
+            x1 = (p1+p2)/p3
+            x2 = (p1-p2)/p3
+
+        # same choice of solution as in calc_dg (comparisons with nan are
+        # False, so those fall through to the average of the means)
+        in1 = (x1 > m1) & (x1 < m2) | (x1 > m2) & (x1 < m1)
+        in2 = (x2 > m1) & (x2 < m2) | (x2 > m2) & (x2 < m1)
+        return np.where(in1, x1, np.where(in2, x2, (m1 + m2) * 0.5))
+
     # Possible change of behaviour compared to the original script:
     # here it is not determined in advanced whether to take the intersection
     # or the mean, but for each bootstrap sample if the intersecion cannot
     # be taken, then the mean is used automatically.
     @staticmethod
-    def calc_err_boot1(m1, s1, n1, m2, s2, n2, nboots):
+    def calc_err_boot1(m1, s1, n1, m2, s2, n2, nboots, seed=None,
+                       chunksize=None, n_jobs=1):
         '''Calculates the standard error of the Crooks Gaussian Intersection
         via parametric bootstrap. Given the parameters of the forward and
         reverse Gaussian distributions, multiple (nboots) bootstrap samples
@@ -631,6 +821,14 @@ class Crooks:
             number of bootstrap samples to use for the error estimate.
             Parametric bootstrap is used where work values are resampled from
             two Gaussians.
+        seed : None, int, SeedSequence or Generator, optional
+            seed for the random number generator. Default is None.
+        chunksize : int, optional
+            maximum number of bootstrap samples evaluated at once. Default is
+            None (bounded automatically).
+        n_jobs : int, optional
+            number of processes the bootstrap samples are distributed over.
+            Default is 1.
 
         Returns
         ----------
@@ -638,18 +836,16 @@ class Crooks:
             the standard error of the estimate.
         '''
 
-        dg_boots = []
-        for k in range(nboots):
-            bootA = np.random.normal(loc=m1, scale=s1, size=n1)
-            bootB = np.random.normal(loc=m2, scale=s2, size=n2)
-
-            dg_boot, _ = Crooks.calc_dg(bootA, bootB)
-            dg_boots.append(dg_boot)
+        dg_boots = _bootstrap(Crooks._calc_dg_batch,
+                              [(m1, s1, n1), (m2, s2, n2)], nboots,
+                              seed=seed, chunksize=chunksize, parametric=True,
+                              n_jobs=n_jobs)
         err = np.std(dg_boots)
         return err
 
     @staticmethod
-    def calc_err_boot2(wf, wr, nboots):
+    def calc_err_boot2(wf, wr, nboots, seed=None, chunksize=None,
+                       n_jobs=1):
         '''Calculates the standard error of the Crooks Gaussian Intersection
         via non-parametric bootstrap. The work values are resampled randomly
         with replacement multiple (nboots) times, and the CGI free energy
@@ -665,6 +861,14 @@ class Crooks:
             array of reverse work values.
         nboots: int
             number of bootstrap samples to use for the error estimate.
+        seed : None, int, SeedSequence or Generator, optional
+            seed for the random number generator. Default is None.
+        chunksize : int, optional
+            maximum number of bootstrap samples evaluated at once. Default is
+            None (bounded automatically).
+        n_jobs : int, optional
+            number of processes the bootstrap samples are distributed over.
+            Default is 1.
 
         Returns
         ----------
@@ -672,22 +876,8 @@ class Crooks:
             the standard error of the estimate.
         '''
 
-        nf = len(wf)
-        nr = len(wr)
-
-        dg_boots = []
-        for k in range(nboots):
-            sys.stdout.write('\r  Bootstrap (Std Err): iteration %s/%s'
-                             % (k+1, nboots))
-            sys.stdout.flush()
-
-            bootA = np.random.choice(wf, size=nf, replace=True)
-            bootB = np.random.choice(wr, size=nr, replace=True)
-
-            dg_boot, _ = Crooks.calc_dg(bootA, bootB)
-            dg_boots.append(dg_boot)
-
-        sys.stdout.write('\n')
+        dg_boots = _bootstrap(Crooks._calc_dg_batch, [wf, wr], nboots,
+                              seed=seed, chunksize=chunksize, n_jobs=n_jobs)
         err = np.std(dg_boots)
         return err
 
@@ -726,7 +916,7 @@ class Crooks:
             dg_blocks.append(dg_block)
 
         # get std err
-        err_blocks = scipy.stats.sem(dg_blocks, ddof=1)
+        err_blocks = _sem(dg_blocks)
 
         return err_blocks
 
@@ -751,6 +941,18 @@ class BAR:
     nblocks : int, optional
         how many blocks to divide the input work values into for the estimation
         of the standard error. Default is one (do not estimate the error).
+    seed : None, int, SeedSequence or Generator, optional
+        seed for the random number generator used in the bootstrap. Pass a
+        value to get reproducible bootstrap errors. Default is None.
+    n_jobs : int, optional
+        number of processes to spread the bootstrap samples over; values
+        smaller than one use all cores. The results do not depend on it.
+        Default is 1.
+    solver : {'fmin', 'brentq'}, optional
+        how to solve the BAR self-consistency equation. 'fmin' minimises the
+        squared residual with the Nelder-Mead simplex; 'brentq' finds the root
+        of the (monotone) log residual by bracketing, which is considerably
+        faster for large numbers of work values. Default is 'fmin'.
 
     Examples
     --------
@@ -779,12 +981,16 @@ class BAR:
 
     '''
 
-    def __init__(self, wf, wr, T, nboots=0, nblocks=1):
+    def __init__(self, wf, wr, T, nboots=0, nblocks=1, seed=None, n_jobs=1,
+                 solver='fmin'):
         self.wf = np.array(wf)
         self.wr = np.array(wr)
         self.T = float(T)
         self.nboots = nboots
         self.nblocks = nblocks
+        self.seed = seed
+        self.n_jobs = n_jobs
+        self.solver = solver
 
         self.nf = len(wf)
         self.nr = len(wr)
@@ -792,24 +998,27 @@ class BAR:
         self.M = kb * self.T * np.log(float(self.nf) / float(self.nr))
 
         # Calculate all BAR properties available
-        self.dg = self.calc_dg(self.wf, self.wr, self.T)
+        self.dg = self.calc_dg(self.wf, self.wr, self.T, solver=self.solver)
         self.err = self.calc_err(self.dg, self.wf, self.wr, self.T)
         self.conv = self.calc_conv(self.dg, self.wf, self.wr, self.T)
         if nboots > 0:
+            ss_err, ss_conv = _seed_sequence(seed).spawn(2)
             self.err_boot = self.calc_err_boot(self.wf, self.wr, nboots,
-                                               self.T)
+                                               self.T, seed=ss_err,
+                                               n_jobs=self.n_jobs)
             self.conv_err_boot = self.calc_conv_err_boot(self.dg, self.wf,
                                                          self.wr, nboots,
-                                                         self.T)
+                                                         self.T, seed=ss_conv,
+                                                         n_jobs=self.n_jobs)
         if nblocks > 1:
             self.err_blocks = self.calc_err_blocks(self.wf, self.wr, nblocks,
-                                                   self.T)
+                                                   self.T, solver=self.solver)
             self.conv_err_blocks = self.calc_conv_err_blocks(self.dg, self.wf,
                                                          self.wr, nblocks,
                                                          self.T)
 
     @staticmethod
-    def calc_dg(wf, wr, T):
+    def calc_dg(wf, wr, T, solver='fmin'):
         '''Estimates and returns the free energy difference.
 
         Parameters
@@ -820,6 +1029,10 @@ class BAR:
             array of reverse work values.
         T : float
             temperature
+        solver : {'fmin', 'brentq'}, optional
+            'fmin' minimises the squared self-consistency residual with the
+            Nelder-Mead simplex; 'brentq' finds the root of the log residual
+            by bracketing. Default is 'fmin'.
 
         Returns
         ----------
@@ -827,20 +1040,27 @@ class BAR:
             the BAR free energy estimate.
         '''
 
+        wf = np.asarray(wf, dtype=float)
+        wr = np.asarray(wr, dtype=float)
+        if solver == 'fmin':
+            return BAR._calc_dg_fmin(wf, wr, T)
+        elif solver == 'brentq':
+            return BAR._calc_dg_brentq(wf, wr, T)
+        else:
+            raise ValueError('unknown BAR solver "%s": choose from "fmin" '
+                             'and "brentq"' % solver)
+
+    @staticmethod
+    def _calc_dg_fmin(wf, wr, T):
+        from scipy.optimize import fmin
         nf = float(len(wf))
         nr = float(len(wr))
         beta = 1./(kb*T)
         M = kb * T * np.log(nf/nr)
 
         def func(x, wf, wr):
-            sf = 0
-            for v in wf:
-                sf += 1./(1+np.exp(beta*(M+v-x)))
-
-            sr = 0
-            for v in wr:
-                sr += 1./(1+np.exp(-beta*(M+v-x)))
-
+            sf = np.sum(1./(1+np.exp(beta*(M+wf-x))))
+            sr = np.sum(1./(1+np.exp(-beta*(M+wr-x))))
             r = sf-sr
             return r**2
 
@@ -849,8 +1069,96 @@ class BAR:
         x0 = (avA+avB)/2.
         dg = fmin(func, x0=x0, args=(wf, wr), disp=0)
 
+        return float(dg[0])
+
+    @staticmethod
+    def _log_fermi_sum(z):
+        # log(sum_i 1/(1+exp(z_i))) along the last axis. expit does not
+        # overflow; only where the sum underflows do we fall back to the
+        # (slower) log-sum-exp form.
+        s = np.sum(expit(-z), axis=-1)
+        low = s <= 1e-300
+        if not np.any(low):
+            return np.log(s)
+        with np.errstate(divide='ignore'):
+            return np.where(low, logsumexp(-np.logaddexp(0., z), axis=-1),
+                            np.log(s))
+
+    @staticmethod
+    def _log_residual(x, wf, wr, beta, M):
+        # log of the ratio of forward and reverse Fermi sums: monotonically
+        # increasing in x, hence a single root at the BAR estimate.
+        return (BAR._log_fermi_sum(beta*(M+wf-x)) -
+                BAR._log_fermi_sum(-beta*(M+wr-x)))
+
+    @staticmethod
+    def _calc_dg_brentq(wf, wr, T, xtol=1e-10, x0=None):
+        from scipy.optimize import brentq
+        nf = float(len(wf))
+        nr = float(len(wr))
+        beta = 1./(kb*T)
+        M = kb * T * np.log(nf/nr)
+        args = (wf, wr, beta, M)
+
+        # bracket the root: below all work values the residual is negative,
+        # above all of them it is positive. Widen the bracket until it is.
+        # With a guess x0 (e.g. a previous estimate) start from a narrow
+        # bracket around it instead.
+        if x0 is None:
+            lo = min(wf.min(), wr.min()) + M
+            hi = max(wf.max(), wr.max()) + M
+            width = max(hi - lo, 1./beta)
+        else:
+            width = 1./beta
+            lo = x0 - width
+            hi = x0 + width
+        while BAR._log_residual(lo, *args) > 0:
+            lo -= width
+            width *= 2
+        while BAR._log_residual(hi, *args) < 0:
+            hi += width
+            width *= 2
+
+        dg = brentq(BAR._log_residual, lo, hi, args=args, xtol=xtol)
         return float(dg)
 
+    @staticmethod
+    def _calc_dg_batch(wf, wr, T, xtol=1e-10):
+        '''Solves the BAR equation for each row of the 2D arrays wf and wr
+        at once, by bisection on the monotone log residual.'''
+        nf = float(wf.shape[-1])
+        nr = float(wr.shape[-1])
+        beta = 1./(kb*T)
+        M = kb * T * np.log(nf/nr)
+
+        def residual(x):
+            return (BAR._log_fermi_sum(beta*(M+wf-x[:, None])) -
+                    BAR._log_fermi_sum(-beta*(M+wr-x[:, None])))
+
+        # per-row brackets, widened where needed as in _calc_dg_brentq
+        lo = np.minimum(wf.min(axis=-1), wr.min(axis=-1)) + M
+        hi = np.maximum(wf.max(axis=-1), wr.max(axis=-1)) + M
+        width = np.maximum(hi - lo, 1./beta)
+        bad = residual(lo) > 0
+        while np.any(bad):
+            lo = np.where(bad, lo - width, lo)
+            width = np.where(bad, width * 2, width)
+            bad = residual(lo) > 0
+        width = np.maximum(hi - lo, 1./beta)
+        bad = residual(hi) < 0
+        while np.any(bad):
+            hi = np.where(bad, hi + width, hi)
+            width = np.where(bad, width * 2, width)
+            bad = residual(hi) < 0
+
+        niter = int(np.ceil(np.log2(np.max(hi - lo) / xtol)))
+        for _ in range(max(niter, 0)):
+            mid = 0.5 * (lo + hi)
+            neg = residual(mid) < 0
+            lo = np.where(neg, mid, lo)
+            hi = np.where(neg, hi, mid)
+        return 0.5 * (lo + hi)
+
     @staticmethod
     def calc_err(dg, wf, wr, T):
         '''Calculates the analytical error estimate.
@@ -890,8 +1198,12 @@ class BAR:
         return err
 
     @staticmethod
-    def calc_err_boot(wf, wr, nboots, T):
-        '''Calculates the error by bootstrapping.
+    def calc_err_boot(wf, wr, nboots, T, *, seed=None, chunksize=None,
+                      n_jobs=1):
+        '''Calculates the error by bootstrapping. The BAR equation is solved
+        for all bootstrap samples at once by vectorized bisection, i.e. the
+        exact root is used irrespective of the solver chosen for ``dg``.
+        seed, chunksize and n_jobs can only be given as keywords.
 
         Parameters
         ----------
@@ -903,33 +1215,29 @@ class BAR:
             temperature
         nboots: int
             number of bootstrap samples.
+        seed : None, int, SeedSequence or Generator, optional
+            seed for the random number generator. Default is None.
+        chunksize : int, optional
+            maximum number of bootstrap samples evaluated at once. Default is
+            None (bounded automatically).
+        n_jobs : int, optional
+            number of processes the bootstrap samples are distributed over.
+            Default is 1.
 
         Returns
         ----------
         sderr : float
             the standard error of the estimate.
         '''
-
-        nf = len(wf)
-        nr = len(wr)
-        dg_boots = []
-        for k in range(nboots):
-            sys.stdout.write('\r  Bootstrap (Std Err): iteration %s/%s'
-                             % (k+1, nboots))
-            sys.stdout.flush()
-
-            bootA = np.random.choice(wf, size=nf, replace=True)
-            bootB = np.random.choice(wr, size=nr, replace=True)
-            dg_boot = BAR.calc_dg(bootA, bootB, T)
-            dg_boots.append(dg_boot)
-
-        sys.stdout.write('\n')
+        dg_boots = _bootstrap(partial(BAR._calc_dg_batch, T=T),
+                              [wf, wr], nboots, seed=seed,
+                              chunksize=chunksize, n_jobs=n_jobs)
         err_boot = np.std(dg_boots)
 
         return err_boot
 
     @staticmethod
-    def calc_err_blocks(wf, wr, nblocks, T):
+    def calc_err_blocks(wf, wr, nblocks, T, solver='fmin'):
         '''Calculates the standard error based on a number of blocks the
         work values are divided into. It is useful when you run independent
         equilibrium simulations, so that you can then use their respective
@@ -947,6 +1255,8 @@ class BAR:
             number of blocks to divide the data into. This can be for
             instance the number of independent equilibrium simulations
             you ran.
+        solver : {'fmin', 'brentq'}, optional
+            solver used for the BAR equation. Default is 'fmin'.
 
         Returns
         ----------
@@ -961,11 +1271,11 @@ class BAR:
 
         # calculate all dg
         for wf_block, wr_block in zip(wf_split, wr_split):
-            dg_block = BAR.calc_dg(wf_block, wr_block, T)
+            dg_block = BAR.calc_dg(wf_block, wr_block, T, solver=solver)
             dg_blocks.append(dg_block)
 
         # get std err
-        err_blocks = scipy.stats.sem(dg_blocks, ddof=1)
+        err_blocks = _sem(dg_blocks)
 
         return err_blocks
 
@@ -981,7 +1291,8 @@ class BAR:
         dg : float
             the BAR free energy estimate
         wf : array_like
-            array of forward work values.
+            array of forward work values. If 2D, one value is returned per
+            row.
         wr : array_like
             array of reverse work values.
         T : float
@@ -989,30 +1300,31 @@ class BAR:
 
         Returns
         ----------
-        conv : float
+        conv : float or ndarray
             convergence estimate.
         '''
 
-        wf = np.array(wf)
-        wr = np.array(wr)
+        wf = np.asarray(wf, dtype=float)
+        wr = np.asarray(wr, dtype=float)
 
         beta = 1./(kb*T)
-        nf = len(wf)
-        nr = len(wr)
+        nf = wf.shape[-1]
+        nr = wr.shape[-1]
         N = float(nf + nr)
 
         ratio_alpha = float(nf)/N
         ratio_beta = float(nr)/N
         bf = 1.0/(ratio_beta + ratio_alpha * np.exp(beta*(wf-dg)))
         tf = 1.0/(ratio_alpha + ratio_beta * np.exp(beta*(-wr+dg)))
-        Ua = (np.mean(tf) + np.mean(bf))/2.0
-        Ua2 = (ratio_alpha * np.mean(np.power(tf, 2)) +
-               ratio_beta * np.mean(np.power(bf, 2)))
+        Ua = (np.mean(tf, axis=-1) + np.mean(bf, axis=-1))/2.0
+        Ua2 = (ratio_alpha * np.mean(np.power(tf, 2), axis=-1) +
+               ratio_beta * np.mean(np.power(bf, 2), axis=-1))
         conv = (Ua-Ua2)/Ua
         return conv
 
     @staticmethod
-    def calc_conv_err_boot(dg, wf, wr, nboots, T):
+    def calc_conv_err_boot(dg, wf, wr, nboots, T, seed=None, chunksize=None,
+                           n_jobs=1):
         '''Calculates the error in the convergence measure by bootstrapping.
 
         Parameters
@@ -1027,6 +1339,14 @@ class BAR:
             temperature
         nboots: int
             number of bootstrap samples.
+        seed : None, int, SeedSequence or Generator, optional
+            seed for the random number generator. Default is None.
+        chunksize : int, optional
+            maximum number of bootstrap samples evaluated at once. Default is
+            None (bounded automatically).
+        n_jobs : int, optional
+            number of processes the bootstrap samples are distributed over.
+            Default is 1.
 
         Returns
         ----------
@@ -1034,20 +1354,9 @@ class BAR:
             the standard error of the convergence measure.
         '''
 
-        nf = len(wf)
-        nr = len(wr)
-        conv_boots = []
-        for k in range(nboots):
-            sys.stdout.write('\r  Bootstrap (Conv): '
-                             'iteration %s/%s' % (k+1, nboots))
-            sys.stdout.flush()
-
-            bootA = np.random.choice(wf, size=nf, replace=True)
-            bootB = np.random.choice(wr, size=nr, replace=True)
-            conv_boot = BAR.calc_conv(dg, bootA, bootB, T)
-            conv_boots.append(conv_boot)
-
-        sys.stdout.write('\n')
+        conv_boots = _bootstrap(partial(BAR.calc_conv, dg, T=T),
+                                [wf, wr], nboots, seed=seed,
+                                chunksize=chunksize, n_jobs=n_jobs)
         err = np.std(conv_boots)
         return err
 
@@ -1091,7 +1400,176 @@ class BAR:
             conv_blocks.append(conv_block)
 
         # get std err
-        err_blocks = scipy.stats.sem(conv_blocks, ddof=1)
+        err_blocks = _sem(conv_blocks)
 
         return err_blocks
 
+
+# ====================
+# Incremental analysis
+# ====================
+class _RunningWork:
+    '''Running state of the work values of one direction: count, mean and
+    sum of squared deviations (merged per batch with Chan's update), and the
+    log-sum-exp of the Jarzynski exponentials. The values themselves are
+    kept as well, for BAR and the bootstrap.'''
+
+    def __init__(self, T, bReverse=False):
+        self.beta = 1./(kb*T)
+        self.c = -1.0 if bReverse is True else 1.0
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.lse = -np.inf
+        self._chunks = []
+        self._values = np.zeros(0)
+
+    def add(self, w):
+        w = np.asarray(w, dtype=float).ravel()
+        if len(w) == 0:
+            return
+        nb = len(w)
+        mb = np.mean(w)
+        m2b = np.sum((w - mb)**2)
+        n = self.n + nb
+        d = mb - self.mean
+        self.mean += d * nb / n
+        self.m2 += m2b + d * d * self.n * nb / n
+        self.n = n
+        self.lse = np.logaddexp(self.lse, logsumexp(-self.beta*self.c*w))
+        self._chunks.append(w)
+
+    @property
+    def values(self):
+        if self._chunks:
+            self._values = np.concatenate([self._values] + self._chunks)
+            self._chunks = []
+        return self._values
+
+    def var(self, ddof=0):
+        return self.m2 / (self.n - ddof)
+
+    def jarz_dg(self):
+        # same as Jarz.calc_dg, from the running log-sum-exp
+        return self.c * -(self.lse - np.log(self.n)) / self.beta
+
+    def jarz_gauss_dg(self):
+        # same as JarzGauss.calc_dg
+        return self.mean - self.c * self.beta * self.var(ddof=1) * 0.5
+
+    def jarz_gauss_err(self):
+        # same as JarzGauss.calc_err
+        w_var = self.var(ddof=1)
+        n = float(self.n)
+        return np.sqrt(w_var/n + np.power(self.beta*w_var, 2) /
+                       (2.0 * (n-1.0)))
+
+
+class RunningEstimates:
+    '''Free energy estimates that are updated as work values come in.
+
+    Meant for monitoring transition campaigns that are still running: new
+    work values are added with :meth:`update`, and :meth:`summary` returns
+    the current CGI, BAR, Jarzynski and Jarzynski-Gaussian estimates without
+    recomputing the moments of the values seen before. The Gaussian and
+    Jarzynski estimators only use running sums; the BAR equation, which
+    depends on all work values, is re-solved with a root finder started from
+    the previous estimate, so few residual evaluations are needed per update.
+    The estimates agree with those of the :class:`Crooks`, :class:`BAR`,
+    :class:`Jarz` and :class:`JarzGauss` classes to numerical precision.
+
+    Parameters
+    ----------
+    T : float, optional
+        temperature in Kelvin. Default is 298.15 K.
+    nboots : int, optional
+        number of bootstrap samples for the bootstrap errors of each summary.
+        Unlike the estimates these are recomputed from all work values.
+        Default is zero (analytical errors only).
+    seed : None, int, SeedSequence or Generator, optional
+        seed for the random number generator used in the bootstrap.
+        Default is None.
+    n_jobs : int, optional
+        number of processes to spread the bootstrap samples over.
+        Default is 1.
+
+    Examples
+    --------
+    >>> est = RunningEstimates(T=298.15)
+    >>> est.update(wf=[1.2, 3.4], wr=[-2.1, -0.3])
+    >>> est.update(wf=[2.2])
+    >>> est.summary()['bar']['dg']
+    '''
+
+    def __init__(self, T=298.15, nboots=0, seed=None, n_jobs=1):
+        self.T = float(T)
+        self.nboots = nboots
+        self.seed = seed
+        self.n_jobs = n_jobs
+        self.forward = _RunningWork(self.T, bReverse=False)
+        self.reverse = _RunningWork(self.T, bReverse=True)
+        self._bar_dg = None
+
+    @property
+    def nf(self):
+        return self.forward.n
+
+    @property
+    def nr(self):
+        return self.reverse.n
+
+    def update(self, wf=(), wr=()):
+        '''Adds forward and/or reverse work values.'''
+        self.forward.add(wf)
+        self.reverse.add(wr)
+
+    def summary(self):
+        '''Returns the current estimates as a dictionary, with entries
+        ``nf`` and ``nr`` and one dictionary per estimator ('cgi', 'bar',
+        'jarz', 'jarz_gauss'). The estimators are None as long as there are
+        fewer than two work values in either direction.'''
+        f, r = self.forward, self.reverse
+        res = {'nf': f.n, 'nr': r.n, 'cgi': None, 'bar': None, 'jarz': None,
+               'jarz_gauss': None}
+        if f.n < 2 or r.n < 2:
+            return res
+
+        if self.nboots > 0:
+            ss_cgi, ss_bar, ss_jf, ss_jr = _seed_sequence(self.seed).spawn(4)
+        boot = dict(nboots=self.nboots, n_jobs=self.n_jobs)
+
+        # CGI from the running means and (biased) standard deviations, as
+        # in data2gauss
+        sf = np.sqrt(f.var())
+        sr = np.sqrt(r.var())
+        dg = Crooks._intersect(f.mean, sf, r.mean, sr)
+        res['cgi'] = {'dg': float(dg), 'mf': float(f.mean),
+                      'devf': float(sf), 'mr': float(r.mean),
+                      'devr': float(sr)}
+        if self.nboots > 0:
+            res['cgi']['err_boot'] = float(Crooks.calc_err_boot2(
+                f.values, r.values, seed=ss_cgi, **boot))
+
+        wf, wr = f.values, r.values
+        dg = BAR._calc_dg_brentq(wf, wr, self.T, x0=self._bar_dg)
+        self._bar_dg = dg
+        res['bar'] = {'dg': dg, 'err': BAR.calc_err(dg, wf, wr, self.T),
+                      'conv': float(BAR.calc_conv(dg, wf, wr, self.T))}
+        if self.nboots > 0:
+            res['bar']['err_boot'] = float(BAR.calc_err_boot(
+                wf, wr, T=self.T, seed=ss_bar, **boot))
+
+        dg_for, dg_rev = float(f.jarz_dg()), float(r.jarz_dg())
+        res['jarz'] = {'dg_for': dg_for, 'dg_rev': dg_rev,
+                       'dg_mean': (dg_for + dg_rev) * 0.5}
+        if self.nboots > 0:
+            res['jarz']['err_boot_for'] = float(Jarz.calc_err_boot(
+                wf, self.T, bReverse=False, seed=ss_jf, **boot))
+            res['jarz']['err_boot_rev'] = float(Jarz.calc_err_boot(
+                wr, self.T, bReverse=True, seed=ss_jr, **boot))
+
+        res['jarz_gauss'] = {'dg_for': float(f.jarz_gauss_dg()),
+                             'dg_rev': float(r.jarz_gauss_dg()),
+                             'err_for': float(f.jarz_gauss_err()),
+                             'err_rev': float(r.jarz_gauss_err())}
+        return res
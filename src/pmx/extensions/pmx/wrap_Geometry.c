@@ -290,9 +290,20 @@ PyObject *wrap_box_to_cryst1( PyObject *self, PyObject *args)
 
 void Pyvec2rvec( PyObject *Ox, rvec x)
 {
-  x[XX] = PyFloat_AsDouble( PySequence_Fast_GET_ITEM(Ox, XX) );
-  x[YY] = PyFloat_AsDouble( PySequence_Fast_GET_ITEM(Ox, YY) );
-  x[ZZ] = PyFloat_AsDouble( PySequence_Fast_GET_ITEM(Ox, ZZ) );
+  int i;
+  if( PyList_Check(Ox) || PyTuple_Check(Ox) ) {
+    x[XX] = PyFloat_AsDouble( PySequence_Fast_GET_ITEM(Ox, XX) );
+    x[YY] = PyFloat_AsDouble( PySequence_Fast_GET_ITEM(Ox, YY) );
+    x[ZZ] = PyFloat_AsDouble( PySequence_Fast_GET_ITEM(Ox, ZZ) );
+  }
+  else {
+    /* any other sequence, e.g. a row of a numpy array */
+    for(i=0;i<DIM;i++){
+      PyObject *item = PySequence_GetItem(Ox, i);
+      x[i] = item ? PyFloat_AsDouble(item) : 0.;
+      Py_XDECREF(item);
+    }
+  }
 }
 
 real get_bond_contribution(PyObject *atom)
@@ -256,6 +256,26 @@ xdrfile_close(XDRFILE *xfp)
 	return ret; /* return 0 if ok */
 }
 
+long long
+xdrfile_tell(XDRFILE *xfp)
+{
+#ifdef _WIN32
+	return (long long) _ftelli64(xfp->fp);
+#else
+	return (long long) ftello(xfp->fp);
+#endif
+}
+
+int
+xdrfile_seek(XDRFILE *xfp, long long pos, int whence)
+{
+#ifdef _WIN32
+	return _fseeki64(xfp->fp, pos, whence);
+#else
+	return fseeko(xfp->fp, (off_t) pos, whence);
+#endif
+}
+
 
 
 int 
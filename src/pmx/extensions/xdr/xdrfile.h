@@ -140,6 +140,30 @@ extern "C"
 	int
 	xdrfile_close   (XDRFILE *       xfp);
 
+	/*! \brief Return the current position in the file, like ftell(), but
+	 *  with 64 bit offsets
+	 *
+	 *  \param xfp  Pointer to an abstract XDRFILE datatype
+	 *
+	 *  \return     Byte offset from the beginning of the file, -1 on error.
+	 */
+	long long
+	xdrfile_tell    (XDRFILE *       xfp);
+
+	/*! \brief Move to a position in the file, like fseek(), but with 64
+	 *  bit offsets
+	 *
+	 *  \param xfp     Pointer to an abstract XDRFILE datatype
+	 *  \param pos     Byte offset, relative to whence
+	 *  \param whence  SEEK_SET, SEEK_CUR or SEEK_END
+	 *
+	 *  \return        0 on success, non-zero on error.
+	 */
+	int
+	xdrfile_seek    (XDRFILE *       xfp,
+					 long long       pos,
+					 int             whence);
+
 
 
 
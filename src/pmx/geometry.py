@@ -44,8 +44,11 @@ Examples
 
 """
 
+import itertools
+import numpy as np
 from numpy import array, linalg, arccos, inner
 from . import _pmx as _p
+from . import library
 
 
 class Rotation:
@@ -169,13 +172,31 @@ def planarity(atom_list):
 
 
 def apply_fit_R(atoms, R):
+    _move_atoms(atoms, R, np.zeros(3))
+
+
+def _move_atoms(atoms, R, t):
+    """Sets the coordinates of the atoms to x.dot(R.T) + t."""
+    if not atoms:
+        return
+    xyz = np.array([a.x[:3] for a in atoms], dtype=np.float64)
+    transform(xyz, R, t)
+    for atom, row in zip(atoms, xyz.tolist()):
+        x = atom.x
+        x[0], x[1], x[2] = row
+
+
+def _fit_selection(cs1, cs2, sel):
+    """Fits the coordinates cs2 onto cs1 and moves the atoms of sel (an
+    Atomselection) the same way. Returns the RMSD of the fit."""
+    rmsd, R, t = kabsch(cs1, cs2)
+    xyz = sel._stored_coords()
+    if xyz is not None:
+        transform(xyz, R, t)
+    else:
+        _move_atoms(sel.atoms, R, t)
+    return rmsd
 
-    for atom in atoms:
-        x_old = list(map(lambda x: x, atom.x))
-        for r in range(3):
-            atom.x[r] = 0
-            for c in range(3):
-                atom.x[r] += R[r][c]*x_old[c]
 
 def center_vector( v ):
     vout = _p.center_vec( v )
@@ -187,37 +208,29 @@ def calc_fit_R( cs1, cs2, m ):
 
 
 def fit(model1, model2, atom_names=[]):
+    """Fits model2 onto model1, using the atoms with the given names or
+    all atoms. Returns the RMSD of the fitted atoms."""
     if atom_names:
         subset1 = model1.fetch_atoms(atom_names)
         subset2 = model2.fetch_atoms(atom_names)
-        cs1 = list(map(lambda a: a.x, subset1))
-        cs2 = list(map(lambda a: a.x, subset2))
+        cs1 = list(map(lambda a: a.x[:3], subset1))
+        cs2 = list(map(lambda a: a.x[:3], subset2))
     else:
-        cs1 = model1.coords()
-        cs2 = model2.coords()
+        cs1 = model1._coords_array()
+        cs2 = model2._coords_array()
 
     assert(len(cs1) == len(cs2))
-    m = list(map(lambda x: 1., cs1))  # dummy array
-    v = _p.center_vec(cs1)
-    v2 = _p.center_vec(cs2)
-    R = _p.calc_fit_R(cs1, cs2, m)
-    model2.translate([-v2[0], -v2[1], -v2[2]])
-    apply_fit_R(model2.atoms, R)
-    model2.translate(v)
+    return _fit_selection(cs1, cs2, model2)
 
 
 def fit_by_ndx(ref, model, ndx1, ndx2):
-    crd1 = list(map(lambda i: ref.atoms[i-1].x, ndx1))
-    crd2 = list(map(lambda i: model.atoms[i-1].x, ndx2))
+    """Fits model onto ref, using the atoms with the (1-based) indices
+    ndx2 of model and ndx1 of ref. Returns the RMSD of the fitted atoms."""
+    crd1 = ref._coords_array()[np.asarray(ndx1, dtype=np.intp) - 1]
+    crd2 = model._coords_array()[np.asarray(ndx2, dtype=np.intp) - 1]
 
     assert(len(crd1) == len(crd2))
-    m = list(map(lambda x: 1., crd1))  # dummy array
-    v = _p.center_vec(crd1)
-    v2 = _p.center_vec(crd2)
-    R = _p.calc_fit_R(crd1, crd2, m)
-    model.translate([-v2[0], -v2[1], -v2[2]])
-    apply_fit_R(model.atoms, R)
-    model.translate(v)
+    return _fit_selection(crd1, crd2, model)
 
 
 def translate_by_ndx(struct, ndx):
@@ -229,20 +242,356 @@ def translate_by_ndx(struct, ndx):
 
 
 def fit_atoms(fit_atoms1, fit_atoms2, rot_atoms2):
-
-    cs1 = list(map(lambda a: a.x, fit_atoms1))
-    cs2 = list(map(lambda a: a.x, fit_atoms2))
+    """Moves the atoms rot_atoms2 by the fit of fit_atoms2 onto
+    fit_atoms1. Returns the RMSD of the fitted atoms."""
+    cs1 = list(map(lambda a: a.x[:3], fit_atoms1))
+    cs2 = list(map(lambda a: a.x[:3], fit_atoms2))
     assert len(cs1) == len(cs2)
-    m = list(map(lambda x: 1., cs1))  # dummy array
-    v = _p.center_vec(cs1)
-    v2 = _p.center_vec(cs2)
-    R = _p.calc_fit_R(cs1, cs2, m)
-    for atom in rot_atoms2:
-        atom.x[0] -= v2[0]
-        atom.x[1] -= v2[1]
-        atom.x[2] -= v2[2]
-    apply_fit_R(rot_atoms2, R)
-    for atom in rot_atoms2:
-        atom.x[0] += v[0]
-        atom.x[1] += v[1]
-        atom.x[2] += v[2]
+    rmsd, R, t = kabsch(cs1, cs2)
+    _move_atoms(rot_atoms2, R, t)
+    return rmsd
+
+
+# ===============
+# Neighbor search
+# ===============
+def _wrap(x, box, inv):
+    """Fractional coordinates of x in [0, 1) and x put into the box."""
+    s = x.dot(inv)
+    s -= np.floor(s)
+    s[s >= 1.] = 0.
+    return s, s.dot(box)
+
+
+def _images(s, box, margin):
+    """Periodic images of the atoms with fractional coordinates s that are
+    within margin (in fractional units) of the box. Returns the atom
+    indices and the image coordinates."""
+    low = s < margin
+    high = s >= 1. - margin
+    index = []
+    pos = []
+    for shift in itertools.product((-1, 0, 1), repeat=3):
+        if shift == (0, 0, 0):
+            continue
+        near = np.ones(len(s), dtype=bool)
+        for k, n in enumerate(shift):
+            if n == 1:
+                near &= low[:, k]
+            elif n == -1:
+                near &= high[:, k]
+        w = np.flatnonzero(near)
+        index.append(w)
+        pos.append((s[w] + shift).dot(box))
+    return np.concatenate(index), np.concatenate(pos)
+
+
+def _tree_pairs(tree, other, cutoff):
+    m = tree.sparse_distance_matrix(other, cutoff, output_type='ndarray')
+    return m['i'].astype(np.intp), m['j'].astype(np.intp), m['v']
+
+
+def neighbor_pairs(x, cutoff, box=None, ref=None):
+    """Finds the pairs of atoms closer than cutoff.
+
+    Parameters
+    ----------
+    x : array_like
+        (N, 3) coordinates.
+    cutoff : float
+        distance cutoff, in the units of x.
+    box : array_like, optional
+        (3, 3) periodic box with the box vectors as rows (like Model.box),
+        in the units of x. Rectangular and triclinic boxes are possible.
+        If it is given, the minimum image distances are used; cutoff must
+        not be larger than half the shortest box height then.
+    ref : array_like, optional
+        (M, 3) reference coordinates. If it is given, the pairs between the
+        atoms of x and those of ref are searched, otherwise the pairs of
+        atoms within x.
+
+    Returns
+    -------
+    i : ndarray
+        indices in x.
+    j : ndarray
+        indices in ref, or in x with i < j if ref is not given.
+    d : ndarray
+        the distances.
+
+    The pairs are sorted by i, then j. They are found with a k-d tree
+    (scipy.spatial.cKDTree); in a box, the periodic images of the atoms
+    near the faces are added to it, which works for triclinic boxes too.
+
+    Examples
+    --------
+    >>> x = model.store_coords()
+    >>> box = np.array(model.box) * 10   # Model.box is in nm
+    >>> i, j, d = neighbor_pairs(x, 3.5, box=box)
+    """
+    from scipy.spatial import cKDTree
+    x = np.asarray(x, dtype=np.float64).reshape(-1, 3)
+    y = x if ref is None else \
+        np.asarray(ref, dtype=np.float64).reshape(-1, 3)
+    if cutoff <= 0:
+        raise ValueError('cutoff must be positive')
+    if len(x) == 0 or len(y) == 0:
+        return (np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp),
+                np.zeros(0))
+
+    if box is not None:
+        box = np.asarray(box, dtype=np.float64).reshape(3, 3)
+        inv = np.linalg.inv(box)
+        # the columns of inv are the reciprocal vectors, whose lengths are
+        # the inverse distances between opposite faces of the box
+        heights = 1. / np.linalg.norm(inv, axis=0)
+        if cutoff > 0.5 * heights.min():
+            raise ValueError('cutoff %g is larger than half the shortest '
+                             'box height %g' % (cutoff, heights.min()))
+        sx, x = _wrap(x, box, inv)
+        sy, y = (sx, x) if ref is None else _wrap(y, box, inv)
+
+    tree = cKDTree(x)
+    if ref is None:
+        pairs = tree.query_pairs(cutoff, output_type='ndarray')
+        # sorting first makes the coordinate lookups below sequential in i
+        key = pairs[:, 0].astype(np.intp) * len(x) + pairs[:, 1]
+        key.sort()
+        i, j = np.divmod(key, len(x))
+        d2 = np.zeros(len(key))
+        for xk in x.T.copy():
+            diff = xk[j] - xk[i]
+            d2 += diff * diff
+        d = np.sqrt(d2)
+    else:
+        i, j, d = _tree_pairs(tree, cKDTree(y), cutoff)
+
+    if box is not None:
+        # pairs across the box faces: since cutoff is at most half a box
+        # height, an atom has at most one image within cutoff of another
+        margin = cutoff / heights
+        index, pos = _images(sy, box, margin)
+        # only atoms near the faces can be close to an image
+        edge = np.flatnonzero(((sx < margin) | (sx >= 1. - margin))
+                              .any(axis=1))
+        if len(index) and len(edge):
+            ii, jj, dd = _tree_pairs(cKDTree(x[edge]), cKDTree(pos), cutoff)
+            ii, jj = edge[ii], index[jj]
+            if ref is None:
+                # every such pair is found from both atoms
+                keep = ii < jj
+                ii, jj, dd = ii[keep], jj[keep], dd[keep]
+            i, j, d = [np.concatenate(a) for a in ((i, ii), (j, jj),
+                                                   (d, dd))]
+
+    # the pairs within x are sorted already, the stable sort (timsort)
+    # merges the image pairs into them in linear time
+    order = np.argsort(i * len(y) + j, kind='stable')
+    return i[order], j[order], d[order]
+
+
+# ===============
+# Bond perception
+# ===============
+# bond contributions (A) of the elements, as used by the C code of
+# search_neighbors: two atoms are bonded if they are closer than the sum
+_bond_radii = library._bond_contr
+# all other elements, which works for most ions
+_default_bond_radius = 1.5
+
+
+def bond_radii(symbols):
+    """Bond contributions (A) of the elements in symbols, see bond_graph."""
+    radius = {}
+    for s in set(symbols):
+        key = str(s).upper() if s else ''
+        radius[s] = _bond_radii.get(key, _default_bond_radius)
+    return np.array([radius[s] for s in symbols], dtype=np.float64)
+
+
+def bond_graph(x, symbols, box=None):
+    """Bonds from the distances of the atoms.
+
+    Two atoms are bonded if they are closer than the sum of the bond
+    contributions of their elements, the criterion of
+    Atomselection.search_neighbors with build_bonds.
+
+    Parameters
+    ----------
+    x : array_like
+        (N, 3) coordinates in A.
+    symbols : sequence
+        the N element symbols (Atom.symbol), e.g. 'C' or 'CL'.
+    box : array_like, optional
+        (3, 3) periodic box in A, see neighbor_pairs.
+
+    Returns
+    -------
+    bonds : csr_matrix
+        symmetric (N, N) boolean adjacency matrix of the bond graph.
+        bonds.indices[bonds.indptr[i]:bonds.indptr[i+1]] are the atoms
+        bonded to atom i, in increasing order.
+    """
+    from scipy.sparse import csr_matrix
+    x = np.asarray(x, dtype=np.float64).reshape(-1, 3)
+    n = len(x)
+    if len(symbols) != n:
+        raise ValueError('%d symbols for %d atoms' % (len(symbols), n))
+    if n == 0:
+        return csr_matrix((0, 0), dtype=bool)
+    radius = bond_radii(symbols)
+    i, j, d = neighbor_pairs(x, 2. * radius.max(), box=box)
+    keep = d < radius[i] + radius[j]
+    i, j = i[keep], j[keep]
+    bonds = csr_matrix((np.ones(2 * len(i), dtype=bool),
+                        (np.concatenate([i, j]), np.concatenate([j, i]))),
+                       shape=(n, n))
+    bonds.sort_indices()
+    return bonds
+
+
+def bonded_neighbors(bonds):
+    """1-3 and 1-4 neighbors from a bond graph.
+
+    Parameters
+    ----------
+    bonds : sparse matrix
+        symmetric (N, N) adjacency matrix, e.g. from bond_graph.
+
+    Returns
+    -------
+    b13 : csr_matrix
+        the pairs of atoms two bonds apart that are not bonded.
+    b14 : csr_matrix
+        the pairs of atoms three bonds apart that are neither bonded nor
+        1-3 neighbors.
+
+    Both are symmetric boolean (N, N) matrices like bonds. The atoms are
+    found from the products of the adjacency matrix, so atoms in small
+    rings are only counted with the closest relation.
+    """
+    from scipy.sparse import csr_matrix, identity
+    a = csr_matrix(bonds, dtype=np.int32)
+    a.data[:] = 1
+    eye = identity(a.shape[0], dtype=np.int32, format='csr')
+    closer = (a + eye) > 0
+    a2 = a.dot(a)
+    b13 = (a2 > 0) > closer
+    closer = closer + b13
+    b14 = (a2.dot(a) > 0) > closer
+    b13.sort_indices()
+    b14.sort_indices()
+    return b13, b14
+
+
+# ===================
+# Array superposition
+# ===================
+def kabsch(ref, x, weights=None):
+    """Least squares superposition of coordinates with the Kabsch
+    algorithm (SVD of the covariance matrix).
+
+    Parameters
+    ----------
+    ref : array_like
+        (N, 3) reference coordinates, or (K, N, 3) to fit each set of x
+        onto its own reference.
+    x : array_like
+        (N, 3) coordinates to fit, or (K, N, 3) for K conformers that are
+        fitted in one call.
+    weights : array_like, optional
+        (N,) weights of the atoms, e.g. masses. By default all atoms have
+        the same weight.
+
+    Returns
+    -------
+    rmsd : float or ndarray
+        the (weighted) RMSD after the fit, an array of K values for
+        conformers.
+    R : ndarray
+        (3, 3) or (K, 3, 3) rotation matrices.
+    t : ndarray
+        (3,) or (K, 3) translations. The fitted coordinates are
+        x.dot(R.T) + t, see transform.
+
+    Examples
+    --------
+    >>> rmsd, R, t = kabsch(ref, confs)   # confs has shape (K, N, 3)
+    >>> best = np.argmin(rmsd)
+    >>> transform(confs, R, t)            # fit all of them in place
+    """
+    ref = np.asarray(ref, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    if ref.shape[-2:] != x.shape[-2:] or x.shape[-1] != 3:
+        raise ValueError('cannot fit coordinates of shape %s onto %s'
+                         % (x.shape, ref.shape))
+    if weights is None:
+        w = np.full(x.shape[-2], 1. / x.shape[-2])
+    else:
+        w = np.asarray(weights, dtype=np.float64)
+        w = w / w.sum()
+    wcol = w[:, None]
+    cref = (ref * wcol).sum(axis=-2)
+    cx = (x * wcol).sum(axis=-2)
+    yc = ref - cref[..., None, :]
+    xc = x - cx[..., None, :]
+    # covariance matrices and their SVDs, all conformers at once
+    cov = np.matmul(np.swapaxes(xc * wcol, -1, -2), yc)
+    u, s, vt = np.linalg.svd(cov)
+    # no reflections
+    sign = np.where(np.linalg.det(np.matmul(u, vt)) < 0, -1., 1.)
+    vt[..., 2, :] *= sign[..., None]
+    R = np.swapaxes(np.matmul(u, vt), -1, -2)
+    diff = np.matmul(xc, np.swapaxes(R, -1, -2)) - yc
+    rmsd = np.sqrt(np.einsum('...ni,...ni,n->...', diff, diff, w))
+    t = cref - np.matmul(R, cx[..., None])[..., 0]
+    return rmsd, R, t
+
+
+def transform(x, R, t):
+    """Applies rotations and translations from kabsch in place.
+
+    Parameters
+    ----------
+    x : ndarray
+        (M, 3) or (K, M, 3) float64 coordinates, e.g. the array returned
+        by Atomselection.store_coords. It is changed in place and
+        returned.
+    R : array_like
+        (3, 3) or (K, 3, 3) rotation matrices.
+    t : array_like
+        (3,) or (K, 3) translations.
+    """
+    R = np.asarray(R, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    x[...] = np.matmul(x, np.swapaxes(R, -1, -2)) + t[..., None, :]
+    return x
+
+
+def superpose(ref, x, index=None, weights=None):
+    """Fits x onto ref and moves all of x in place.
+
+    Parameters
+    ----------
+    ref : array_like
+        (N, 3) reference coordinates, or (K, N, 3), see kabsch.
+    x : ndarray
+        (M, 3) or (K, M, 3) float64 coordinates that are changed in
+        place.
+    index : array_like, optional
+        the N atoms of x that are fitted onto ref. By default all of
+        them (M = N).
+    weights : array_like, optional
+        (N,) weights of the fitted atoms.
+
+    Returns
+    -------
+    rmsd : float or ndarray
+        the RMSDs of the fitted atoms, see kabsch.
+    R : ndarray
+        the rotation matrices.
+    """
+    sub = x if index is None else x[..., index, :]
+    rmsd, R, t = kabsch(ref, sub, weights)
+    transform(x, R, t)
+    return rmsd, R
@@ -78,12 +78,16 @@ Some useful methods:
 
 """
 
+import gc
 import sys
 import copy
 import numpy as np
 from . import _pmx as _p
 from . import library
 from . import chain
+from .chain import _resid
+from .columns import (read_pdb, read_gro, segment_starts, make_atoms,
+                      expand, moltypes, objects, pdb_records, gro_records)
 from .atomselection import Atomselection
 from .molecule import Molecule
 from .atom import Atom
@@ -93,6 +97,24 @@ from string import digits
 __all__ = ['Model']
 
 
+class _materialized(object):
+    """Attribute of a Model that makes the Atom, Molecule and Chain objects
+    of a lazy Model when it is read. Once they are made, the value in the
+    instance dictionary is found first and this is not used anymore."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, model, cls=None):
+        if model is None:
+            return self
+        model.materialize()
+        try:
+            return model.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+
 class Model(Atomselection):
     """Model Class.
 
@@ -129,6 +151,24 @@ class Model(Atomselection):
     bPDBMASS : bool
         whether to guess masses from the atom library (will fail for
         complex atom naming, e.g. ND will not be interpreted as nitrogen)
+    coord_array : bool, optional
+        whether to keep the coordinates of all atoms in one (natoms, 3)
+        numpy array, see :meth:`store_coords`. Default is False.
+        Then atom.x is a numpy row of that array instead of a list, and
+        some list operations change meaning: ``atom.x + [v]`` adds
+        element-wise instead of concatenating, ``atom.x[:]`` is a view and
+        not a copy, and ``atom.x == y`` compares element-wise, so using it
+        in an ``if`` or ``atom.x in [...]`` raises ValueError. Use
+        ``atom.x.tolist()`` or ``list(atom.x)`` where a list is needed.
+    atom_class : class, optional
+        class of the atoms read from file: Atom (default) or the more
+        compact SlotAtom.
+    lazy : bool, optional
+        whether to keep the atoms read from file as column arrays (see
+        :attr:`columns`) and make the Atom, Molecule and Chain objects only
+        when atoms, residues, chains or chdic are used. Renumbering, scaling
+        the coordinates and writing PDB/GRO files work on the columns.
+        Default is False.
 
     Attributes
     ----------
@@ -149,11 +189,23 @@ class Model(Atomselection):
     moltype : str
         Type of system: protein, dna, rna, or unknown if organic molecule or
         a mix of molecules are in the system.
+    columns : AtomColumns
+        the atoms of a lazy Model as column arrays, None once the objects
+        are made (see :meth:`materialize`).
     """
+    # class of the atoms made when reading a file
+    atom_class = Atom
+    # columns of a lazy Model whose objects are not made yet
+    _columns = None
+    atoms = _materialized('atoms')
+    residues = _materialized('residues')
+    chains = _materialized('chains')
+    chdic = _materialized('chdic')
+
     def __init__(self, filename=None, pdbline=None, renumber_atoms=True,
                  renumber_residues=True, rename_atoms=False, scale_coords=None,
                  bPDBTER=True, bNoNewID=True, bPDBGAP=False, bPDBMASS=False,
-                 **kwargs):
+                 coord_array=False, lazy=False, **kwargs):
 
         Atomselection.__init__(self)
         self.title = 'PMX MODEL'
@@ -170,34 +222,38 @@ class Model(Atomselection):
             setattr(self, key, val)
 
         if filename is not None:
-            self.read(filename=filename, bPDBTER=bPDBTER, bNoNewID=bNoNewID, bPDBGAP=bPDBGAP, bPDBMASS=bPDBMASS)
+            self.read(filename=filename, bPDBTER=bPDBTER, bNoNewID=bNoNewID, bPDBGAP=bPDBGAP, bPDBMASS=bPDBMASS, lazy=lazy)
         if pdbline is not None:
-            self.__readPDB(pdbline=pdbline)
-        if self.atoms:
-            self.unity = self.atoms[0].unity
-            self.make_chains()
-            self.make_residues()
-        if self.residues and not self.atoms:
-            self.al_from_resl()
-            self.make_chains()
-            self.make_residues()
-        if self.chains and not self.residues:
-            self.resl_from_chains()
-            self.al_from_resl()
-            self.make_chains()
-            self.make_residues()
-        if self.chdic and not self.chains:
-            for key, val in self.chdic.items():
-                self.chains.append(val)
-            if not self.atoms and not self.residues:
+            self.__readPDB(pdbline=pdbline, lazy=lazy)
+        # the readers build the chains and residues themselves
+        if filename is None and pdbline is None:
+            if self.atoms:
+                self.unity = self.atoms[0].unity
+                self.make_chains()
+                self.make_residues()
+            if self.residues and not self.atoms:
+                self.al_from_resl()
+                self.make_chains()
+                self.make_residues()
+            if self.chains and not self.residues:
                 self.resl_from_chains()
                 self.al_from_resl()
+                self.make_chains()
+                self.make_residues()
+            if self.chdic and not self.chains:
+                for key, val in self.chdic.items():
+                    self.chains.append(val)
+                if not self.atoms and not self.residues:
+                    self.resl_from_chains()
+                    self.al_from_resl()
         if renumber_atoms is True:
             self.renumber_atoms()
         if renumber_residues is True:
             self.renumber_residues()
         if rename_atoms is True:
             self.rename_atoms_to_gmx()
+        if coord_array is True:
+            self.store_coords()
         if scale_coords is not None:
             if scale_coords == 'A':
                 self.nm2a()
@@ -210,10 +266,23 @@ class Model(Atomselection):
 
 
 
+    def __setattr__(self, name, value):
+        if self._columns is not None and \
+           isinstance(getattr(Model, name, None), _materialized):
+            self.materialize()
+        Atomselection.__setattr__(self, name, value)
+
     def __str__(self):
+        if self._columns is not None:
+            nchain = len(segment_starts(self._columns.chain_id))
+            nres = len(self.__residue_starts())
+            natom = len(self._columns)
+        else:
+            nchain = len(self.chains)
+            nres = len(self.residues)
+            natom = len(self.atoms)
         s = '< Model: moltype=%s, nchain=%d, nres=%d, natom=%d >' %\
-            (self.moltype, len(self.chains), len(self.residues),
-             len(self.atoms))
+            (self.moltype, nchain, nres, natom)
         return s
 
     def writePIR(self, filename, title=""):
@@ -362,30 +431,119 @@ class Model(Atomselection):
                 r.chain = ch
                 r.chain_id = ch.id
 
-    def __readPDB(self, fname=None, pdbline=None):
-        """Reads a PDB file"""
-        if pdbline:
-            lines = pdbline.split('\n')
+    @property
+    def columns(self):
+        return self._columns
+
+    def materialize(self):
+        """Makes the Atom, Molecule and Chain objects of a lazy Model. This
+        happens by itself when atoms, residues, chains or chdic are used."""
+        cols = self._columns
+        if cols is not None:
+            self._columns = None
+            self.atoms, self.residues, self.chains = [], [], []
+            self.chdic = {}
+            self.__build(cols)
+
+    def __residue_starts(self):
+        cols = self._columns
+        return segment_starts(cols.chain_id, cols.resnr)
+
+    def __from_columns(self, cols, lazy=False):
+        """Makes the atoms, chains and residues from AtomColumns, or keeps
+        the columns if lazy is True and the Model has no atoms yet."""
+        self.box = cols.box
+        self.unity = cols.unity
+        if lazy and len(cols) > 0 and self._columns is None and \
+           not self.atoms:
+            self._columns = cols
+            # so that reading them calls materialize
+            for name in ['atoms', 'residues', 'chains', 'chdic']:
+                self.__dict__.pop(name, None)
         else:
-            lines = open(fname, 'r').readlines()
-        for line in lines:
-            if line[:4] == 'ATOM' or line[:6] == 'HETATM':
-                a = Atom().readPDBString(line)
-                self.atoms.append(a)
-            if line[:6] == 'CRYST1':
-                self.box = _p.box_from_cryst1(line)
-        self.make_chains()
-        self.make_residues()
-        self.unity = 'A'
+            self.__build(cols)
+
+    def __build(self, cols):
+        """Does the same as make_chains and make_residues, but finds the
+        chain and residue boundaries on the columns."""
+        n = len(cols)
+        if n == 0:
+            return
+        chain_starts = segment_starts(cols.chain_id)
+        res_starts = segment_starts(cols.chain_id, cols.resnr)
+        # chain of each residue
+        res_chain = np.searchsorted(chain_starts, res_starts, side='right') - 1
+        resnames = cols.resname[res_starts].tolist()
+        resnrs = cols.resnr[res_starts].tolist()
+        types = moltypes(resnames)
+        chain_ids = cols.chain_id[chain_starts].tolist()
+        res_orig_ids = getattr(cols, 'res_orig_id', None)
+        if res_orig_ids is None:
+            res_orig_ids = [0] * len(res_starts)
+        else:
+            res_orig_ids = res_orig_ids[res_starts].tolist()
+
+        gcon = gc.isenabled()
+        gc.disable()
+        try:
+            chains = []
+            for cid in chain_ids:
+                ch = chain.Chain()
+                ch.id = cid
+                ch.model = self
+                chains.append(ch)
+            residues = []
+            template = Molecule().__dict__
+            template['model'] = self
+            new = Molecule.__new__
+            for resname, resnr, orig_id, moltype, k in zip(
+                    resnames, resnrs, res_orig_ids, types,
+                    res_chain.tolist()):
+                mol = new(Molecule)
+                d = template.copy()
+                d['resname'] = resname
+                d['id'] = resnr
+                d['orig_id'] = orig_id
+                d['moltype'] = moltype
+                d['chain'] = chains[k]
+                d['chain_id'] = chain_ids[k]
+                mol.__dict__ = d
+                residues.append(mol)
+            nres = np.diff(np.append(res_starts, n)).tolist()
+            nch = np.diff(np.append(chain_starts, n)).tolist()
+            atoms = make_atoms(
+                cols, self.atom_class,
+                molecule=expand(residues, nres),
+                chain=expand(chains, nch),
+                model=[self] * n)
+            bounds = res_starts.tolist() + [n]
+            for r, mol in enumerate(residues):
+                mol.atoms = atoms[bounds[r]:bounds[r+1]]
+            bounds = chain_starts.tolist() + [n]
+            for r, ch in enumerate(chains):
+                ch.atoms = atoms[bounds[r]:bounds[r+1]]
+            for mol, k in zip(residues, res_chain.tolist()):
+                chains[k].residues.append(mol)
+        finally:
+            if gcon:
+                gc.enable()
+        self.atoms.extend(atoms)
+        self.chains = chains
+        self.chdic = dict((ch.id, ch) for ch in chains)
+        self.residues = residues
+
+    def __readPDB(self, fname=None, pdbline=None, lazy=False):
+        """Reads a PDB file"""
+        self.__from_columns(read_pdb(fname, pdbline), lazy)
         return self
 
-    def __check_if_gap( self, atC, atN ):
-        if atC==None:
+    def __check_if_gap(self, xC, name, xN):
+        if xC is None:
             return(False)
-        if atN.name != 'N':
+        if name != 'N':
             return(False)
-        d = atC - atN
-        if d > 1.7: # bond 
+        d = _p.dist(xC, xN)
+        if d > 1.7: # bond
             return(True)
         return(False)
 
@@ -412,12 +570,15 @@ class Model(Atomselection):
         
     # TODO: make readPDB and readPDBTER a single function. It seems like
     # readPDBTER is more general PDB reader?
-    def __readPDBTER(self, fname=None, pdbline=None, bNoNewID=True, bPDBGAP=False, bPDBMASS=False):
+    def __readPDBTER(self, fname=None, pdbline=None, bNoNewID=True, bPDBGAP=False, bPDBMASS=False, lazy=False):
         """Reads a PDB file with more options than __readPDB ?"""
-        if pdbline:
-            lines = pdbline.split('\n')
-        else:
-            lines = open(fname, 'r').readlines()
+        cols = read_pdb(fname, pdbline)
+        chain_ids = cols.chain_id.tolist()
+        names = cols.name.tolist()
+        resnames = cols.resname.tolist()
+        resnrs = cols.resnr.tolist()
+        ter = cols.ter.tolist()
+        cols.orig_id = np.arange(1, len(cols)+1)
 
         chainIDstringInit = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnoprstuvwxyz123456789'
         chainIDstring = copy.deepcopy(chainIDstringInit)
@@ -428,84 +589,81 @@ class Model(Atomselection):
         prevResID = 0
         prevResName = ' '
         usedChainIDs = []
-        atomcount = 1
         prevCatom = None
 
-        for line in lines:
-            if 'TER' in line:
+        for i in range(len(cols)):
+            if ter[i]:
+                bNewChain = True
+            achain = chain_ids[i]
+            aname = names[i]
+            aresname = resnames[i]
+            aresnr = resnrs[i]
+            # identify chain change by ID (when no TER is there)
+            if (achain != prevID):
                 bNewChain = True
-            if (line[:4] == 'ATOM') or (line[:6] == 'HETATM'):
-                a = Atom().readPDBString(line, origID=atomcount)
-                atomcount += 1
-                # identify chain change by ID (when no TER is there)
-                if (a.chain_id != prevID):
-                    bNewChain = True
-                if (self.__check_if_gap( prevCatom,a )==True and bPDBGAP==True):
-                    bNewChain = True
-                if a.resname=='ACE' and prevResName!='ACE':
-                    bNewChain = True
-                if (a.resnr != prevResID):
-                    try:
-                        if self.__compareWithoutLastChar(prevResID,a.resnr)==True: # there are some special cases where residues are named, e.g. 52, 52A, 52B, ...
-                            bNewChain = False
-                        elif a.resnr != prevResID+1:
-                            bNewChain = True
-                        if (prevAtomName == 'OC2') or (prevAtomName == 'OXT') or (prevAtomName == 'OT2'):
-                            bNewChain = True
-                        if (prevAtomName == 'HH33') and ((prevResName=='NME') or (prevResName=='NAC') or (prevResName=='CT3')): # NME cap
-                            bNewChain = True
-                        # do not assign new chain IDs for waters, ions 
-                        if (a.resname=='WAT') or (a.resname=='SOL') or (a.resname=='TIP3') or (a.resname=='HOH') \
-                           or (a.resname=='NA') or (a.resname=='CL') \
-                           or (a.resname=='NaJ') or (a.resname=='Na') or (a.resname=='Cl') or (a.resname=='K') or (a.resname=='KJ') \
-                           or (a.resname=='MG') or (a.resname=='Mg') or (a.resname=='CA') or (a.resname=='Ca') or (a.resname=='CaJ') \
-                           or (a.resname=='ZN') or (a.resname=='Zn'): # add other ions when needed
-                            bNewChain = False
-                            chainID = ''
-                    except TypeError:
+            if (bPDBGAP==True and self.__check_if_gap(prevCatom, aname, cols.x[i].tolist())==True):
+                bNewChain = True
+            if aresname=='ACE' and prevResName!='ACE':
+                bNewChain = True
+            if (aresnr != prevResID):
+                try:
+                    if self.__compareWithoutLastChar(prevResID,aresnr)==True: # there are some special cases where residues are named, e.g. 52, 52A, 52B, ...
+                        bNewChain = False
+                    elif aresnr != prevResID+1:
+                        bNewChain = True
+                    if (prevAtomName == 'OC2') or (prevAtomName == 'OXT') or (prevAtomName == 'OT2'):
+                        bNewChain = True
+                    if (prevAtomName == 'HH33') and ((prevResName=='NME') or (prevResName=='NAC') or (prevResName=='CT3')): # NME cap
+                        bNewChain = True
+                    # do not assign new chain IDs for waters, ions 
+                    if (aresname=='WAT') or (aresname=='SOL') or (aresname=='TIP3') or (aresname=='HOH') \
+                       or (aresname=='NA') or (aresname=='CL') \
+                       or (aresname=='NaJ') or (aresname=='Na') or (aresname=='Cl') or (aresname=='K') or (aresname=='KJ') \
+                       or (aresname=='MG') or (aresname=='Mg') or (aresname=='CA') or (aresname=='Ca') or (aresname=='CaJ') \
+                       or (aresname=='ZN') or (aresname=='Zn'): # add other ions when needed
                         bNewChain = False
                         chainID = ''
-                prevID = a.chain_id
-                prevResID = a.resnr
-                prevAtomName = a.name
-                prevResName = a.resname
-                if a.name == 'C':
-                    prevCatom = a
-                if bNewChain==True:
-                    if ((a.chain_id==' ') or (a.chain_id==chainID) or (a.chain_id in usedChainIDs) and bNoNewID==False):
-                        # find a new chain id
-                        bFound = False
-                        while bFound==False:
-                            if len(chainIDstring)==0: # used up all the IDs
-                                chainIDstring = copy.deepcopy(chainIDstringInit)
-                                chainID = "pmxX"
-                                break
-                            foo = chainIDstring[0]
-                            chainIDstring = chainIDstring.lstrip(chainIDstring[0])
-                            if foo not in usedChainIDs:
-                                bFound=True
-                                chainID = foo
-                                if bNoNewID==True:
-                                    chainID = "pmx"+foo
-                                usedChainIDs.append(chainID)
-                    else:
-                        chainID = a.chain_id
-                        usedChainIDs.append(chainID)
-                a.chain_id = chainID
-                self.atoms.append(a)
-                bNewChain = False
-            if line[:6] == 'CRYST1':
-                self.box = _p.box_from_cryst1(line)
+                except TypeError:
+                    bNewChain = False
+                    chainID = ''
+            prevID = achain
+            prevResID = aresnr
+            prevAtomName = aname
+            prevResName = aresname
+            if aname == 'C':
+                prevCatom = cols.x[i].tolist()
+            if bNewChain==True:
+                if ((achain==' ') or (achain==chainID) or (achain in usedChainIDs) and bNoNewID==False):
+                    # find a new chain id
+                    bFound = False
+                    while bFound==False:
+                        if len(chainIDstring)==0: # used up all the IDs
+                            chainIDstring = copy.deepcopy(chainIDstringInit)
+                            chainID = "pmxX"
+                            break
+                        foo = chainIDstring[0]
+                        chainIDstring = chainIDstring.lstrip(chainIDstring[0])
+                        if foo not in usedChainIDs:
+                            bFound=True
+                            chainID = foo
+                            if bNoNewID==True:
+                                chainID = "pmx"+foo
+                            usedChainIDs.append(chainID)
+                else:
+                    chainID = achain
+                    usedChainIDs.append(chainID)
+            chain_ids[i] = chainID
+            bNewChain = False
 
         ##### now fix chain IDs that have been newly created #####
         newChainDict = {}
         chainIDstring = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnoprstuvwxyz123456789'
-        for a in self.atoms:
+        for i, cid in enumerate(chain_ids):
             # chain with a new ID
-            if 'pmx' in a.chain_id:
+            if 'pmx' in cid:
                 # this ID has already been encountered
-                if a.chain_id in newChainDict.keys():
-                    a.chain_id = newChainDict[a.chain_id]
+                if cid in newChainDict.keys():
+                    chain_ids[i] = newChainDict[cid]
                 # ID not yet encountered
                 else:
                     # find a suitable ID
@@ -513,8 +671,8 @@ class Model(Atomselection):
                     while bFound==False:
                         if len(chainIDstring)==0: # used up all the IDs
                             chainIDstring = copy.deepcopy(chainIDstringInit)
-                            newChainDict[a.chain_id] = "X"
-                            a.chain_id = "X"
+                            newChainDict[cid] = "X"
+                            chain_ids[i] = "X"
                             break
                         foo = chainIDstring[0]
                         chainIDstring = chainIDstring.lstrip(chainIDstring[0])
@@ -522,75 +680,22 @@ class Model(Atomselection):
                         if foo not in usedChainIDs:
                             bFound=True
                             usedChainIDs.append(foo)
-                            newChainDict[a.chain_id] = foo
-                            a.chain_id = foo
+                            newChainDict[cid] = foo
+                            chain_ids[i] = foo
 
-        self.make_chains()
-        self.make_residues()
-        self.unity = 'A'
+        cols.chain_id = np.array(chain_ids, dtype=object)
+        self.__from_columns(cols, lazy)
 
         if bPDBMASS==True:
             assign_masses_to_model( self )
 
         return self
 
-    def __readGRO(self, filename):
+    def __readGRO(self, filename, lazy=False):
         """Reads a GRO file"""
-        l = open(filename).readlines()
-        # first line is name/comment
-        name = l[0].rstrip()
-        self.title = name
-        # next line is number of atoms
-        natoms = int(l[1])
-        atoms_parsed = 0
-        while atoms_parsed != natoms:
-            line = l[atoms_parsed+2]
-            resid = int(line[:5])
-            resname = line[5:9].strip()
-            name = line[10:15].strip()
-            idx = int(line[15:20])
-            rest = line[20:].split()
-            assert len(rest) in [3, 6]
-            x = float(rest[0])
-            y = float(rest[1])
-            z = float(rest[2])
-            coords = [x, y, z]
-            if len(rest) == 6:
-                vx = float(rest[3])
-                vy = float(rest[4])
-                vz = float(rest[5])
-                vel = [vx, vy, vz]
-            else:
-                vel = [0, 0, 0]
-            a = Atom(id=idx, name=name, resname=resname,
-                     resnr=resid, x=coords, v=vel, unity='nm')
-            a.get_symbol()
-            self.atoms.append(a)
-            atoms_parsed += 1
-        box_line = [float(i) for i in l[-1].split()]
-        assert len(box_line) in [3, 9]
-        box = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
-        box[0][0] = box_line[0]
-        box[1][1] = box_line[1]
-        box[2][2] = box_line[2]
-        if len(box_line) == 3:
-            box[0][1] = 0
-            box[0][2] = 0
-            box[1][0] = 0
-            box[1][2] = 0
-            box[2][0] = 0
-            box[2][1] = 0
-        else:
-            box[0][1] = box_line[3]
-            box[0][2] = box_line[4]
-            box[1][0] = box_line[5]
-            box[1][2] = box_line[6]
-            box[2][0] = box_line[7]
-            box[2][1] = box_line[8]
-        self.box = box
-        self.make_chains()
-        self.make_residues()
-        self.unity = 'nm'
+        cols = read_gro(filename)
+        self.title = cols.title
+        self.__from_columns(cols, lazy)
         return self
 
     def assign_moltype(self):
@@ -598,7 +703,11 @@ class Model(Atomselection):
         If it is a mix, or if it is an organic molecule, "unknown" is
         assigned to self.moltype.
         """
-        residues = set([r.resname for r in self.residues])
+        if self._columns is not None:
+            residues = self._columns.resname[self.__residue_starts()]
+            residues = set(residues.tolist())
+        else:
+            residues = set([r.resname for r in self.residues])
 
         # do not consider water and ions
         residues -= library._water
@@ -615,7 +724,7 @@ class Model(Atomselection):
         else:
             self.moltype = 'unknown'
 
-    def read(self, filename, bPDBTER=False, bNoNewID=True, bPDBGAP=False, bPDBMASS=False):
+    def read(self, filename, bPDBTER=False, bNoNewID=True, bPDBGAP=False, bPDBMASS=False, lazy=False):
         """PDB/GRO file reader.
 
         Parameters
@@ -630,25 +739,95 @@ class Model(Atomselection):
             True. Default is True.
         bPDBGAP : bool
             whether search for gaps in the chain to assign new chain IDs.
+        lazy : bool, optional
+            whether to keep the atoms as columns and make the objects only
+            when they are used (see Model). Default is False.
         """
         ext = filename.split('.')[-1]
         if ext == 'pdb':
             if bPDBTER is True:
                 return self.__readPDBTER(fname=filename,
                                          pdbline=None,
-                                         bNoNewID=bNoNewID, bPDBGAP=bPDBGAP, bPDBMASS=bPDBMASS)
+                                         bNoNewID=bNoNewID, bPDBGAP=bPDBGAP, bPDBMASS=bPDBMASS,
+                                         lazy=lazy)
             else:
-                return self.__readPDB(fname=filename)
+                return self.__readPDB(fname=filename, lazy=lazy)
         elif ext == 'gro':
-            return self.__readGRO(filename)
+            return self.__readGRO(filename, lazy=lazy)
         else:
             raise IOError('ERROR: Can only read pdb or gro!')
 
     def renumber_residues(self):
         """Renumbers all residues from 1."""
+        cols = self._columns
+        if cols is not None:
+            starts = self.__residue_starts()
+            nres = np.diff(np.append(starts, len(cols)))
+            if getattr(cols, 'res_orig_id', None) is None:
+                cols.res_orig_id = cols.resnr
+            cols.resnr = np.repeat(np.arange(1, len(starts)+1), nres)
+            return
         for i, res in enumerate(self.residues):
             res.set_orig_resid(res.id)
             res.set_resid(i+1)
+        self.invalidate_indexes()
+
+    def renumber_atoms(self, start=1):
+        cols = self._columns
+        if cols is not None:
+            cols.orig_id = np.where(cols.orig_id == 0, cols.id, cols.orig_id)
+            cols.id = np.arange(1, len(cols)+1)
+            return
+        Atomselection.renumber_atoms(self, start)
+    renumber_atoms.__doc__ = Atomselection.renumber_atoms.__doc__
+
+    def _index_owners(self):
+        return [self] + self.chains + self.residues
+
+    def rename_atoms_to_gmx(self):
+        cols = self._columns
+        if cols is not None:
+            cols.name = objects([n[1:]+n[0] if n[0].isdigit() else n
+                                 for n in cols.name.tolist()])
+            return
+        Atomselection.rename_atoms_to_gmx(self)
+    rename_atoms_to_gmx.__doc__ = Atomselection.rename_atoms_to_gmx.__doc__
+
+    def a2nm(self):
+        cols = self._columns
+        if cols is not None:
+            if cols.unity != 'nm':
+                cols.x = cols.x * .1
+                cols.unity = self.unity = 'nm'
+            return
+        Atomselection.a2nm(self)
+
+    def nm2a(self):
+        cols = self._columns
+        if cols is not None:
+            if cols.unity != 'A':
+                cols.x = cols.x * 10.
+                cols.unity = self.unity = 'A'
+            return
+        Atomselection.nm2a(self)
+
+    def _atom_columns(self):
+        if self._columns is not None:
+            return self._columns
+        return Atomselection._atom_columns(self)
+
+    def _pdb_records(self, bPDBTER=False, bAssignChainIDs=False,
+                     resnrlist=[]):
+        if self._columns is not None:
+            return pdb_records(self._columns, bPDBTER, bAssignChainIDs,
+                               resnrlist)
+        return Atomselection._pdb_records(self, bPDBTER, bAssignChainIDs,
+                                          resnrlist)
+
+    def _gro_records(self, fac=1.):
+        if self._columns is not None:
+            return gro_records(self._columns, fac)
+        return Atomselection._gro_records(self, fac)
 
     # TODO/FIXME: should add/remove/append atoms all be only once in
     # Atomselection? At the moment they are repeated in Molecule, Chain,
@@ -782,6 +961,19 @@ class Model(Atomselection):
             Molecule instance of the residue found.
         """
 
+        if chain is None:
+            found = self._lookup('resid', self.residues, _resid)
+        elif chain in self.chdic:
+            ch = self.chdic[chain]
+            found = ch._lookup('resid', ch.residues, _resid)
+        else:
+            found = {}
+        found = found.get(idx, [])
+        if len(found) == 1 and _resid(found[0]) == idx:
+            return found[0]
+
+        # not found or not unique: scan the residues to give the same
+        # answer and errors as always
         #########################
         # generate some residue id lists
         valid_resids = []
@@ -869,16 +1061,10 @@ class Model(Atomselection):
         return result
 
     def al_from_resl(self):
-        self.atoms = []
-        for r in self.residues:
-            for atom in r.atoms:
-                self.atoms.append(atom)
+        self.atoms = [atom for r in self.residues for atom in r.atoms]
 
     def resl_from_chains(self):
-        self.residues = []
-        for ch in self.chains:
-            for r in ch.residues:
-                self.residues.append(r)
+        self.residues = [r for ch in self.chains for r in ch.residues]
 
     def copy(self):
         return copy.deepcopy(self)
@@ -61,16 +61,20 @@ Examples
 
 import sys
 import copy
+from operator import attrgetter
 from . import library
 from numpy import pi
 from .atomselection import Atomselection
-from .atom import Atom
+from .atom import (Atom, SlotAtom, _key_attribute, _key_changes,
+                   _key_indexes, _SHARED)
 from .rotamer import _aa_chi
 from .geometry import Rotation
 from .parser import readSection, parseList
 
 __all__ = ['Molecule']
 
+_atom_name = attrgetter('name')
+
 
 class Molecule(Atomselection):
     """Class for storing molecule/residue data.
@@ -93,6 +97,9 @@ class Molecule(Atomselection):
         the type of molecule/residue (protein, dna, rna, ion, water, or
         unknown).
     """
+    id = _key_attribute('id', 'resid')
+    # whether the residue is in a lookup index (see Atom._indexed)
+    _indexed = False
 
     def __init__(self, **kwargs):
         Atomselection.__init__(self)
@@ -433,6 +440,7 @@ class Molecule(Atomselection):
         self.id = resid
         for atom in self.atoms:
             atom.resnr = resid
+        self.invalidate_indexes()
 
     def set_orig_resid(self, resid):
         """Set the original residue/molecule ID."""
@@ -456,6 +464,34 @@ class Molecule(Atomselection):
         for atom in self.atoms:
             atom.chain_id = chain_id
 
+    def invalidate_indexes(self):
+        """Drops the lookup dictionaries of the Molecule and of the Chain
+        and Model it is part of."""
+        Atomselection.invalidate_indexes(self)
+        if self.chain is not None:
+            self.chain.invalidate_indexes()
+        if self.model is not None:
+            self.model.invalidate_indexes()
+
+    def _drop_indexes(self, names):
+        """Drops the lookup indexes in names of the Molecule and of the
+        Chain and Model it is part of."""
+        Atomselection._drop_indexes(self, names)
+        if self.chain is not None:
+            self.chain._drop_indexes(names)
+        if self.model is not None:
+            self.model._drop_indexes(names)
+
+    def _index_owners(self):
+        return (self, self.chain, self.model)
+
+    def _key_changed(self, key):
+        """Drops the lookup indexes that a change of the residue ID makes
+        out of date, see Atom._key_changed."""
+        self._drop_indexes(_key_indexes[key])
+        if self._indexed == _SHARED:
+            _key_changes[key] += 1
+
     def insert_atom(self, pos, atom, id=True):
         """Insert an atom at a certain position.
 
@@ -500,6 +536,7 @@ class Molecule(Atomselection):
                 self.model.atoms.insert(idx_model, atom)
             if self.chain is not None:
                 self.chain.atoms.insert(idx_chain, atom)
+            self.invalidate_indexes()
             if self.model is not None:
                 self.model.renumber_atoms()
 
@@ -524,9 +561,8 @@ class Molecule(Atomselection):
         result = []
         if how == 'byname':
             if not wildcard:
-                for atom in self.atoms:
-                    if atom.name == key:
-                        result.append(atom)
+                index = self._lookup('name', self.atoms, _atom_name)
+                return list(index.get(key, []))
             else:
                 for atom in self.atoms:
                     if key in atom.name:
@@ -555,10 +591,9 @@ class Molecule(Atomselection):
         """
         result = []
         if how == 'byname':
+            index = self._lookup('name', self.atoms, _atom_name)
             for key in keys:
-                for atom in self.atoms:
-                    if atom.name == key:
-                        result.append(atom)
+                result.extend(index.get(key, []))
         elif how == 'byelem':
             for atom in self.atoms:
                 if atom.symbol in keys:
@@ -590,6 +625,7 @@ class Molecule(Atomselection):
         del self.atoms[aidx]
         if have_chain:
             del self.chain.atoms[chidx]
+        self.invalidate_indexes()
         if have_model:
             del self.model.atoms[modidx]
             self.model.renumber_atoms()
@@ -602,7 +638,7 @@ class Molecule(Atomselection):
         atom : Atom
             Atom instance to append
         """
-        if not isinstance(atom, Atom):
+        if not isinstance(atom, (Atom, SlotAtom)):
             raise(TypeError, "%s is not an Atom instance" % str(atom))
         else:
             n = len(self.atoms)
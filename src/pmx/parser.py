@@ -44,6 +44,8 @@ Usage:
 [ begin ] and [ end ]
 """
 
+import re
+import numpy as np
 from collections import OrderedDict
 
 
@@ -156,15 +158,138 @@ def read_fasta(fn):
     return dic
 
 
+# lines starting with any of these carry no data in xvg files
+_XVG_SKIP = re.compile(rb'(?m)^[#@&]')
+
+
+def _skip_xvg_header(block):
+    """Returns the offset of the first data line in a block of xvg lines."""
+    pos = 0
+    while pos < len(block):
+        end = block.find(b'\n', pos)
+        if end == -1:
+            end = len(block)
+        line = block[pos:end]
+        if line[:1] not in (b'#', b'@', b'&') and line.split():
+            return pos
+        pos = end + 1
+    return len(block)
+
+
+def _parse_xvg_block(block, ncol, usecols):
+    """Parses a block of complete xvg lines into a list of column arrays."""
+    block = block[_skip_xvg_header(block):]
+    # single byte searches are cheap; only filter lines if a marker occurs
+    if ((b'#' in block or b'@' in block or b'&' in block) and
+            _XVG_SKIP.search(block)):
+        block = b'\n'.join(l for l in block.split(b'\n')
+                           if l[:1] not in (b'#', b'@', b'&'))
+    tokens = block.split()
+    if not tokens:
+        return [np.zeros(0) for c in usecols]
+    # fast path: every line has ncol values. Otherwise (blank or ragged
+    # lines) check line by line, which is slower but gives a proper error.
+    block = block.strip()
+    nrows = block.count(b'\n') + 1
+    if len(tokens) != nrows * ncol:
+        rows = [l.split() for l in block.split(b'\n')]
+        rows = [r for r in rows if r]
+        if any(len(r) != ncol for r in rows):
+            raise ValueError('inconsistent number of columns')
+    return [np.array(tokens[c::ncol], dtype=np.float64) for c in usecols]
+
+
+def read_xvg_data(fn, usecols=None, chunksize=2**18):
+    """Reads the numerical data of an xvg file into a float64 array.
+
+    Comment (#), formatting (@) and data set separator (&) lines are skipped.
+    The file is read and parsed in blocks of about ``chunksize`` bytes, so
+    memory use does not grow with the size of the file beyond the returned
+    array. A last line without a newline at its end is incomplete and is
+    left out, so files that are still being written can be read.
+
+    Parameters
+    ----------
+    fn : str
+        xvg file.
+    usecols : int or list of int, optional
+        which columns to return. Default is None (all columns).
+    chunksize : int, optional
+        number of bytes read at a time. Default is 256 kB.
+
+    Returns
+    -------
+    data : ndarray
+        array of shape (nrows, ncols), or (nrows,) if ``usecols`` is an int.
+
+    Raises
+    ------
+    ValueError
+        if a value cannot be converted to float, if the complete lines do not
+        all have the same number of columns, or if ``usecols`` is out of
+        range.
+    """
+    ncol = None
+    cols = None
+    columns = []
+    rest = b''
+    with open(fn, 'rb') as fp:
+        while True:
+            buf = fp.read(chunksize)
+            if buf:
+                buf = rest + buf
+                cut = buf.rfind(b'\n') + 1
+                if cut == 0:
+                    rest = buf
+                    continue
+                block, rest = buf[:cut], buf[cut:]
+            else:
+                # a last line without newline is being written, e.g. by a
+                # running simulation, and may be cut anywhere
+                block, rest = b'', b''
+
+            if ncol is None:
+                start = _skip_xvg_header(block)
+                end = block.find(b'\n', start)
+                first = block[start:end if end != -1 else len(block)]
+                if first.strip():
+                    ncol = len(first.split())
+                    if usecols is None:
+                        cols = list(range(ncol))
+                    elif isinstance(usecols, int):
+                        cols = [usecols]
+                    else:
+                        cols = list(usecols)
+                    if any(c >= ncol or c < -ncol for c in cols):
+                        raise ValueError('column out of range in %s' % fn)
+                    cols = [c % ncol for c in cols]
+            if ncol is not None:
+                columns.append(_parse_xvg_block(block, ncol, cols))
+
+            if not buf:
+                break
+
+    if ncol is None:
+        if isinstance(usecols, int):
+            return np.zeros(0)
+        return np.zeros((0, 0 if usecols is None else len(usecols)))
+    data = [np.concatenate(c) for c in zip(*columns)]
+    if isinstance(usecols, int):
+        return data[0]
+    return np.column_stack(data)
+
+
 def read_xvg(fn,  style='xy'):
-    l = open(fn).readlines()
-    l = kickOutComments(l, '@')
-    l = kickOutComments(l, '#')
-    l = kickOutComments(l, '&')
-    res = parseList('ff', l)
+    try:
+        data = read_xvg_data(fn)
+    except ValueError as e:
+        __parse_error(str(e), fn)
+    if data.size > 0 and data.shape[1] != 2:
+        __parse_error("Cannot convert line into format: ff", fn)
+    res = data.tolist()
     if style == 'list':
         return res
     else:
-        x = list(map(lambda a: a[0],  res))
-        y = list(map(lambda a: a[1],  res))
+        x = data[:, 0].tolist() if data.size > 0 else []
+        y = data[:, 1].tolist() if data.size > 0 else []
         return x,  y
@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+
+from pmx.estimators import Jarz, Crooks, BAR
+from pmx.analysis import read_dgdl_files
+from pmx.utils import natural_sort
+from pmx.scripts.cli import check_unknown_cmd
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from glob import glob
+import os
+import csv
+import time
+import argparse
+import numpy as np
+
+# Constants
+kb = 0.00831447215   # kJ/(K*mol)
+
+# columns of the results table, in order
+COLUMNS = ['edge', 'leg', 'replica', 'nA', 'nB',
+           'bar_dg', 'bar_err', 'bar_err_boot', 'bar_conv',
+           'cgi_dg', 'cgi_err_boot',
+           'jarz_dg_for', 'jarz_dg_rev', 'jarz_dg_mean',
+           'jarz_err_boot_for', 'jarz_err_boot_rev',
+           'units', 'error']
+
+
+# ==============================================================================
+#                               FUNCTIONS
+# ==============================================================================
+def read_manifest(fn):
+    '''Reads a manifest of the legs to analyse.
+
+    Every line holds five whitespace separated fields: edge, leg, replica,
+    and the dhdl.xvg files (a glob pattern) of the A->B and of the B->A
+    transitions. Lines starting with '#' are comments. Relative patterns
+    are taken relative to the directory of the manifest.
+
+    Returns
+    -------
+    tasks : list
+        list of (edge, leg, replica, patternA, patternB) tuples.
+    '''
+    root = os.path.dirname(os.path.abspath(fn))
+    tasks = []
+    with open(fn) as f:
+        for n, line in enumerate(f, 1):
+            line = line.split('#')[0].strip()
+            if not line:
+                continue
+            s = line.split()
+            if len(s) != 5:
+                raise ValueError('%s, line %d: expected "edge leg replica '
+                                 'fA fB", got "%s"' % (fn, n, line))
+            edge, leg, replica, fA, fB = s
+            tasks.append((edge, leg, replica,
+                          os.path.join(root, fA), os.path.join(root, fB)))
+    return tasks
+
+
+def discover_legs(workpath, legs=('water', 'protein')):
+    '''Finds the legs of all edges in a work path with the folder structure
+    used in the tutorials, i.e. the transitions of replica r of a leg are in
+    ``{edge}/{leg}/stateA/run{r}/transitions`` and
+    ``{edge}/{leg}/stateB/run{r}/transitions``.
+
+    Returns
+    -------
+    tasks : list
+        list of (edge, leg, replica, patternA, patternB) tuples.
+    '''
+    tasks = []
+    for edgepath in natural_sort(glob(os.path.join(workpath, '*', ''))):
+        edge = os.path.basename(os.path.normpath(edgepath))
+        for leg in legs:
+            runs = glob(os.path.join(edgepath, leg, 'stateA', 'run*'))
+            for runpath in natural_sort(runs):
+                run = os.path.basename(runpath)
+                fA = os.path.join(runpath, 'transitions', '*xvg')
+                fB = os.path.join(edgepath, leg, 'stateB', run,
+                                  'transitions', '*xvg')
+                tasks.append((edge, leg, run[3:], fA, fB))
+    return tasks
+
+
+def analyse_leg(task, seed=None, T=298.15, nboots=0, methods=('bar',),
+                bar_solver='fmin', sigmoid=0.0, reverseB=False,
+                unit_fact=1., units='kJ/mol'):
+    '''Integrates the dhdl.xvg files of one leg and runs the estimators.
+    Errors are reported in the 'error' column instead of being raised, so
+    that one broken leg does not stop the batch.
+
+    Returns
+    -------
+    row : dict
+        one row of the results table (see COLUMNS), energies in ``units``.
+    '''
+    edge, leg, replica, fA, fB = task
+    row = dict(edge=edge, leg=leg, replica=replica, units=units)
+    filesAB = natural_sort(glob(fA))
+    filesBA = natural_sort(glob(fB))
+    try:
+        if len(filesAB) == 0 or len(filesBA) == 0:
+            raise RuntimeError('no dhdl files found')
+        wf = read_dgdl_files(filesAB, lambda0=0, invert_values=False,
+                             verbose=False, sigmoid=sigmoid)
+        wr = read_dgdl_files(filesBA, lambda0=1, invert_values=reverseB,
+                             verbose=False, sigmoid=sigmoid)
+    except (RuntimeError, ValueError, OSError) as e:
+        row['error'] = str(e)
+        return row
+    row['nA'] = len(wf)
+    row['nB'] = len(wr)
+
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    ss_bar, ss_cgi, ss_jarz = seed.spawn(3)
+    if 'bar' in methods:
+        bar = BAR(wf, wr, T=T, nboots=nboots, seed=ss_bar, solver=bar_solver)
+        row['bar_dg'] = bar.dg * unit_fact
+        row['bar_err'] = bar.err * unit_fact
+        row['bar_conv'] = bar.conv
+        if nboots > 0:
+            row['bar_err_boot'] = bar.err_boot * unit_fact
+    if 'cgi' in methods:
+        cgi = Crooks(wf=wf, wr=wr, nboots=nboots, seed=ss_cgi)
+        row['cgi_dg'] = cgi.dg * unit_fact
+        if nboots > 0:
+            row['cgi_err_boot'] = cgi.err_boot2 * unit_fact
+    if 'jarz' in methods:
+        jarz = Jarz(wf=wf, wr=wr, T=T, nboots=nboots, seed=ss_jarz)
+        row['jarz_dg_for'] = jarz.dg_for * unit_fact
+        row['jarz_dg_rev'] = jarz.dg_rev * unit_fact
+        row['jarz_dg_mean'] = jarz.dg_mean * unit_fact
+        if nboots > 0:
+            row['jarz_err_boot_for'] = jarz.err_boot_for * unit_fact
+            row['jarz_err_boot_rev'] = jarz.err_boot_rev * unit_fact
+    return row
+
+
+def analyse_legs(tasks, nproc=1, seed=None, **kwargs):
+    '''Analyses many legs with a pool of nproc worker processes. Every leg
+    gets its own random stream spawned from seed, so the results do not
+    depend on nproc. Returns the rows in the order of tasks.'''
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    func = partial(analyse_leg, **kwargs)
+    if nproc > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=nproc) as pool:
+            return list(pool.map(func, tasks, seeds))
+    return [func(t, s) for t, s in zip(tasks, seeds)]
+
+
+def write_results(fn, rows):
+    '''Writes the rows to a CSV file with the columns in COLUMNS.'''
+    with open(fn, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+# ==============================================================================
+#                      COMMAND LINE OPTIONS AND MAIN
+# ==============================================================================
+def parse_options():
+
+    parser = argparse.ArgumentParser(description='Batch version of "pmx '
+            'analyse": estimates the free energy of all edges, legs and '
+            'replicas of a perturbation network in one process and writes '
+            'a single table of the results. The legs are given either in a '
+            'manifest file or found in a work path with the folder structure '
+            'of the tutorials.')
+
+    exclu = parser.add_mutually_exclusive_group(required=True)
+    exclu.add_argument('-i',
+                       metavar='manifest',
+                       dest='manifest',
+                       type=str,
+                       help='Manifest file with one leg per line: '
+                       '"edge leg replica fA fB", where fA and fB are '
+                       '(quoted) wildcards of the dhdl.xvg files of the '
+                       'A->B and B->A transitions.')
+    exclu.add_argument('-d',
+                       metavar='workpath',
+                       dest='workpath',
+                       type=str,
+                       help='Work path with the folder structure '
+                       '{edge}/{leg}/state{A,B}/run{r}/transitions/*xvg.')
+    parser.add_argument('--legs',
+                        metavar='',
+                        dest='legs',
+                        type=str,
+                        help='Legs to look for with -d. Default is "water '
+                        'protein".',
+                        default=['water', 'protein'],
+                        nargs='+')
+    parser.add_argument('-o',
+                        metavar='result file',
+                        dest='outfn',
+                        type=str,
+                        help='CSV file with the results. Default is '
+                        '"results.csv".',
+                        default='results.csv')
+    parser.add_argument('-m',
+                        metavar='method',
+                        type=str.lower,
+                        dest='methods',
+                        help='Choose one or more estimators to use from the '
+                        'available ones: CGI, BAR, JARZ. Default is BAR.',
+                        default=['bar'],
+                        nargs='+')
+    parser.add_argument('-t',
+                        metavar='temperature',
+                        dest='temperature',
+                        type=float,
+                        help='Temperature in Kelvin. Default is 298.15.',
+                        default=298.15)
+    parser.add_argument('-b',
+                        metavar='nboots',
+                        dest='nboots',
+                        type=int,
+                        help='Number of bootstrap samples to use for the '
+                        'bootstrap estimate of the standard errors. Default '
+                        'is 0 (no bootstrap).',
+                        default=0)
+    parser.add_argument('--seed',
+                        metavar='',
+                        dest='seed',
+                        type=int,
+                        help='Seed for the random number generator used in '
+                        'the bootstrap. Default is None (random).',
+                        default=None)
+    parser.add_argument('-nproc',
+                        metavar='nproc',
+                        dest='nproc',
+                        type=int,
+                        help='Number of worker processes the legs are '
+                        'distributed over. Default is 1.',
+                        default=1)
+    parser.add_argument('--reverseB',
+                        dest='reverseB',
+                        help='Whether to reverse the work values for the '
+                        'backward (B->A) transformation. Default is False.',
+                        default=False,
+                        action='store_true')
+    parser.add_argument('--units',
+                        metavar='',
+                        dest='units',
+                        type=str.lower,
+                        help='Units to report the results in: "kJ", "kcal", '
+                        'or "kT". Default is "kJ".',
+                        default='kj',
+                        choices=['kj', 'kcal', 'kt'])
+    parser.add_argument('--bar_solver',
+                        metavar='',
+                        dest='bar_solver',
+                        type=str.lower,
+                        help='Solver for the BAR equation: "fmin" or '
+                        '"brentq". Default is "fmin".',
+                        default='fmin',
+                        choices=['fmin', 'brentq'])
+    parser.add_argument('--sigmoid',
+                        metavar='',
+                        dest='sigmoid',
+                        type=float,
+                        help='Define a sigmoidal lambda path.',
+                        default=0.0)
+
+    args, unknown = parser.parse_known_args()
+    check_unknown_cmd(unknown)
+
+    return args
+
+
+def main(args):
+    """Run the main script.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        The command line arguments
+    """
+    stime = time.time()
+
+    T = args.temperature
+    if args.units == 'kj':
+        unit_fact, units = 1., 'kJ/mol'
+    elif args.units == 'kcal':
+        unit_fact, units = 1./4.184, 'kcal/mol'
+    else:
+        unit_fact, units = 1./(kb*T), 'kT'
+
+    if args.manifest is not None:
+        tasks = read_manifest(args.manifest)
+    else:
+        tasks = discover_legs(args.workpath, legs=args.legs)
+    if len(tasks) == 0:
+        exit('No legs to analyse found.')
+    print('Analysing %d legs with %d processes...' % (len(tasks), args.nproc))
+
+    rows = analyse_legs(tasks, nproc=args.nproc, seed=args.seed, T=T,
+                        nboots=args.nboots, methods=args.methods,
+                        bar_solver=args.bar_solver, sigmoid=args.sigmoid,
+                        reverseB=args.reverseB, unit_fact=unit_fact,
+                        units=units)
+    write_results(args.outfn, rows)
+
+    nfailed = sum(1 for r in rows if 'error' in r)
+    print('Results written to %s' % args.outfn)
+    if nfailed > 0:
+        print('  !! %d of %d legs could not be analysed, see the "error" '
+              'column' % (nfailed, len(rows)))
+    print('Execution time = %.1f s' % (time.time() - stime))
+
+
+def entry_point():
+    args = parse_options()
+    main(args)
+
+if __name__ == '__main__':
+    entry_point()
@@ -1,8 +1,9 @@
 #!/usr/bin/env python
 
 from pmx.parser import read_and_format
-from pmx.estimators import Jarz, JarzGauss, Crooks, BAR
+from pmx.estimators import Jarz, JarzGauss, Crooks, BAR, RunningEstimates
 from pmx.analysis import read_dgdl_files, plot_work_dist, ks_norm_test
+from pmx.analysis import WorkCache, DgdlWatcher
 from pmx.utils import natural_sort
 from pmx import __version__
 import sys
@@ -11,6 +12,7 @@ import time
 import numpy as np
 import pickle
 import argparse
+import json
 import warnings
 from pmx.scripts.cli import check_unknown_cmd
 
@@ -44,6 +46,62 @@ def _time_stats(seconds):
     return h, m, s
 
 
+def _scale_summary(summary, methods, unit_fact):
+    '''Converts the energies in a RunningEstimates summary to the output
+    units and keeps only the chosen estimators.'''
+    keep = {'cgi': ['cgi'], 'bar': ['bar'], 'jarz': ['jarz', 'jarz_gauss']}
+    res = {}
+    for m in methods:
+        for name in keep.get(m, []):
+            est = summary[name]
+            if est is not None:
+                est = dict((k, v if k == 'conv' else v*unit_fact)
+                           for k, v in est.items())
+            res[name] = est
+    return res
+
+
+def watch(args, unit_fact, units, cache=None):
+    '''Watch mode: polls the -fA/-fB files every args.watch seconds, adds
+    the work values of newly completed transitions to running estimates and
+    prints a one-line JSON status whenever they change.'''
+    kw = dict(sigmoid=args.sigmoid, nproc=args.nproc, cache=cache)
+    watchers = [DgdlWatcher(args.filesAB, lambda0=0, invert_values=False,
+                            **kw),
+                DgdlWatcher(args.filesBA, lambda0=1,
+                            invert_values=args.reverseB, **kw)]
+    est = RunningEstimates(T=args.temperature, nboots=args.nboots,
+                           seed=args.seed, n_jobs=args.nproc)
+    while True:
+        (wf, reset_f), (wr, reset_r) = [w.poll() for w in watchers]
+        if reset_f or reset_r:
+            # a longer transition appeared: start over from the files that
+            # are complete by the new standard
+            old = est
+            est = RunningEstimates(T=args.temperature, nboots=args.nboots,
+                                   seed=args.seed, n_jobs=args.nproc)
+            # the direction that did not reset keeps its values, plus
+            # those accepted in this poll
+            if reset_f is False:
+                wf = np.concatenate([old.forward.values, wf])
+            if reset_r is False:
+                wr = np.concatenate([old.reverse.values, wr])
+        if len(wf) > 0 or len(wr) > 0 or reset_f or reset_r:
+            est.update(wf=wf, wr=wr)
+            status = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                      'units': units}
+            status.update(_scale_summary(est.summary(), args.methods,
+                                         unit_fact))
+            status['nf'] = est.nf
+            status['nr'] = est.nr
+            print(json.dumps(status, separators=(',', ':')))
+            sys.stdout.flush()
+        if (args.watch_stop is not None and est.nf >= args.watch_stop and
+                est.nr >= args.watch_stop):
+            return est
+        time.sleep(args.watch)
+
+
 # ==============================================================================
 #                      COMMAND LINE OPTIONS AND MAIN
 # ==============================================================================
@@ -108,6 +166,22 @@ def parse_options():
                         'bootstrap estimate of the standard errors. Default '
                         'is 0 (no bootstrap).',
                         default=0)
+    parser.add_argument('--seed',
+                        metavar='',
+                        dest='seed',
+                        type=int,
+                        help='Seed for the random number generator used in '
+                        'the bootstrap, for reproducible bootstrap errors. '
+                        'Default is None (random).',
+                        default=None)
+    parser.add_argument('-nproc',
+                        metavar='nproc',
+                        dest='nproc',
+                        type=int,
+                        help='Number of processes to distribute the reading '
+                        'of the dhdl files and the bootstrap samples over. '
+                        'The results do not depend on it. Default is 1.',
+                        default=1)
     parser.add_argument('-n',
                         metavar='nblocks',
                         dest='nblocks',
@@ -194,6 +268,18 @@ def parse_options():
                         'for the reverse (B->A) tranformation. Default is '
                         '"integB.dat"',
                         default='integB.dat')
+    parser.add_argument('--cache',
+                        metavar='',
+                        dest='cache',
+                        type=str,
+                        nargs='?',
+                        const='',
+                        help='Cache the integrated work values in a .npz file, '
+                        'so that on re-analysis only new or modified dhdl '
+                        'files are read. If no file name is given, '
+                        '"integ_cache.npz" next to the -oA file is used. '
+                        'Default is no caching.',
+                        default=None)
     # The following are mutually exclusive options
     exclu1.add_argument('--skip',
                         metavar='',
@@ -264,6 +350,34 @@ def parse_options():
                         help='Minimal screen output.',
                         default=False,
                         action='store_true')
+    parser.add_argument('--bar_solver',
+                        metavar='',
+                        dest='bar_solver',
+                        type=str.lower,
+                        help='Solver for the BAR equation: "fmin" (Nelder-Mead '
+                        'simplex) or "brentq" (bracketing root finder, much '
+                        'faster for many work values). Default is "fmin".',
+                        default='fmin',
+                        choices=['fmin', 'brentq'])
+    parser.add_argument('--watch',
+                        metavar='',
+                        dest='watch',
+                        type=float,
+                        help='Watch mode for campaigns that are still '
+                        'running: every this many seconds, pick up newly '
+                        'completed dhdl files, update the estimates and '
+                        'print a one-line JSON status. Quote the -fA/-fB '
+                        'wildcards so that new files are found. '
+                        'Default is no watching.',
+                        default=None)
+    parser.add_argument('--watch_stop',
+                        metavar='',
+                        dest='watch_stop',
+                        type=int,
+                        help='In watch mode, stop once this many transitions '
+                        'in each direction have been analysed. Default is to '
+                        'watch until interrupted.',
+                        default=None)
     parser.add_argument('--sigmoid',
                         metavar='',
                         dest='sigmoid',
@@ -303,8 +417,14 @@ def main(args):
     integ_only = args.integ_only
     nboots = args.nboots
     nblocks = args.nblocks
+    seed = args.seed
+    nproc = args.nproc
     do_ks_test = args.do_ks_test
     quiet = args.quiet
+    bar_solver = args.bar_solver
+    cache = args.cache
+    if cache == '':
+        cache = os.path.join(os.path.dirname(args.oA), 'integ_cache.npz')
 
     # -------------------
     # Select output units
@@ -329,6 +449,21 @@ def main(args):
     print("# command = %s" % ' '.join(sys.argv), file=out)
     _tee(out, "\n", quiet=quiet)
 
+    # ==========
+    # Watch mode
+    # ==========
+    if args.watch is not None:
+        out.close()
+        if args.filesAB is None or args.filesBA is None:
+            exit('Watch mode needs dhdl.xvg files (-fA and -fB)')
+        if cache is not None:
+            cache = WorkCache(cache)
+        try:
+            watch(args, unit_fact, units, cache=cache)
+        except KeyboardInterrupt:
+            pass
+        return
+
     # ==========
     # Parse Data
     # ==========
@@ -387,12 +522,16 @@ def main(args):
             print('                   PROCESSING THE DATA')
             print(' ========================================================')
             print('  Forward Data')
+        if cache is not None:
+            cache = WorkCache(cache)
         res_ab = read_dgdl_files(filesAB, lambda0=0,
-                                 invert_values=False, verbose=not quiet, sigmoid=sigmoid)
+                                 invert_values=False, verbose=not quiet, sigmoid=sigmoid,
+                                 nproc=nproc, cache=cache)
         if quiet is False:
             print('  Reverse Data')
         res_ba = read_dgdl_files(filesBA, lambda0=1,
-                                 invert_values=reverseB, verbose=not quiet, sigmoid=sigmoid)
+                                 invert_values=reverseB, verbose=not quiet, sigmoid=sigmoid,
+                                 nproc=nproc, cache=cache)
 
         _dump_integ_file(args.oA, filesAB, res_ab)
         _dump_integ_file(args.oB, filesBA, res_ba)
@@ -460,7 +599,8 @@ def main(args):
         elif quiet is False:
             print('  Calculating Intersection...')
 
-        cgi = Crooks(wf=res_ab, wr=res_ba, nboots=nboots, nblocks=nblocks)
+        cgi = Crooks(wf=res_ab, wr=res_ba, nboots=nboots, nblocks=nblocks,
+                     seed=seed, n_jobs=nproc)
         if args.pickle is True:
             pickle.dump(cgi, open("cgi_results.pkl", "wb"))
 
@@ -525,9 +665,13 @@ def main(args):
         if quiet is True:
             print('Running BAR analysis...')
         elif quiet is False:
-            print('  Running Nelder-Mead Simplex algorithm... ')
+            if bar_solver == 'fmin':
+                print('  Running Nelder-Mead Simplex algorithm... ')
+            else:
+                print('  Running Brent root finder... ')
 
-        bar = BAR(res_ab, res_ba, T=T, nboots=nboots, nblocks=nblocks)
+        bar = BAR(res_ab, res_ba, T=T, nboots=nboots, nblocks=nblocks,
+                  seed=seed, n_jobs=nproc, solver=bar_solver)
         if args.pickle:
             pickle.dump(bar, open("bar_results.pkl", "wb"))
 
@@ -556,7 +700,8 @@ def main(args):
 
         if quiet is True:
             print('Running Jarz analysis...')
-        jarz = Jarz(wf=res_ab, wr=res_ba, T=T, nboots=nboots, nblocks=nblocks)
+        jarz = Jarz(wf=res_ab, wr=res_ba, T=T, nboots=nboots, nblocks=nblocks,
+                    seed=seed, n_jobs=nproc)
         if args.pickle:
             pickle.dump(jarz, open("jarz_results.pkl", "wb"))
 
@@ -583,7 +728,8 @@ def main(args):
         # -------------------------------------
         if quiet is True:
             print('Running Jarzynski Gaussian approximation analysis...')
-        jarzGauss = JarzGauss(wf=res_ab, wr=res_ba, T=T, nboots=nboots, nblocks=nblocks)
+        jarzGauss = JarzGauss(wf=res_ab, wr=res_ba, T=T, nboots=nboots,
+                              nblocks=nblocks, seed=seed, n_jobs=nproc)
         if args.pickle:
             pickle.dump(jarzGauss, open("jarz_gauss_results.pkl", "wb"))
 
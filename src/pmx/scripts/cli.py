@@ -19,6 +19,7 @@ class PmxCli:
         mutate        Mutate protein or DNA/RNA
         gentop        Fill hybrid topology with B states
         analyse       Estimate free energy from Gromacs xvg files
+        batchAnalyse  Estimate free energies of many edges at once
 
         atomMapping   Ligand alchemy: map atoms for morphing
         ligandHybrid  Ligand alchemy: hybrid structure/topology
@@ -55,6 +56,10 @@ class PmxCli:
         from . import analyze_dhdl
         analyze_dhdl.entry_point()
 
+    def batchAnalyse(self):
+        from . import analyze_batch
+        analyze_batch.entry_point()
+
     def atomMapping(self):
         from . import atomMapping
         atomMapping.entry_point()
@@ -85,7 +90,7 @@ def check_unknown_cmd(unknowns):
     commands are found.
     '''
     expected = ['pmx', 'analyse', 'mutate', 'doublebox', 'gentop', 'gmxlib',
-                'genlib', 'abfe', 'atomMapping', 'ligandHybrid']
+                'genlib', 'abfe', 'atomMapping', 'ligandHybrid', 'batchAnalyse']
 
     for cmd in unknowns:
         if cmd not in expected:
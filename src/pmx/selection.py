@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+
+"""Atom selection language.
+
+Selections are short strings such as ``"name CA and chain A"`` or
+``"resname SOL and within 6 of resid 42"``. A selection is compiled once
+into a :class:`Selection`, which evaluates to a boolean mask over the
+atoms with NumPy operations on column arrays (see
+:class:`pmx.columns.AtomColumns`) instead of a Python loop over Atom
+objects.
+
+Compiled selections are cached by their text (:func:`compile_selection`),
+and the masks of the parts that do not depend on coordinates are kept for
+the columns they were computed on. Evaluating a selection again with new
+coordinates, e.g. for every frame of a trajectory, only redoes the
+``within`` criteria.
+
+Keywords
+--------
+=====================  =================================================
+``name CA CB``         atom names
+``resname SOL HOH``    residue names
+``resid 42``           residue numbers; ``resid 1 to 10`` and
+                       ``resid 1-10`` select ranges
+``chain A B``          chain IDs
+``element C N``        elements (Atom.symbol)
+``id 1 to 100``        atom IDs
+``protein``, ``dna``,  residue types, as in Molecule.moltype
+``rna``, ``water``,
+``ion``
+``all``, ``none``      every atom, no atom
+``within 6 of X``      atoms closer than 6 to any atom of X, in the units
+                       of the coordinates
+``not``, ``and``,      logical operators and grouping
+``or``, ``( )``
+=====================  =================================================
+
+Names, residue names, chains and elements accept shell wildcards
+(``name H*``). ``not`` and ``within ... of`` apply to the term right after
+them; use parentheses to apply them to more. ``and`` binds stronger than
+``or``.
+
+Examples
+--------
+    >>> m = Model('conf.gro')
+    >>> wat = m.select('resname SOL and within 0.6 of resid 42')
+    >>> idx = m.select('name CA and chain A', indices=True)
+
+Evaluate the same selection on the frames of a trajectory:
+
+    >>> sel = compile_selection('water and within 0.5 of protein')
+    >>> for frame in Trajectory('traj.xtc'):
+    ...     idx = m.select(sel, x=frame.get_coords(), indices=True)
+
+"""
+
+import re
+import weakref
+import numpy as np
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from .columns import moltypes
+
+__all__ = ['Selection', 'compile_selection']
+
+
+# column of the AtomColumns each keyword selects on
+_string_fields = {'name': 'name', 'resname': 'resname', 'chain': 'chain_id',
+                  'element': 'symbol'}
+_number_fields = {'resid': 'resnr', 'id': 'id'}
+_moltypes = ('protein', 'dna', 'rna', 'water', 'ion')
+_reserved = set(['and', 'or', 'not', 'within', 'of', 'to', '(', ')', 'all',
+                 'none']) | set(_string_fields) | set(_number_fields) | \
+    set(_moltypes)
+_range = re.compile(r'^(-?\d+)-(-?\d+)$')
+
+# static masks per AtomColumns: {node: (columns used, mask)}
+_static_masks = weakref.WeakKeyDictionary()
+
+
+def _unique(col):
+    """The distinct values of a column as a list and the index of the
+    value of every atom in it."""
+    if col.dtype != object:
+        values, inverse = np.unique(col, return_inverse=True)
+        return values.tolist(), inverse
+    # strings, or residue numbers with insertion codes: a dictionary is
+    # faster than sorting the objects
+    values = {}
+    inverse = np.array([values.setdefault(v, len(values))
+                        for v in col.tolist()], dtype=np.intp)
+    return list(values), inverse
+
+
+class _Node(object):
+    """Part of a compiled selection. static is False if its mask depends
+    on the coordinates."""
+    static = True
+    # columns the mask is computed from
+    fields = ()
+
+    def mask(self, cols, coords):
+        if not self.static:
+            return self._mask(cols, coords)
+        arrays = tuple(getattr(cols, f) for f in self.fields)
+        cache = _static_masks.setdefault(cols, {})
+        entry = cache.get(self)
+        if entry is not None and len(entry[0]) == len(arrays) and \
+           all(a is b for a, b in zip(entry[0], arrays)):
+            return entry[1]
+        mask = self._mask(cols, coords)
+        cache[self] = (arrays, mask)
+        return mask
+
+
+class _All(_Node):
+
+    def __init__(self, value):
+        self.value = value
+
+    def _mask(self, cols, coords):
+        return np.full(len(cols), self.value, dtype=bool)
+
+
+class _Match(_Node):
+    """Atoms whose column value is one of a set of values or patterns."""
+
+    def __init__(self, field, test):
+        self.fields = (field,)
+        self.test = test
+
+    def _mask(self, cols, coords):
+        values, inverse = _unique(getattr(cols, self.fields[0]))
+        keep = np.array([self.test(v) for v in values], dtype=bool)
+        return keep[inverse] if len(keep) else np.zeros(len(inverse), bool)
+
+
+class _Moltype(_Node):
+    fields = ('resname',)
+
+    def __init__(self, moltype):
+        self.moltype = moltype
+
+    def _mask(self, cols, coords):
+        names, inverse = _unique(cols.resname)
+        keep = np.array(moltypes(names)) == self.moltype
+        return keep[inverse] if len(keep) else np.zeros(len(inverse), bool)
+
+
+class _Not(_Node):
+
+    def __init__(self, node):
+        self.node = node
+        self.static = node.static
+        self.fields = node.fields
+
+    def _mask(self, cols, coords):
+        return ~self.node.mask(cols, coords)
+
+
+class _And(_Node):
+    op = np.logical_and
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.static = all(n.static for n in nodes)
+        self.fields = sum([n.fields for n in nodes], ())
+
+    def _mask(self, cols, coords):
+        mask = self.nodes[0].mask(cols, coords)
+        for node in self.nodes[1:]:
+            mask = self.op(mask, node.mask(cols, coords))
+        return mask
+
+
+class _Or(_And):
+    op = np.logical_or
+
+
+class _Within(_Node):
+    static = False
+
+    def __init__(self, cutoff, node):
+        self.cutoff = cutoff
+        self.node = node
+
+    def _mask(self, cols, coords):
+        from scipy.spatial import cKDTree
+        ref = self.node.mask(cols, coords)
+        mask = np.zeros(len(cols), dtype=bool)
+        if not ref.any():
+            return mask
+        x = coords()
+        xref = x[ref]
+        # only atoms in the box around the reference atoms can be close
+        lo = xref.min(axis=0) - self.cutoff
+        hi = xref.max(axis=0) + self.cutoff
+        cand = np.flatnonzero(((x >= lo) & (x <= hi)).all(axis=1))
+        d, _ = cKDTree(xref).query(
+            x[cand], distance_upper_bound=np.nextafter(self.cutoff, np.inf))
+        mask[cand[d <= self.cutoff]] = True
+        return mask
+
+
+# ======
+# Parser
+# ======
+def _tokenize(text):
+    return re.findall(r'\(|\)|[^\s()]+', text)
+
+
+class _Parser(object):
+    """Recursive descent parser of the selection language."""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def error(self, msg):
+        return ValueError('%s in selection "%s"' % (msg, self.text))
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def next(self):
+        tok = self.peek()
+        if tok is None:
+            raise self.error('unexpected end')
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        if not self.tokens:
+            raise self.error('empty selection')
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise self.error('unexpected "%s"' % self.peek())
+        return node
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.peek() == 'or':
+            self.pos += 1
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else _Or(nodes)
+
+    def parse_and(self):
+        nodes = [self.parse_term()]
+        while self.peek() == 'and':
+            self.pos += 1
+            nodes.append(self.parse_term())
+        return nodes[0] if len(nodes) == 1 else _And(nodes)
+
+    def parse_term(self):
+        tok = self.next()
+        if tok == '(':
+            node = self.parse_or()
+            if self.peek() != ')':
+                raise self.error('missing ")"')
+            self.pos += 1
+            return node
+        if tok == 'not':
+            return _Not(self.parse_term())
+        if tok in ('all', 'none'):
+            return _All(tok == 'all')
+        if tok in _moltypes:
+            return _Moltype(tok)
+        if tok == 'within':
+            try:
+                cutoff = float(self.next())
+            except ValueError:
+                raise self.error('"within" needs a distance')
+            if self.next() != 'of':
+                raise self.error('missing "of" after "within %g"' % cutoff)
+            return _Within(cutoff, self.parse_term())
+        if tok in _string_fields:
+            return _Match(_string_fields[tok], self.strings(tok))
+        if tok in _number_fields:
+            return _Match(_number_fields[tok], self.numbers(tok))
+        raise self.error('unknown keyword "%s"' % tok)
+
+    def values(self, keyword):
+        values = []
+        while True:
+            tok = self.peek()
+            if tok == 'to' and values and not isinstance(values[-1], tuple):
+                self.pos += 1
+                values[-1] = (values[-1], self.next())
+            elif tok is not None and tok not in _reserved:
+                values.append(self.next())
+            else:
+                break
+        if not values:
+            raise self.error('no value after "%s"' % keyword)
+        return values
+
+    def strings(self, keyword):
+        values = self.values(keyword)
+        if any(isinstance(v, tuple) for v in values):
+            raise self.error('"to" used with "%s"' % keyword)
+        plain = set(v for v in values if not any(c in v for c in '*?['))
+        patterns = [v for v in values if v not in plain]
+
+        def test(value):
+            value = str(value)
+            return value in plain or \
+                any(fnmatchcase(value, p) for p in patterns)
+        return test
+
+    def numbers(self, keyword):
+        single = set()
+        ranges = []
+        for v in self.values(keyword):
+            m = _range.match(v) if not isinstance(v, tuple) else None
+            if m:
+                v = m.groups()
+            try:
+                if isinstance(v, tuple):
+                    ranges.append((int(v[0]), int(v[1])))
+                else:
+                    single.add(int(v))
+            except ValueError:
+                raise self.error('"%s" is not a number' % str(v))
+
+        def test(value):
+            # residue numbers with insertion codes are strings
+            if not isinstance(value, int):
+                try:
+                    value = int(value)
+                except ValueError:
+                    return False
+            return value in single or \
+                any(a <= value <= b for a, b in ranges)
+        return test
+
+
+class Selection(object):
+    """A compiled selection.
+
+    Parameters
+    ----------
+    text : str
+        the selection, see the module documentation for the syntax.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tree = _Parser(text).parse()
+
+    def __str__(self):
+        return self.text
+
+    def mask(self, cols, x=None):
+        """Evaluates the selection.
+
+        Parameters
+        ----------
+        cols : AtomColumns
+            columns of the atoms. name, resname, chain_id, symbol, resnr
+            and id are used as needed.
+        x : ndarray or callable, optional
+            (natoms, 3) coordinates, or a function returning them. It is
+            only used (or called) if the selection has a ``within``
+            criterion. By default cols.x.
+
+        Returns
+        -------
+        mask : ndarray
+            boolean array, True for the selected atoms.
+        """
+        if x is None:
+            x = cols.x
+        if callable(x):
+            coords = x
+        else:
+            def coords():
+                return np.asarray(x, dtype=np.float64)
+        return self.tree.mask(cols, coords)
+
+    def indices(self, cols, x=None):
+        """Indices of the selected atoms, see :meth:`mask`."""
+        return np.flatnonzero(self.mask(cols, x))
+
+
+@lru_cache(maxsize=256)
+def compile_selection(text):
+    """Returns the compiled :class:`Selection` for text. Selections are
+    cached, so calling this again with the same text is cheap."""
+    return Selection(text)
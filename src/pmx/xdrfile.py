@@ -31,14 +31,31 @@
 #
 
 import numpy as np
+from numpy.ctypeslib import ndpointer
 from ctypes import *
+import os
 import os.path
+import struct
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
 
 mTrr, mNumPy = 1, 2
-auto_mode = 0
+auto_mode = mNumPy
 out_mode = 42
 
 
+def _float32_array(ndim):
+    """ctypes argument type for C-contiguous float32 arrays that also
+    accepts None (passed on as a NULL pointer)."""
+    base = ndpointer(dtype=np.float32, ndim=ndim, flags='C_CONTIGUOUS')
+
+    def from_param(cls, obj):
+        if obj is None:
+            return obj
+        return base.from_param(obj)
+    return type(base.__name__, (base,), {'from_param': classmethod(from_param)})
+
+
 class Frame:
 
     def __init__(self, n, mode, x=None, box=None, units=None, v=None, f=None):
@@ -56,7 +73,9 @@ class Frame:
                     self.x[a][dim] = scale*x[i]
                     i += 1
         elif mode & mNumPy and mode != out_mode:
-            self.x = empty((n, 3), dtype=float32)
+            # buffers the C reader writes into directly; they are reused
+            # for every frame
+            self.x = np.empty((n, 3), dtype=np.float32)
         else:
             self.x = ((c_float*3)*n)()
 
@@ -64,8 +83,8 @@ class Frame:
         self.v_size = c_size_t(0)
         self.f_size = c_size_t(0)
         if mode&mNumPy and mode!=out_mode:
-            self.v=empty((n,3),dtype=float32)
-            self.f=empty((n,3),dtype=float32)
+            self.v=np.empty((n,3),dtype=np.float32)
+            self.f=np.empty((n,3),dtype=np.float32)
         else:
             self.v=c_size_t(0)#((c_float*3)*n)()
             self.f=c_size_t(0)#((c_float*3)*n)()
@@ -77,30 +96,62 @@ class Frame:
                 for c in range(0,3):
                     self.box[r][c] = box[r][c]
         elif mode&mNumPy and mode != out_mode:
-            self.box = empty((3, 3), float32)
+            self.box = np.empty((3, 3), np.float32)
         else:
             self.box = (c_float*3*3)()
 
     def update_box(self, box):
+        if isinstance(self.box, np.ndarray):
+            b = self.box.tolist()
+        else:
+            b = self.box
         for i in range(3):
             for k in range(3):
-                box[i][k] = self.box[i][k]
+                box[i][k] = b[i][k]
+
+    def get_coords(self, units='nm'):
+        """Returns the coordinates of the frame as a (natoms, 3) float64
+        array, in nm or, with units='A', in Angstrom."""
+        x = np.array(self.x, dtype=np.float64)
+        if units == 'A':
+            x *= 10
+        return x
 
     def update_atoms(self, atom_sel):
+        cols = getattr(atom_sel, 'columns', None)
+        if cols is not None:
+            # a lazy Model: write into its coordinate column
+            cols.x[:] = self.get_coords(units=cols.unity)
+            return
+        stored = getattr(atom_sel, '_stored_coords', None)
+        xyz = stored() if stored is not None else None
+        if xyz is not None:
+            # the coordinates are kept in one array: a single copy
+            np.multiply(self.x, 10 if atom_sel.unity == 'A' else 1, out=xyz)
+            return
+        if isinstance(self.x, np.ndarray):
+            # convert the whole block at once, then hand out the values
+            # (a flat list of floats, which creates no per-atom objects)
+            it = iter(self.get_coords(units=atom_sel.unity).ravel().tolist())
+            for atom, x0, x1, x2 in zip(atom_sel.atoms, it, it, it):
+                ax = atom.x
+                ax[0] = x0
+                ax[1] = x1
+                ax[2] = x2
+            return
+        scale = 10 if atom_sel.unity == 'A' else 1
         for i, atom in enumerate(atom_sel.atoms):
-            if atom_sel.unity == 'A':
-                atom.x[0] = self.x[i][0]*10
-                atom.x[1] = self.x[i][1]*10
-                atom.x[2] = self.x[i][2]*10
-            else:
-                atom.x[0] = self.x[i][0]
-                atom.x[1] = self.x[i][1]
-                atom.x[2] = self.x[i][2]
+            xi = self.x[i]
+            atom.x[0] = xi[0]*scale
+            atom.x[1] = xi[1]*scale
+            atom.x[2] = xi[2]*scale
 
     def update( self, atom_sel ):
-        if(len(atom_sel.atoms)!=self.natoms):
+        cols = getattr(atom_sel, 'columns', None)
+        natoms = len(cols) if cols is not None else len(atom_sel.atoms)
+        if(natoms!=self.natoms):
             raise ValueError("Model and Trajectory have different numbers of atoms: %d and %d"\
-                             %(len(atom_sel.atoms),self.natoms) )
+                             %(natoms,self.natoms) )
         self.update_atoms(atom_sel )
         self.update_box( atom_sel.box )
 
@@ -133,17 +184,177 @@ class Frame:
 
 
 
+# ==================
+# Frame offset index
+# ==================
+_XTC_MAGIC = 1995
+_XTC_HEADER = struct.Struct('>iiif')
+_TRR_HEADER = struct.Struct('>13i')
+# version of the sidecar index file format
+_INDEX_VERSION = 1
+
+
+def _scan_xtc(fp, size):
+    """Returns the offsets, steps and times of the frames of an xtc file by
+    reading the frame headers only. A truncated last frame is left out."""
+    offsets, steps, times = [], [], []
+    pos = 0
+    while pos < size:
+        fp.seek(pos)
+        # header, box, natoms, and for compressed frames precision,
+        # minint, maxint, smallidx and the number of bytes
+        buf = fp.read(92)
+        if len(buf) < 56:
+            break
+        magic, natoms, step, time = _XTC_HEADER.unpack_from(buf)
+        if magic != _XTC_MAGIC:
+            raise IOError("Not an xtc frame at byte %d" % pos)
+        if natoms <= 9:
+            fsize = 56 + 12*natoms
+        elif len(buf) < 92:
+            break
+        else:
+            nbytes = struct.unpack_from('>i', buf, 88)[0]
+            fsize = 92 + 4*((nbytes + 3) // 4)
+        if pos + fsize > size:
+            break
+        offsets.append(pos)
+        steps.append(step)
+        times.append(time)
+        pos += fsize
+    return offsets, steps, times
+
+
+def _trr_headers(fp, size):
+    """Reads the frame headers of a trr file. Returns a list with one tuple
+    per frame: (offset, frame size, header size, natoms, step, time,
+    lambda, float size, block sizes), where the block sizes are those of
+    ir, e, box, vir, pres, top, sym, x, v and f, in the order of the blocks
+    in the frame. A truncated last frame is left out."""
+    headers = []
+    pos = 0
+    while pos < size:
+        fp.seek(pos)
+        buf = fp.read(12)
+        if len(buf) < 12:
+            break
+        # magic, string length, and the xdr string (length, padded chars)
+        slen = struct.unpack_from('>i', buf, 8)[0]
+        hsize = 12 + 4*((slen + 3) // 4)
+        fp.seek(pos + hsize)
+        buf = fp.read(_TRR_HEADER.size + 16)
+        if len(buf) < _TRR_HEADER.size + 8:
+            break
+        sizes = _TRR_HEADER.unpack_from(buf)
+        (ir_size, e_size, box_size, vir_size, pres_size, top_size, sym_size,
+         x_size, v_size, f_size, natoms, step, nre) = sizes
+        if box_size:
+            nflsz = box_size // 9
+        elif x_size:
+            nflsz = x_size // (natoms*3)
+        elif v_size:
+            nflsz = v_size // (natoms*3)
+        elif f_size:
+            nflsz = f_size // (natoms*3)
+        else:
+            raise IOError("Invalid trr frame header at byte %d" % pos)
+        fmt = '>dd' if nflsz == 8 else '>ff'
+        time, lam = struct.unpack_from(fmt, buf, _TRR_HEADER.size)
+        hsize += _TRR_HEADER.size + 2*nflsz
+        blocks = sizes[:10]
+        fsize = hsize + sum(blocks)
+        if pos + fsize > size:
+            break
+        headers.append((pos, fsize, hsize, natoms, step, time, lam, nflsz,
+                        blocks))
+        pos += fsize
+    return headers
+
+
+def _scan_trr(fp, size):
+    """Returns the offsets, steps and times of the frames of a trr file by
+    reading the frame headers only. A truncated last frame is left out."""
+    headers = _trr_headers(fp, size)
+    offsets = [h[0] for h in headers]
+    steps = [h[4] for h in headers]
+    times = [h[5] for h in headers]
+    return offsets, steps, times
+
+
+def index_filename(fn):
+    """Returns the name of the sidecar file of the frame index of fn."""
+    return fn + '.pmxidx'
+
+
+def read_frame_index(fn, bTrr=None, save=True):
+    """Returns the frame index of an xtc or trr file: the byte offsets,
+    steps and times of all its frames, as numpy arrays.
+
+    The index is built by scanning the frame headers, without decompressing
+    any coordinates, and saved next to the trajectory (see
+    :func:`index_filename`). Later calls load it from there, unless the
+    size or modification time of the trajectory have changed.
+
+    Parameters
+    ----------
+    fn : str
+        trajectory file.
+    bTrr : bool, optional
+        whether fn is a trr file. By default this is taken from the file
+        extension.
+    save : bool, optional
+        whether to save a newly built index. Default is True. If the
+        sidecar file cannot be written the index is just not saved.
+
+    Returns
+    -------
+    offsets : ndarray
+        byte offsets of the frames.
+    steps : ndarray
+        MD steps of the frames.
+    times : ndarray
+        times of the frames.
+    """
+    if bTrr is None:
+        bTrr = os.path.splitext(fn)[1] == '.trr'
+    st = os.stat(fn)
+    idx_fn = index_filename(fn)
+    try:
+        with np.load(idx_fn, allow_pickle=False) as idx:
+            if (int(idx['version']) == _INDEX_VERSION and
+                    int(idx['size']) == st.st_size and
+                    int(idx['mtime_ns']) == st.st_mtime_ns):
+                return idx['offsets'], idx['steps'], idx['times']
+    except Exception:
+        # no index yet, or unreadable
+        pass
+
+    with open(fn, 'rb') as fp:
+        if bTrr:
+            offsets, steps, times = _scan_trr(fp, st.st_size)
+        else:
+            offsets, steps, times = _scan_xtc(fp, st.st_size)
+    offsets = np.array(offsets, dtype=np.int64)
+    steps = np.array(steps, dtype=np.int64)
+    times = np.array(times, dtype=np.float64)
+    if save:
+        try:
+            with open(idx_fn, 'wb') as fp:
+                np.savez(fp, version=_INDEX_VERSION, size=st.st_size,
+                         mtime_ns=st.st_mtime_ns, offsets=offsets,
+                         steps=steps, times=times)
+        except (OSError, IOError):
+            pass
+    return offsets, steps, times
+
+
 class XDRFile:
     exdrOK, exdrHEADER, exdrSTRING, exdrDOUBLE, exdrINT, exdrFLOAT, exdrUINT, exdr3DX, exdrCLOSE, exdrMAGIC, exdrNOMEM, exdrENDOFFILE, exdrNR = range(13)
 
     #
-    def __init__(self,fn,mode="Auto",ft="Auto",atomNum=False):
+    def __init__(self,fn,mode="Auto",ft="Auto",atomNum=False,append=False):
         if mode=="NumPy":
           self.mode=mNumPy
-          try:
-            empty
-          except NameError:
-              raise IOError("NumPy selected but not correctly installed")
         elif mode=="Std":
           self.mode=0
         elif mode=="Auto":
@@ -155,6 +366,8 @@ class XDRFile:
 
         if ft=="Auto":
           ft = os.path.splitext(fn)[1][1:]
+        self.fn = fn
+        self._index = None
 
         if self.mode!=out_mode:
             if ft=="trr":
@@ -182,12 +395,27 @@ class XDRFile:
         class XDRFILEstruct(Structure):
             pass;
         self.xdr.xdrfile_open.restype = POINTER(XDRFILEstruct)
+        self.xdr.xdrfile_tell.argtypes = [POINTER(XDRFILEstruct)]
+        self.xdr.xdrfile_tell.restype = c_longlong
+        self.xdr.xdrfile_seek.argtypes = [POINTER(XDRFILEstruct), c_longlong, c_int]
+        self.xdr.xdrfile_seek.restype = c_int
         
         #TODO: for safety and future ctypes compatability, declare the argument and return types for all c functions called
 
         #open file
         fn_cp=c_char_p(fn.encode('utf-8')); #ctypes needs an explicit conversion of sdtrings, or only first character is visible in C
-        if self.mode==out_mode:
+        if self.mode==out_mode and append:
+            if atomNum==False and os.path.isfile(fn):
+                # take the number of atoms from the existing file
+                natoms=c_int()
+                if ft=="trr":
+                    r=self.xdr.read_trr_natoms(fn_cp,byref(natoms))
+                else:
+                    r=self.xdr.read_xtc_natoms(fn_cp,byref(natoms))
+                if r!=self.exdrOK: raise IOError("Error reading: '%s'"%fn)
+                atomNum=natoms.value
+            self.xd = self.xdr.xdrfile_open(fn_cp,"a")
+        elif self.mode==out_mode:
             self.xd = self.xdr.xdrfile_open(fn_cp,"w")
         else:
             self.xd = self.xdr.xdrfile_open(fn_cp,"r")
@@ -210,53 +438,578 @@ class XDRFile:
         #for NumPy define argtypes - ndpointer is not automatically converted to POINTER(c_float)
         #alternative of ctypes.data_as(POINTER(c_float)) requires two version for numpy and c_float array
         if self.mode&mNumPy and self.mode!=out_mode:
-            self.xdr.read_xtc.argtypes=[c_int,c_int,POINTER(c_int),POINTER(c_float),
-              ndpointer(ndim=2,dtype=float32),ndpointer(ndim=2,dtype=float32),POINTER(c_float)]
-            self.xdr.read_trr.argtypes=[c_int,c_int,POINTER(c_int),POINTER(c_float),POINTER(c_float),
-              ndpointer(ndim=2,dtype=float32),ndpointer(ndim=2,dtype=float32),
-              POINTER(c_float),POINTER(c_float)]
+            arr = _float32_array(2)
+            self.xdr.read_xtc.argtypes=[POINTER(XDRFILEstruct),c_int,POINTER(c_int),POINTER(c_float),
+              arr,arr,POINTER(c_float)]
+            self.xdr.read_trr.argtypes=[POINTER(XDRFILEstruct),c_int,POINTER(c_int),POINTER(c_float),POINTER(c_float),
+              arr,arr,arr,arr]
 
     def write_xtc_frame( self, step=0, time=0.0, prec=1000.0, lam=0.0, box=False, x=False, units='A', bTrr=False ):
-        f = Frame(self.natoms,self.mode,box=box,x=x,units=units)
-        step = c_int(step)
-        time = c_float(time)
-        prec = c_float(prec)
-        lam = c_float(lam)
-        if bTrr:
-            result = self.xdr.write_trr(self.xd,self.natoms,step,time,lam,f.box,f.x,f.v,f.f)
-        else:
-            result = self.xdr.write_xtc(self.xd,self.natoms,step,time,f.box,f.x,prec)
+        if box is False:
+            box = None
+        self.write_frames(np.reshape(x, (1, self.natoms, 3)), step=step,
+                          time=time, box=box, prec=prec, lam=lam,
+                          units=units, bTrr=bTrr)
 
-    def __iter__(self):
-        f = Frame(self.natoms,self.mode)
+    def write_frames(self, x, step=None, time=None, box=None, prec=1000.0,
+                     lam=0.0, units='A', bTrr=False):
+        """Writes many frames in one call.
+
+        Parameters
+        ----------
+        x : array_like
+            coordinates, of shape (nframes, natoms, 3).
+        step : int or array_like, optional
+            MD step of every frame, or one for all. Default is the frame
+            number.
+        time : float or array_like, optional
+            time of every frame, or one for all. Default is the frame
+            number.
+        box : array_like, optional
+            box of every frame, shape (nframes, 3, 3), or one box for all,
+            shape (3, 3), in nm. Default is a zero box.
+        prec : float, optional
+            precision of the xtc compression. Default is 1000.
+        lam : float or array_like, optional
+            lambda of every frame (trr only). Default is 0.
+        units : str, optional
+            units of x: 'A' (default) or 'nm'.
+        bTrr : bool, optional
+            write trr instead of xtc frames. Default is False.
+        """
+        if self.mode!=out_mode:
+            raise IOError("File is not opened for writing")
+        x = np.asarray(x)
+        if x.ndim!=3 or x.shape[1:]!=(self.natoms,3):
+            raise ValueError("x must have the shape (nframes, %d, 3), got %s"
+                             % (self.natoms, x.shape))
+        nframes = len(x)
+        if step is None:
+            step = np.arange(nframes)
+        if time is None:
+            time = np.arange(nframes)
+        step = np.broadcast_to(np.asarray(step, dtype=np.int64), (nframes,))
+        time = np.broadcast_to(np.asarray(time, dtype=np.float32), (nframes,))
+        lam = np.broadcast_to(np.asarray(lam, dtype=np.float32), (nframes,))
+        if box is None:
+            box = np.zeros((3, 3))
+        box = np.broadcast_to(np.asarray(box, dtype=np.float32),
+                              (nframes, 3, 3))
+        scale = 0.1 if units=='A' else 1.0
+
+        # the frame and box buffers passed to the C writer are reused
+        xbuf = np.empty((self.natoms, 3), dtype=np.float32)
+        boxbuf = np.empty((3, 3), dtype=np.float32)
+        px = xbuf.ctypes.data_as(POINTER(c_float))
+        pbox = boxbuf.ctypes.data_as(POINTER(c_float))
+        for i in range(nframes):
+            np.multiply(x[i], scale, out=xbuf, casting='unsafe')
+            boxbuf[:] = box[i]
+            if bTrr:
+                result = self.xdr.write_trr(self.xd, self.natoms,
+                                            c_int(int(step[i])),
+                                            c_float(time[i]), c_float(lam[i]),
+                                            pbox, px, None, None)
+            else:
+                result = self.xdr.write_xtc(self.xd, self.natoms,
+                                            c_int(int(step[i])),
+                                            c_float(time[i]), pbox, px,
+                                            c_float(prec))
+            if result!=self.exdrOK:
+                raise IOError("Error writing frame %d to '%s'" % (i, self.fn))
+
+    def _read_frame(self, f):
+        """Reads the next frame into f. Returns False at the end of the
+        file."""
         #temporary c_type variables (frame variables are python type)
         step = c_int()
         time = c_float()
         prec = c_float()
         lam = c_float()
+        if not self.mode&mTrr:
+            result = self.xdr.read_xtc(self.xd,self.natoms,byref(step),byref(time),f.box,f.x,byref(prec))
+            f.prec=prec.value
+        else:
+            result = self.xdr.read_trr(self.xd,self.natoms,byref(step),byref(time),byref(lam),f.box,f.x,None,None) #TODO: make v,f possible
+            f.lam=lam.value
+
+        #check return value
+        if result==self.exdrENDOFFILE: return False
+        if result==self.exdrINT and self.mode&mTrr:
+          return False  #TODO: dirty hack. read_trr return exdrINT not exdrENDOFFILE
+        if result!=self.exdrOK: raise IOError("Error reading xdr file")
+
+        #convert c_type to python
+        f.step=step.value
+        f.time=time.value
+        return True
+
+    def __iter__(self):
+        """Iterates over the frames from the current position (the start
+        of the file, or where :meth:`seek` moved to). The same Frame object,
+        with the same coordinate buffers, is returned for every frame."""
+        f = Frame(self.natoms,self.mode)
         if self.mode!=out_mode:
-            while 1:
-                #read next frame
-                if not self.mode&mTrr:
-                    result = self.xdr.read_xtc(self.xd,self.natoms,byref(step),byref(time),f.box,f.x,byref(prec))
-                    f.prec=prec.value
-                else:
-                    result = self.xdr.read_trr(self.xd,self.natoms,byref(step),byref(time),byref(lam),f.box,f.x,None,None) #TODO: make v,f possible
-                    f.lam=lam.value
-
-                #check return value
-                if result==self.exdrENDOFFILE: break
-                if result==self.exdrINT and self.mode&mTrr:
-                  break  #TODO: dirty hack. read_trr return exdrINT not exdrENDOFFILE
-                if result!=self.exdrOK: raise IOError("Error reading xdr file")
-
-                #convert c_type to python
-                f.step=step.value
-                f.time=time.value
+            while self._read_frame(f):
+                yield f
+
+    def frame_indices(self, start=None, stop=None, step=None,
+                      begin_time=None, end_time=None):
+        """Returns the indices of the frames selected by :meth:`frames`."""
+        return frame_indices(self.times, start, stop, step, begin_time,
+                             end_time)
+
+    def frames(self, start=None, stop=None, step=None, begin_time=None,
+               end_time=None):
+        """Iterates over a subset of the frames.
+
+        The frames between begin_time and end_time (both included, like
+        ``gmx trjconv -b -e``) are taken, and of those the ones selected by
+        the slice start:stop:step. Frames that are not wanted are jumped
+        over using the frame offset index, without decompressing them. As
+        for plain iteration, the same Frame object is returned every time.
+
+        Parameters
+        ----------
+        start, stop, step : int, optional
+            slice of the frames in the time window.
+        begin_time, end_time : float, optional
+            time window, in ps.
+        """
+        if (start is None and stop is None and step is None and
+                begin_time is None and end_time is None):
+            self.xdr.xdrfile_seek(self.xd, 0, 0)
+            for f in self:
                 yield f
+            return
+        f = Frame(self.natoms,self.mode)
+        nxt = None
+        for i in self.frame_indices(start, stop, step, begin_time, end_time):
+            if i != nxt:
+                self.seek(i)
+            if not self._read_frame(f):
+                break
+            nxt = i + 1
+            yield f
+
+    # -------------
+    # Random access
+    # -------------
+    def _get_index(self):
+        if self.mode==out_mode:
+            raise IOError("Random access is not possible when writing")
+        if self._index is None:
+            self._index = read_frame_index(self.fn, bTrr=bool(self.mode&mTrr))
+        return self._index
+
+    @property
+    def offsets(self):
+        """Byte offsets of the frames in the file."""
+        return self._get_index()[0]
+
+    @property
+    def steps(self):
+        """MD steps of the frames."""
+        return self._get_index()[1]
+
+    @property
+    def times(self):
+        """Times of the frames."""
+        return self._get_index()[2]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def seek(self, i):
+        """Moves to frame i, so that iteration continues from there."""
+        n = len(self)
+        if i < 0:
+            i += n
+        if i < 0 or i > n:
+            raise IndexError("frame index out of range")
+        pos = self.offsets[i] if i < n else os.path.getsize(self.fn)
+        if self.xdr.xdrfile_seek(self.xd, int(pos), 0) != 0:
+            raise IOError("Cannot seek to frame %d" % i)
+
+    def time_to_index(self, t):
+        """Returns the index of the frame with the time closest to t."""
+        times = self.times
+        if len(times) == 0:
+            raise IndexError("trajectory has no frames")
+        i = int(np.searchsorted(times, t))
+        if i == len(times) or (i > 0 and t - times[i-1] <= times[i] - t):
+            i -= 1
+        return i
+
+    def seek_time(self, t):
+        """Moves to the frame with the time closest to t and returns its
+        index."""
+        i = self.time_to_index(t)
+        self.seek(i)
+        return i
+
+    def __getitem__(self, i):
+        """Returns frame i as a new Frame, or a list of Frames for a
+        slice. The current position in the file is not changed."""
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        pos = self.xdr.xdrfile_tell(self.xd)
+        try:
+            self.seek(i)
+            f = Frame(self.natoms, self.mode)
+            if not self._read_frame(f):
+                raise IndexError("frame index out of range")
+        finally:
+            self.xdr.xdrfile_seek(self.xd, pos, 0)
+        return f
 
     def close(self):
         """Close the xdr file.
         Call this when you are done reading/writing to avoid a memory leak.
         """
-        self.xdr.xdrfile_close(self.xd);
\ No newline at end of file
+        self.xdr.xdrfile_close(self.xd);
+
+
+# ======================
+# Memory-mapped trr files
+# ======================
+# names of the blocks of a trr frame, in the order of _trr_headers
+_TRR_BLOCKS = ('ir', 'e', 'box', 'vir', 'pres', 'top', 'sym', 'x', 'v', 'f')
+
+
+class MappedTrr:
+    """Read-only access to a trr file through a memory map.
+
+    trr frames are uncompressed, so the coordinates, velocities and forces
+    of a frame can be used directly from the mapped file. The frame
+    headers are read once when the file is opened; the data of a frame is
+    only read from disk, and converted from big-endian, when it is
+    accessed.
+
+    If all frames have the same layout (the usual case), :attr:`x`,
+    :attr:`v`, :attr:`f` and :attr:`box` are strided big-endian views of
+    shape (nframes, natoms, 3) and (nframes, 3, 3) on the whole file.
+    The get_* methods work for every file and return native arrays.
+
+    Parameters
+    ----------
+    fn : str
+        trr file.
+
+    Attributes
+    ----------
+    natoms : int
+        number of atoms.
+    offsets, steps, times, lambdas : ndarray
+        byte offsets, steps, times and lambdas of the frames.
+
+    Examples
+    --------
+    >>> trr = MappedTrr('md.trr')
+    >>> v = trr.get_v(-1)                   # velocities of the last frame
+    >>> x = trr.x[::100, :10]               # strided view, nothing read yet
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+        size = os.path.getsize(fn)
+        with open(fn, 'rb') as fp:
+            headers = _trr_headers(fp, size)
+        if len(headers) == 0:
+            raise IOError("No frames in '%s'" % fn)
+        natoms = set(h[3] for h in headers)
+        if len(natoms) != 1:
+            raise IOError("Frames of '%s' have different numbers of atoms"
+                          % fn)
+        self.natoms = natoms.pop()
+        self.offsets = np.array([h[0] for h in headers], dtype=np.int64)
+        self.steps = np.array([h[4] for h in headers], dtype=np.int64)
+        self.times = np.array([h[5] for h in headers])
+        self.lambdas = np.array([h[6] for h in headers])
+        # start of every block in every frame, -1 if it is not there
+        self._blocks = {}
+        for name in ('box', 'x', 'v', 'f'):
+            self._blocks[name] = np.full(len(headers), -1, dtype=np.int64)
+        for k, (pos, fsize, hsize, natoms, step, time, lam, nflsz,
+                blocks) in enumerate(headers):
+            start = pos + hsize
+            for name, bsize in zip(_TRR_BLOCKS, blocks):
+                if bsize and name in self._blocks:
+                    self._blocks[name][k] = start
+                start += bsize
+        self._nflsz = np.array([h[7] for h in headers])
+        self._fsize = np.array([h[1] for h in headers])
+        self._mm = np.memmap(fn, dtype=np.uint8, mode='r',
+                             shape=(int(self.offsets[-1] + self._fsize[-1]),))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def has(self, name):
+        """Returns a boolean array telling which frames have the block name
+        ('box', 'x', 'v' or 'f')."""
+        return self._blocks[name] >= 0
+
+    def _frame_block(self, i, name, shape):
+        start = self._blocks[name][i]
+        if start < 0:
+            return None
+        dtype = '>f8' if self._nflsz[i] == 8 else '>f4'
+        return np.ndarray(shape, dtype=dtype, buffer=self._mm,
+                          offset=int(start))
+
+    def _get(self, i, name, shape, scale=1.):
+        b = self._frame_block(i, name, shape)
+        if b is None:
+            raise ValueError("Frame %d of '%s' has no %s" % (i, self.fn, name))
+        return b.astype(np.float64) * scale
+
+    def get_x(self, i, units='nm'):
+        """Returns the coordinates of frame i as an (natoms, 3) array, in nm
+        or, with units='A', in Angstrom."""
+        return self._get(i, 'x', (self.natoms, 3), 10. if units == 'A' else 1.)
+
+    def get_v(self, i):
+        """Returns the velocities of frame i (nm/ps)."""
+        return self._get(i, 'v', (self.natoms, 3))
+
+    def get_f(self, i):
+        """Returns the forces of frame i (kJ/(mol nm))."""
+        return self._get(i, 'f', (self.natoms, 3))
+
+    def get_box(self, i):
+        """Returns the box of frame i (nm)."""
+        return self._get(i, 'box', (3, 3))
+
+    def _strided(self, name, shape):
+        starts = self._blocks[name]
+        n = len(starts)
+        if np.all(starts < 0):
+            raise ValueError("'%s' has no %s" % (self.fn, name))
+        uniform = (np.all(starts >= 0) and
+                   np.all(self._nflsz == self._nflsz[0]) and
+                   (n == 1 or np.all(np.diff(starts) == starts[1] - starts[0])))
+        if not uniform:
+            raise ValueError("The frames of '%s' do not all have the same "
+                             "layout, use get_%s(i)" % (self.fn, name))
+        nflsz = int(self._nflsz[0])
+        dtype = '>f8' if nflsz == 8 else '>f4'
+        fstride = int(starts[1] - starts[0]) if n > 1 else 0
+        return np.ndarray((n,) + shape, dtype=dtype, buffer=self._mm,
+                          offset=int(starts[0]),
+                          strides=(fstride, 3*nflsz, nflsz))
+
+    @property
+    def x(self):
+        """Coordinates of all frames, (nframes, natoms, 3), in nm."""
+        return self._strided('x', (self.natoms, 3))
+
+    @property
+    def v(self):
+        """Velocities of all frames, (nframes, natoms, 3)."""
+        return self._strided('v', (self.natoms, 3))
+
+    @property
+    def f(self):
+        """Forces of all frames, (nframes, natoms, 3)."""
+        return self._strided('f', (self.natoms, 3))
+
+    @property
+    def box(self):
+        """Boxes of all frames, (nframes, 3, 3), in nm."""
+        return self._strided('box', (3, 3))
+
+    def close(self):
+        """Releases the memory map. Views taken from it stay valid."""
+        self._mm = None
+
+
+def frame_indices(times, start=None, stop=None, step=None,
+                  begin_time=None, end_time=None):
+    """Returns the indices of the frames with the given times that lie
+    between begin_time and end_time (both included), sliced with
+    start:stop:step."""
+    idx = np.arange(len(times))
+    if begin_time is not None:
+        idx = idx[times >= begin_time]
+        times = times[times >= begin_time]
+    if end_time is not None:
+        idx = idx[times <= end_time]
+    return idx[start:stop:step]
+
+
+# ========================
+# Parallel frame decoding
+# ========================
+def _read_into(traj, frames, out=None, reducer=None):
+    """Reads the given frames of traj, into the rows of out if given, and
+    returns the reducer results."""
+    f = Frame(traj.natoms, traj.mode)
+    res = []
+    nxt = None
+    for k, i in enumerate(frames):
+        if i != nxt:
+            traj.seek(i)
+        if out is not None:
+            f.x = out[k]
+        if not traj._read_frame(f):
+            raise IOError("Error reading frame %d of '%s'" % (i, traj.fn))
+        nxt = i + 1
+        if reducer is not None:
+            res.append(reducer(f))
+    return res
+
+
+def _read_chunk(fn, frames, reducer=None, shm_name=None, shape=None,
+                first=0):
+    """Worker of :func:`read_frames_parallel`: decodes a range of frames
+    into the shared memory block shm_name, starting at row first."""
+    traj = XDRFile(fn)
+    try:
+        if shm_name is None:
+            return _read_into(traj, frames, reducer=reducer)
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            out = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+            res = _read_into(traj, frames, out[first:first+len(frames)],
+                             reducer)
+            # drop the views before the block is closed
+            del out
+            return res
+        finally:
+            try:
+                shm.close()
+            except BufferError:
+                # a view is still held by the traceback of an error
+                pass
+    finally:
+        traj.close()
+
+
+# bytes of coordinates a worker of read_frames_parallel passes back at once
+_PARALLEL_BLOCK = 1 << 26
+
+
+def read_frames_parallel(fn, start=None, stop=None, step=None,
+                         begin_time=None, end_time=None, nproc=None,
+                         reducer=None, split=False, out=None):
+    """Decodes the frames of an xtc or trr file with a pool of processes.
+
+    The frames (selected as in :meth:`XDRFile.frames`) are split into nproc
+    contiguous ranges with the frame offset index, and every worker decodes
+    one range. The coordinates are passed back in blocks of shared memory
+    of at most 64 MB each, so they are not pickled, and copied into the
+    result array as the blocks come in; the memory used besides the result
+    does not grow with the trajectory. Alternatively a reducer is called on
+    every frame inside the workers, and only its results come back.
+
+    Parameters
+    ----------
+    fn : str
+        xtc or trr file.
+    start, stop, step : int, optional
+        slice of the frames.
+    begin_time, end_time : float, optional
+        time window of the frames, in ps.
+    nproc : int, optional
+        number of worker processes. Default is the number of CPUs.
+    reducer : callable, optional
+        function called with each Frame (in nm) in the workers. It has to
+        be picklable, i.e. defined at the top level of a module, and must
+        not keep references to the frame buffers.
+    split : bool, optional
+        whether to return one result per range instead of joining them.
+        Default is False.
+    out : ndarray, optional
+        C-contiguous float32 array of shape (nframes, natoms, 3) the
+        coordinates are written to. Default is a new array.
+
+    Returns
+    -------
+    result : ndarray or list
+        without reducer the coordinates in nm as a float32 array of shape
+        (nframes, natoms, 3) (out if given), or with split=True a list of
+        views of it, one per range. With a reducer the list of its
+        results, in frame order, or a list of such lists with split=True.
+    """
+    traj = XDRFile(fn)
+    try:
+        natoms = traj.natoms
+        frames = traj.frame_indices(start, stop, step, begin_time, end_time)
+    finally:
+        traj.close()
+    if nproc is None:
+        nproc = os.cpu_count() or 1
+    chunks = [c for c in np.array_split(frames, max(1, nproc)) if len(c)]
+    bounds = np.cumsum([0] + [len(c) for c in chunks])
+    parallel = nproc > 1 and len(chunks) > 1
+
+    if reducer is not None:
+        if parallel:
+            with ProcessPoolExecutor(max_workers=nproc) as pool:
+                res = list(pool.map(_read_chunk, [fn]*len(chunks), chunks,
+                                    [reducer]*len(chunks)))
+        else:
+            res = [_read_chunk(fn, c, reducer) for c in chunks]
+        if split:
+            return res
+        return [r for chunk in res for r in chunk]
+
+    shape = (len(frames), natoms, 3)
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+    elif (out.shape != shape or out.dtype != np.float32 or
+          not out.flags.c_contiguous):
+        raise ValueError('out must be a C-contiguous float32 array of '
+                         'shape %s' % (shape,))
+    if parallel:
+        _read_blocks(fn, chunks, bounds, natoms, nproc, out)
+    elif len(frames):
+        traj = XDRFile(fn)
+        try:
+            _read_into(traj, frames, out)
+        finally:
+            traj.close()
+    if split:
+        return [out[b:e] for b, e in zip(bounds[:-1], bounds[1:])]
+    return out
+
+
+def _read_blocks(fn, chunks, bounds, natoms, nproc, out):
+    """Decodes the frame ranges chunks (starting at rows bounds of out) in
+    nproc processes. Every task decodes a block of frames into one of a few
+    shared memory slots, which is copied to out and reused once the task
+    is done."""
+    nblock = max(1, _PARALLEL_BLOCK // (natoms * 12))
+    tasks = [(c[k:k+nblock], b + k) for c, b in zip(chunks, bounds)
+             for k in range(0, len(c), nblock)]
+    tasks.reverse()
+    nslot = min(2 * nproc, len(tasks))
+    size = min(nblock, max(len(t[0]) for t in tasks)) * natoms * 12
+    slots = []
+    try:
+        for k in range(nslot):
+            slots.append(shared_memory.SharedMemory(create=True, size=size))
+        free = list(range(nslot))
+        pending = {}
+        with ProcessPoolExecutor(max_workers=nproc) as pool:
+            while tasks or pending:
+                while tasks and free:
+                    frames, first = tasks.pop()
+                    slot = free.pop()
+                    fut = pool.submit(_read_chunk, fn, frames, None,
+                                      slots[slot].name,
+                                      (len(frames), natoms, 3))
+                    pending[fut] = (slot, first, len(frames))
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    slot, first, n = pending.pop(fut)
+                    fut.result()
+                    out[first:first+n] = np.ndarray(
+                        (n, natoms, 3), dtype=np.float32,
+                        buffer=slots[slot].buf)
+                    free.append(slot)
+    finally:
+        for shm in slots:
+            shm.close()
+            shm.unlink()
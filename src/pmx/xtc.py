@@ -33,6 +33,7 @@
 """Trajectory module
 """
 
+import numpy as np
 from . import xdrfile
 
 
@@ -44,3 +45,151 @@ class Trajectory(xdrfile.XDRFile):
 
     def get_natoms(self):
         return self.natoms
+
+
+class TrajectorySet:
+    """Several xtc/trr files, e.g. the parts of a restarted run, as one
+    trajectory.
+
+    The frames of all files get one global index. A restarted run starts
+    again from its checkpoint and overwrites what was written after it, so
+    where the files overlap in time the frames of the later file are
+    kept: the frames of a file that are not earlier than the first frame
+    of the files after it (like the frame repeated at a restart) are left
+    out.
+    The frame offset index of every file is used for random access, and
+    at most one of the files is open at a time.
+
+    Parameters
+    ----------
+    filenames : list or str
+        trajectory files in the order of the run, or a wildcard, which is
+        expanded and sorted naturally (part2 before part10).
+    tol : float, optional
+        frames not earlier than the first frame of a later file by more
+        than tol (in ps) count as overwritten. Default is 1e-4.
+
+    Attributes
+    ----------
+    filenames : list
+        the trajectory files.
+    natoms : int
+        number of atoms.
+    times : ndarray
+        times of the frames.
+    steps : ndarray
+        MD steps of the frames.
+
+    Examples
+    --------
+    >>> trajs = TrajectorySet('md.part*.xtc')
+    >>> frame = trajs[-1]
+    >>> for frame in trajs.frames(begin_time=2001., step=4):
+    ...     pass
+    """
+
+    def __init__(self, filenames, tol=1e-4):
+        if isinstance(filenames, str):
+            from glob import glob
+            from .utils import natural_sort
+            filenames = natural_sort(glob(filenames))
+        if len(filenames) == 0:
+            raise IOError("No trajectory files given")
+        self.filenames = list(filenames)
+        self.natoms = None
+        parts = []
+        for fn in self.filenames:
+            traj = Trajectory(fn)
+            try:
+                if self.natoms is None:
+                    self.natoms = traj.natoms
+                elif traj.natoms != self.natoms:
+                    raise ValueError("%s has %d atoms instead of %d"
+                                     % (fn, traj.natoms, self.natoms))
+                parts.append((traj.times, traj.steps))
+            finally:
+                traj.close()
+        # go backwards, cutting every part at the start of the parts after it
+        files, local, steps, times = [], [], [], []
+        first = None
+        for k in range(len(parts) - 1, -1, -1):
+            t, s = parts[k]
+            keep = np.arange(len(t))
+            if first is not None:
+                keep = keep[t < first - tol]
+            if len(keep):
+                first = t[keep[0]]
+            files.insert(0, np.full(len(keep), k))
+            local.insert(0, keep)
+            steps.insert(0, s[keep])
+            times.insert(0, t[keep])
+        self._file = np.concatenate(files)
+        self._local = np.concatenate(local)
+        self.steps = np.concatenate(steps)
+        self.times = np.concatenate(times)
+        self._traj = None
+        self._k = None
+
+    def __len__(self):
+        return len(self._file)
+
+    def _open(self, k):
+        """Returns the Trajectory of file k, closing the one open before."""
+        if self._k != k:
+            self.close()
+            self._traj = Trajectory(self.filenames[k])
+            self._k = k
+        return self._traj
+
+    def locate(self, i):
+        """Returns the file number and the frame number in that file of
+        frame i."""
+        return int(self._file[i]), int(self._local[i])
+
+    def frame_indices(self, start=None, stop=None, step=None,
+                      begin_time=None, end_time=None):
+        """Returns the indices of the frames selected by :meth:`frames`."""
+        return xdrfile.frame_indices(self.times, start, stop, step,
+                                     begin_time, end_time)
+
+    def frames(self, start=None, stop=None, step=None, begin_time=None,
+               end_time=None):
+        """Iterates over the frames, or over those selected by the time
+        window and the slice start:stop:step, like
+        :meth:`pmx.xdrfile.XDRFile.frames`. The same Frame object is
+        returned for all frames of one file."""
+        f = traj = None
+        nxt = None
+        for i in self.frame_indices(start, stop, step, begin_time, end_time):
+            k, j = self.locate(i)
+            if k != self._k or traj is not self._traj:
+                traj = self._open(k)
+                f = xdrfile.Frame(traj.natoms, traj.mode)
+                nxt = None
+            if j != nxt:
+                traj.seek(j)
+            if not traj._read_frame(f):
+                raise IOError("Error reading frame %d of %s"
+                              % (j, self.filenames[k]))
+            nxt = j + 1
+            yield f
+
+    def __iter__(self):
+        return self.frames()
+
+    def __getitem__(self, i):
+        """Returns frame i as a new Frame, or a list of Frames for a
+        slice."""
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < -len(self) or i >= len(self):
+            raise IndexError("frame index out of range")
+        k, j = self.locate(i)
+        return self._open(k)[j]
+
+    def close(self):
+        """Closes the file that is open."""
+        if self._traj is not None:
+            self._traj.close()
+            self._traj = None
+            self._k = None
@@ -69,4 +69,206 @@ def test_dhdl(tmpdir):
     
     assert_almost_equal(bar, dG*0.98, decimal=2)
     assert_almost_equal(barerr, 0.17, decimal=2)
-    
\ No newline at end of file
+    
+
+def test_read_xvg_data(gf, tmpdir):
+    from pmx.parser import read_xvg_data
+    data = read_xvg_data(gf('dgdl/dgdl.xvg'))
+    assert data.shape == (50001, 2)
+    assert data.dtype == np.float64
+    assert_almost_equal(data[0], [0.0, 201.18761])
+    # reading in small chunks gives the same result
+    dgdl = read_xvg_data(gf('dgdl/dgdl.xvg'), usecols=1, chunksize=1000)
+    assert_almost_equal(dgdl, data[:, 1])
+
+    # comment and set separator lines in between data are skipped
+    fn = str(tmpdir.join("sets.xvg"))
+    with open(fn, 'w') as f:
+        f.write('# comment\n@ title "x"\n0.0 1.0\n0.5 2.0\n&\n@ s1\n1.0 3.0\n')
+    assert_almost_equal(read_xvg_data(fn), [[0., 1.], [.5, 2.], [1., 3.]])
+
+    # ragged lines are an error
+    with open(fn, 'w') as f:
+        f.write('0.0 1.0\n0.5\n')
+    with pytest.raises(ValueError):
+        read_xvg_data(fn)
+
+    # except a last line that is still being written
+    for tail in ['0.5', '0.5 2.', '0.5 2.0']:
+        with open(fn, 'w') as f:
+            f.write('@ s0\n0.0 1.0\n' + tail)
+        for chunksize in [4, 2**18]:
+            assert_almost_equal(read_xvg_data(fn, chunksize=chunksize),
+                                [[0., 1.]])
+
+
+def test_read_dgdl_files_nproc(gf, tmpdir):
+    from pmx.analysis import read_dgdl_files, _read_last_line
+    fn = gf('dgdl/dgdl.xvg')
+    with open(fn, 'rb') as f:
+        assert _read_last_line(fn) == f.read().splitlines()[-1]
+
+    # a truncated run is skipped, the order of the other files is kept
+    lines = open(fn).readlines()
+    short = str(tmpdir.join("short.xvg"))
+    with open(short, 'w') as f:
+        f.writelines(lines[:len(lines)//2])
+    lst = [fn, short, fn, fn]
+    w1 = read_dgdl_files(lst, verbose=False)
+    w2 = read_dgdl_files(lst, verbose=False, nproc=2)
+    assert len(w1) == 3
+    assert w1 == w2
+
+
+def test_read_dgdl_files_cache(gf, tmpdir):
+    from pmx.analysis import read_dgdl_files, WorkCache
+    src = open(gf('dgdl/dgdl.xvg')).read()
+    lst = []
+    for i in range(3):
+        fn = str(tmpdir.join("dgdl%d.xvg" % i))
+        with open(fn, 'w') as f:
+            f.write(src)
+        lst.append(fn)
+    cfn = str(tmpdir.join("integ_cache.npz"))
+    w = read_dgdl_files(lst, verbose=False, cache=cfn)
+    assert len(WorkCache(cfn)) == 3
+    # other integration settings are cached separately
+    wi = read_dgdl_files(lst, verbose=False, invert_values=True, cache=cfn)
+    assert_almost_equal(wi, -np.array(w))
+    assert len(WorkCache(cfn)) == 6
+
+    # cached values are used as long as the file is unchanged
+    cache = WorkCache(cfn)
+    key = WorkCache.key(lst[1])
+    cache.set(key, 123.0, cache.get(key)[1])
+    cache.save()
+    assert read_dgdl_files(lst, verbose=False, cache=cfn)[1] == 123.0
+    # a modified file is integrated again
+    os.utime(lst[1], ns=(0, 0))
+    assert read_dgdl_files(lst, verbose=False, cache=cfn) == w
+
+
+def test_watch(gf, tmpdir, capsys):
+    import json
+    from pmx.analysis import DgdlWatcher
+    lines = open(gf('dgdl/dgdl.xvg')).readlines()
+    fwd = str(tmpdir.join("f%d.xvg"))
+    rev = str(tmpdir.join("r%d.xvg"))
+
+    def write(fn, n=len(lines)):
+        with open(fn, 'w') as f:
+            f.writelines(lines[:n])
+
+    watcher = DgdlWatcher([str(tmpdir.join("f*.xvg"))])
+    assert watcher.poll() == ([], False)
+    write(fwd % 0)
+    write(fwd % 1, len(lines)//2)   # still running
+    w, reset = watcher.poll()
+    assert len(w) == 1 and reset is True
+    assert watcher.poll() == ([], False)
+    write(fwd % 1)                  # finished
+    write(fwd % 2)
+    w, reset = watcher.poll()
+    assert len(w) == 2 and reset is False
+    assert watcher.accepted == [fwd % 0, fwd % 1, fwd % 2]
+
+    for i in range(3):
+        write(rev % i)
+    orig_argv = sys.argv
+    orig_dir = os.getcwd()
+    os.chdir(tmpdir)
+    sys.argv = ['analyze_dhdl.py', '-fA', str(tmpdir.join("f*.xvg")),
+                '-fB', str(tmpdir.join("r*.xvg")), '--watch', '0',
+                '--watch_stop', '3', '-m', 'bar', 'jarz']
+    try:
+        entry_point()
+    finally:
+        sys.argv = orig_argv
+        os.chdir(orig_dir)
+    status = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert status['nf'] == 3 and status['nr'] == 3
+    assert 'cgi' not in status
+    assert set(status['bar']) == {'dg', 'err', 'conv'}
+    assert 'jarz_gauss' in status
+
+
+@pytest.mark.parametrize("reset", ['forward', 'reverse'])
+def test_watch_one_direction_resets(monkeypatch, capsys, reset):
+    import argparse
+    from pmx.scripts import analyze_dhdl
+    # poll results (work values, reset) of the forward and reverse watcher:
+    # in the second poll one direction resets while the other one delivers
+    # new files
+    polls = {'forward': [([1., 2.], False), ([4.], False), ([], False)],
+             'reverse': [([3.], False), ([5., 6.], True), ([7.], False)]}
+    if reset == 'forward':
+        polls = {'forward': polls['reverse'], 'reverse': polls['forward']}
+
+    class Watcher(object):
+        def __init__(self, patterns, lambda0=0, **kwargs):
+            self.polls = list(polls['forward' if lambda0 == 0 else
+                                    'reverse'])
+
+        def poll(self):
+            return self.polls.pop(0)
+
+    monkeypatch.setattr(analyze_dhdl, 'DgdlWatcher', Watcher)
+    args = argparse.Namespace(filesAB=[], filesBA=[], sigmoid=0.0, nproc=1,
+                              reverseB=False, temperature=298.15, nboots=0,
+                              seed=None, methods=['bar'], watch=0,
+                              watch_stop=3)
+    est = analyze_dhdl.watch(args, 1., 'kJ/mol')
+    kept, reset_values = [1., 2., 4.], [5., 6., 7.]
+    if reset == 'forward':
+        kept, reset_values = reset_values, kept
+    assert list(est.forward.values) == kept
+    assert list(est.reverse.values) == reset_values
+    assert len(capsys.readouterr().out.strip().splitlines()) == 3
+
+
+def test_watch_errors_to_stderr(tmpdir, capsys):
+    from pmx.analysis import DgdlWatcher
+    fn = str(tmpdir.join("bad.xvg"))
+    with open(fn, 'w') as f:
+        f.write('0.0 1.0\n0.5\n0.6 1.0\n')
+    assert DgdlWatcher([fn]).poll() == ([], False)
+    out, err = capsys.readouterr()
+    assert out == '' and 'Error in reading' in err
+
+
+def test_batch_analyse(gf, tmpdir):
+    import csv
+    from pmx.scripts import analyze_batch
+    src = open(gf('dgdl/dgdl.xvg')).readlines()
+    # tutorial layout: two edges, one leg, one replica each; the second
+    # edge has no reverse transitions
+    for edge in ['edge_a_b', 'edge_b_c']:
+        for state in ['stateA', 'stateB']:
+            if edge == 'edge_b_c' and state == 'stateB':
+                continue
+            d = tmpdir.mkdir(edge).join('water') if state == 'stateA' \
+                else tmpdir.join(edge, 'water')
+            d = d.join(state, 'run1', 'transitions')
+            d.ensure(dir=True)
+            for i in range(3):
+                with open(str(d.join('dhdl%d.xvg' % i)), 'w') as f:
+                    f.writelines(src[:len(src) - 1000*i])
+    tasks = analyze_batch.discover_legs(str(tmpdir))
+    assert [t[:3] for t in tasks] == [('edge_a_b', 'water', '1'),
+                                     ('edge_b_c', 'water', '1')]
+
+    rows1 = analyze_batch.analyse_legs(tasks, seed=1, nboots=5,
+                                       methods=['bar', 'jarz'])
+    rows2 = analyze_batch.analyse_legs(tasks, nproc=2, seed=1, nboots=5,
+                                       methods=['bar', 'jarz'])
+    assert rows1 == rows2
+    assert rows1[0]['nA'] == 1 and 'error' not in rows1[0]
+    assert 'error' in rows1[1]
+
+    fn = str(tmpdir.join('results.csv'))
+    analyze_batch.write_results(fn, rows1)
+    with open(fn) as f:
+        table = list(csv.DictReader(f))
+    assert len(table) == 2
+    assert float(table[0]['bar_dg']) == rows1[0]['bar_dg']
+    assert table[0]['cgi_dg'] == ''
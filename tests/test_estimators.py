@@ -1,8 +1,8 @@
 #!/usr/bin/env python
-from pmx.estimators import BAR, Jarz, Crooks, JarzGauss
+from pmx.estimators import BAR, Jarz, Crooks, JarzGauss, RunningEstimates
 import pickle
+import numpy as np
 from numpy.testing import assert_almost_equal
-from numpy.random import seed
 
 
 def test_BAR(gf):
@@ -11,54 +11,114 @@ def test_BAR(gf):
     wf = pickle.load(open(gf("dgdl/wf.pkl"), "rb"))
     wr = pickle.load(open(gf("dgdl/wr.pkl"), "rb"))
 
-    seed(42)
-    bar = BAR(wf=wf, wr=wr, T=298, nblocks=3, nboots=10)
+    bar = BAR(wf=wf, wr=wr, T=298, nblocks=3, nboots=10, seed=42)
     assert_almost_equal(bar.dg, 0.8532451987153411, decimal=7)
     assert_almost_equal(bar.err, 0.557805610661955, decimal=7)
     assert_almost_equal(bar.conv, -0.1184253367468773, decimal=7)
     assert_almost_equal(bar.err_blocks, 1.2327258529433998, decimal=7)
-    assert_almost_equal(bar.err_boot, 0.4613033210812272, decimal=7)
-    assert_almost_equal(bar.conv_err_boot, 0.05189927533062071, decimal=7)
+    assert_almost_equal(bar.err_boot, 0.5880438018310548, decimal=7)
+    assert_almost_equal(bar.conv_err_boot, 0.06075934423674487, decimal=7)
 
 
 def test_Jarz(gf):
     wf = pickle.load(open(gf("dgdl/wf.pkl"), "rb"))
     wr = pickle.load(open(gf("dgdl/wr.pkl"), "rb"))
 
-    seed(42)
-    jarz = Jarz(wf=wf, wr=wr, T=298, nblocks=3, nboots=10)
+    jarz = Jarz(wf=wf, wr=wr, T=298, nblocks=3, nboots=10, seed=42)
     assert_almost_equal(jarz.dg_mean, 0.47552516706599357, decimal=7)
     assert_almost_equal(jarz.dg_for, -0.036297126950559477, decimal=7)
     assert_almost_equal(jarz.dg_rev, 0.98734746108254667, decimal=7)
     assert_almost_equal(jarz.err_blocks_for, 1.5034007401843161, decimal=7)
     assert_almost_equal(jarz.err_blocks_rev, 0.8732303661985571, decimal=7)
-    assert_almost_equal(jarz.err_boot_for, 1.31509469126237, decimal=7)
-    assert_almost_equal(jarz.err_boot_rev, 0.6698096954291023, decimal=7)
+    assert_almost_equal(jarz.err_boot_for, 1.0777172148033018, decimal=7)
+    assert_almost_equal(jarz.err_boot_rev, 0.684142342885241, decimal=7)
 
 
 def test_Crooks(gf):
     wf = pickle.load(open(gf("dgdl/wf.pkl"), "rb"))
     wr = pickle.load(open(gf("dgdl/wr.pkl"), "rb"))
 
-    seed(42)
-    cgi = Crooks(wf=wf, wr=wr, nblocks=3, nboots=10)
+    cgi = Crooks(wf=wf, wr=wr, nblocks=3, nboots=10, seed=42)
     assert_almost_equal(cgi.dg, 0.9312390509679932, decimal=7)
     assert_almost_equal(cgi.err_blocks, 1.4890168005551732, decimal=7)
-    assert_almost_equal(cgi.err_boot1, 0.6492475842858807, decimal=7)
-    assert_almost_equal(cgi.err_boot2, 0.8283881591989153, decimal=7)
+    assert_almost_equal(cgi.err_boot1, 0.7103179461401459, decimal=7)
+    assert_almost_equal(cgi.err_boot2, 0.6866088916789377, decimal=7)
 
 
 def test_JarzGauss(gf):
     wf = pickle.load(open(gf("dgdl/wf.pkl"), "rb"))
     wr = pickle.load(open(gf("dgdl/wr.pkl"), "rb"))
 
-    seed(42)
-    est = JarzGauss(wf=wf, wr=wr, T=298, nblocks=3, nboots=10)
+    est = JarzGauss(wf=wf, wr=wr, T=298, nblocks=3, nboots=10, seed=42)
     assert_almost_equal(est.dg_for, -0.833206609449392, decimal=7)
     assert_almost_equal(est.dg_rev, 1.9406193189728818, decimal=7)
     assert_almost_equal(est.err_for, 1.4874362551150622, decimal=7)
     assert_almost_equal(est.err_rev, 1.3502363437778697, decimal=7)
     assert_almost_equal(est.err_blocks_for, 1.141666262072706, decimal=7)
     assert_almost_equal(est.err_blocks_rev, 0.9351332210549749, decimal=7)
-    assert_almost_equal(est.err_boot_for, 1.9596620284612316, decimal=7)
-    assert_almost_equal(est.err_boot_rev, 0.9154324171316169, decimal=7)
+    assert_almost_equal(est.err_boot_for, 1.1838710553698408, decimal=7)
+    assert_almost_equal(est.err_boot_rev, 0.9272149681120118, decimal=7)
+
+
+def test_BAR_brentq(gf):
+    wf = pickle.load(open(gf("dgdl/wf.pkl"), "rb"))
+    wr = pickle.load(open(gf("dgdl/wr.pkl"), "rb"))
+
+    dg_fmin = BAR.calc_dg(wf, wr, T=298, solver='fmin')
+    dg_root = BAR.calc_dg(wf, wr, T=298, solver='brentq')
+    assert_almost_equal(dg_root, dg_fmin, decimal=4)
+
+
+def test_bootstrap_reproducible(gf):
+    wf = pickle.load(open(gf("dgdl/wf.pkl"), "rb"))
+    wr = pickle.load(open(gf("dgdl/wr.pkl"), "rb"))
+
+    # same seed and chunk size give identical results
+    err1 = BAR.calc_err_boot(wf, wr, nboots=50, T=298, seed=7, chunksize=8)
+    err2 = BAR.calc_err_boot(wf, wr, nboots=50, T=298, seed=7, chunksize=8)
+    assert err1 == err2
+
+    # the batched BAR solution matches the scalar solver replicate by replicate
+    rng = np.random.default_rng(1)
+    bf = np.array(wf)[rng.integers(0, len(wf), size=(20, len(wf)))]
+    br = np.array(wr)[rng.integers(0, len(wr), size=(20, len(wr)))]
+    dg_batch = BAR._calc_dg_batch(bf, br, T=298)
+    dg_loop = [BAR.calc_dg(f, r, T=298, solver='brentq') for f, r in zip(bf, br)]
+    assert_almost_equal(dg_batch, dg_loop, decimal=7)
+
+
+def test_bootstrap_n_jobs(gf):
+    wf = pickle.load(open(gf("dgdl/wf.pkl"), "rb"))
+    wr = pickle.load(open(gf("dgdl/wr.pkl"), "rb"))
+
+    # the random streams belong to the chunks, not to the workers
+    serial = BAR.calc_err_boot(wf, wr, nboots=40, T=298, seed=3,
+                               chunksize=10, n_jobs=1)
+    parallel = BAR.calc_err_boot(wf, wr, nboots=40, T=298, seed=3,
+                                 chunksize=10, n_jobs=2)
+    assert serial == parallel
+
+
+def test_RunningEstimates(gf):
+    wf = np.array(pickle.load(open(gf("dgdl/wf.pkl"), "rb")))
+    wr = np.array(pickle.load(open(gf("dgdl/wr.pkl"), "rb")))
+
+    est = RunningEstimates(T=298)
+    assert est.summary()['bar'] is None
+    for i in range(0, len(wf), 7):
+        est.update(wf=wf[i:i+7])
+    for i in range(0, len(wr), 5):
+        est.update(wr=wr[i:i+5])
+    res = est.summary()
+    assert res['nf'] == len(wf) and res['nr'] == len(wr)
+
+    assert_almost_equal(res['bar']['dg'], BAR.calc_dg(wf, wr, 298, 'brentq'))
+    bar = BAR(wf=wf, wr=wr, T=298)
+    assert_almost_equal(res['bar']['err'], bar.err, decimal=5)
+    assert_almost_equal(res['cgi']['dg'], Crooks(wf, wr).dg)
+    jarz = Jarz(wf=wf, wr=wr, T=298)
+    assert_almost_equal(res['jarz']['dg_for'], jarz.dg_for)
+    assert_almost_equal(res['jarz']['dg_rev'], jarz.dg_rev)
+    jg = JarzGauss(wf=wf, wr=wr, T=298)
+    assert_almost_equal(res['jarz_gauss']['dg_for'], jg.dg_for)
+    assert_almost_equal(res['jarz_gauss']['err_rev'], jg.err_rev)
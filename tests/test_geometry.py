@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+import itertools
+import pytest
+import numpy as np
+from pmx.model import Model
+from pmx.geometry import neighbor_pairs, bond_graph, bond_radii, \
+    bonded_neighbors, kabsch, transform, superpose, fit, fit_by_ndx
+
+
+def brute_pairs(x, cutoff, box=None, ref=None):
+    y = x if ref is None else ref
+    diff = y[None] - x[:, None]
+    if box is not None:
+        diff -= np.round(diff.dot(np.linalg.inv(box))).dot(box)
+        d = np.min([np.linalg.norm(diff + np.dot(s, box), axis=-1)
+                    for s in itertools.product((-1, 0, 1), repeat=3)],
+                   axis=0)
+    else:
+        d = np.linalg.norm(diff, axis=-1)
+    close = d <= cutoff
+    if ref is None:
+        close &= np.triu(np.ones_like(close), 1)
+    i, j = np.nonzero(close)
+    return i, j, d[i, j]
+
+
+@pytest.mark.parametrize("box", [
+    None,
+    [[20, 0, 0], [0, 25, 0], [0, 0, 30]],
+    [[20, 0, 0], [5, 19, 0], [-4, 6, 18]],
+    # rhombic dodecahedron
+    [[20, 0, 0], [10, 17.32, 0], [-10, 5.77, 16.33]],
+])
+@pytest.mark.parametrize("with_ref", [False, True])
+def test_neighbor_pairs(box, with_ref):
+    rng = np.random.RandomState(1)
+    x = rng.uniform(-10, 40, (400, 3))
+    ref = rng.uniform(-10, 40, (100, 3)) if with_ref else None
+    if box is not None:
+        box = np.array(box, dtype=float)
+    i, j, d = neighbor_pairs(x, 6., box=box, ref=ref)
+    ti, tj, td = brute_pairs(x, 6., box=box, ref=ref)
+    assert len(i) > 0
+    assert np.array_equal(i, ti)
+    assert np.array_equal(j, tj)
+    assert np.allclose(d, td)
+
+
+def test_neighbor_pairs_errors():
+    x = np.zeros((2, 3))
+    with pytest.raises(ValueError):
+        neighbor_pairs(x, 6., box=np.eye(3) * 10.)
+    with pytest.raises(ValueError):
+        neighbor_pairs(x, 0.)
+    i, j, d = neighbor_pairs(np.zeros((0, 3)), 6.)
+    assert len(i) == len(j) == len(d) == 0
+
+
+def test_model_neighbor_pairs(gf):
+    m = Model(gf('peptide.pdb'))
+    x = np.array([a.x for a in m.atoms])
+    i, j, d = m.neighbor_pairs(4.)
+    assert np.array_equal(np.array([i, j]),
+                          np.array(brute_pairs(x, 4.)[:2]))
+    # the same pairs with the coordinates in nm
+    m.a2nm()
+    i2, j2, d2 = m.neighbor_pairs(0.4)
+    assert np.array_equal(i, i2) and np.array_equal(j, j2)
+    assert np.allclose(d, d2 * 10.)
+    # pairs with a copy in A: every atom is at distance 0 of its copy
+    other = Model(gf('peptide.pdb'))
+    i3, j3, d3 = m.neighbor_pairs(0.4, other=other)
+    assert len(i3) == 2 * len(i) + len(m.atoms)
+    assert np.all(d3[i3 == j3] < 1e-6)
+    with pytest.raises(ValueError):
+        Model(gf('peptide.pdb')).neighbor_pairs(4., pbc=True)
+
+
+def test_bond_graph(gf):
+    m = Model(gf('peptide.pdb'))
+    x = np.array([a.x for a in m.atoms])
+    symbols = [a.name.lstrip('0123456789')[0] for a in m.atoms]
+    bonds = bond_graph(x, symbols)
+    radius = bond_radii(symbols)
+    d = np.linalg.norm(x[:, None] - x[None], axis=-1)
+    ref = (d < radius[:, None] + radius[None]) & ~np.eye(len(x), dtype=bool)
+    assert np.array_equal(bonds.toarray(), ref)
+
+    # 1-3 and 1-4 pairs as made by the loops of get_b13 and get_b14
+    b13, b14 = bonded_neighbors(bonds)
+    index = dict((id(a), k) for k, a in enumerate(m.atoms))
+    for atom, row in zip(m.atoms, bonds.toarray()):
+        atom.bonds = [m.atoms[k] for k in np.flatnonzero(row)]
+        atom.b13 = []
+        atom.b14 = []
+    m.get_b13()
+    m.get_b14()
+    for name, graph in (('b13', b13), ('b14', b14)):
+        ref = np.zeros_like(ref)
+        for k, atom in enumerate(m.atoms):
+            for other in getattr(atom, name):
+                ref[k, index[id(other)]] = True
+        ref &= ~bonds.toarray()
+        assert np.array_equal(graph.toarray(), ref)
+
+
+def test_perceive_bonds(gf):
+    m = Model(gf('peptide.pdb'))
+    bonds, b13, b14 = m.perceive_bonds()
+    assert bonds.nnz // 2 == 310
+    # the N-terminal hydrogens get a digit as symbol
+    h1 = m.fetch_atoms('H1')[0]
+    assert [a.name for a in h1.bonds] == ['N']
+    for atom, row in zip(m.atoms, b14.toarray()):
+        assert [m.atoms.index(a) for a in atom.b14] == \
+            np.flatnonzero(row).tolist()
+    # the same bonds in nm
+    m.a2nm()
+    assert (m.perceive_bonds()[0] != bonds).nnz == 0
+
+
+def random_rotation(rng):
+    q, r = np.linalg.qr(rng.normal(size=(3, 3)))
+    return q * np.sign(np.linalg.det(q))
+
+
+def test_kabsch():
+    rng = np.random.RandomState(3)
+    ref = rng.normal(scale=3., size=(12, 3))
+    rots = [random_rotation(rng) for k in range(4)]
+    confs = np.array([ref.dot(R.T) + rng.uniform(-5, 5, 3) for R in rots])
+    rmsd, R, t = kabsch(ref, confs)
+    assert rmsd.shape == (4,) and np.allclose(rmsd, 0.)
+    for k in range(4):
+        assert np.allclose(R[k], rots[k].T)
+        # the same as fitting one conformer
+        r1, R1, t1 = kabsch(ref, confs[k])
+        assert np.allclose(R1, R[k]) and np.allclose(t1, t[k])
+    assert np.allclose(transform(confs.copy(), R, t), ref[None])
+
+    # a mirror image is not fitted by a reflection
+    rmsd, R, t = kabsch(ref, ref * [1, 1, -1])
+    assert rmsd > 1. and np.isclose(np.linalg.det(R), 1.)
+
+    # only the atoms with weight count
+    noisy = confs[0] + rng.normal(size=ref.shape) * \
+        (np.arange(12) >= 6)[:, None]
+    w = (np.arange(12) < 6).astype(float)
+    rmsd, R, t = kabsch(ref, noisy, weights=w)
+    assert np.isclose(rmsd, 0.) and np.allclose(R, rots[0].T)
+
+    with pytest.raises(ValueError):
+        kabsch(ref, ref[:5])
+
+
+def test_superpose_and_fit(gf):
+    rng = np.random.RandomState(4)
+    ref = Model(gf('peptide.pdb'))
+    m = Model(gf('peptide.pdb'))
+    xyz = m.store_coords()
+    transform(xyz, random_rotation(rng), [3., -2., 1.])
+    ndx = [k + 1 for k, a in enumerate(m.atoms) if a.name == 'CA']
+    rmsd = fit_by_ndx(ref, m, ndx, ndx)
+    assert np.isclose(rmsd, 0.)
+    assert np.allclose(xyz, ref._coords_array())
+
+    # fit on atoms without a coordinate store, as bb_super does
+    m = Model(gf('peptide.pdb'))
+    m.rotate(random_rotation(rng))
+    fit(ref, m, atom_names=['N', 'CA', 'C'])
+    assert np.allclose(m._coords_array(), ref._coords_array())
+
+    # superpose moves all atoms in place
+    x = np.array([ref._coords_array()] * 2)
+    transform(x, [random_rotation(rng), random_rotation(rng)],
+              [[1., 2., 3.], [0., 0., 0.]])
+    index = np.array(ndx) - 1
+    rmsd, R = superpose(ref._coords_array()[index], x, index=index)
+    assert np.allclose(rmsd, 0.)
+    assert np.allclose(x, ref._coords_array()[None])
@@ -1,3 +1,6 @@
+import subprocess
+import sys
+import pytest
 import pmx
 
 def test_name():
@@ -5,3 +8,46 @@ def test_name():
         assert pmx.__name__ == 'pmx'
     except Exception as e:
         raise e
+
+
+# modules that are slow to import and must only be loaded on demand
+HEAVY = ['matplotlib', 'scipy.stats', 'scipy.optimize', 'scipy.integrate',
+         'scipy.spatial', 'scipy.sparse']
+
+
+def _importtime(stmt):
+    '''Returns {module: cumulative import time in us} for the modules
+    imported by running stmt in a fresh interpreter with -X importtime.'''
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', stmt],
+                         stderr=subprocess.PIPE, universal_newlines=True,
+                         check=True).stderr
+    times = {}
+    for line in out.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cum_us, name = line.split('|')
+        times[name.strip()] = int(cum_us)
+    return times
+
+
+@pytest.mark.parametrize('stmt', ['import pmx',
+                                  'import pmx.scripts.cli',
+                                  'import pmx.scripts.mutate',
+                                  'import pmx.scripts.generate_hybrid_topology'])
+def test_import_is_lazy(stmt):
+    times = _importtime(stmt)
+    assert 'pmx' in times
+    for mod in HEAVY:
+        assert mod not in times, '%s imports %s' % (stmt, mod)
+
+
+def test_lazy_names():
+    import pmx
+    from pmx.estimators import BAR
+    from pmx.analysis import plot_work_dist
+    assert pmx.BAR is BAR
+    assert pmx.plot_work_dist is plot_work_dist
+    assert pmx.gmx.__name__ == 'pmx.gmx'
+    assert 'mutate' in dir(pmx)
+    with pytest.raises(AttributeError):
+        pmx.does_not_exist
@@ -44,3 +44,234 @@ def test_double_box(r, d, longest_axis, target_file, gf, tmpdir):
     mout.write(outfile, bPDBTER=True)
 
     cmp(ref, outfile)
+
+
+def test_coord_store(gf, tmpdir):
+    import numpy as np
+    from numpy.testing import assert_allclose
+    from pmx.xtc import Trajectory
+    ref = Model(gf('peptide.pdb'))
+    m = Model(gf('peptide.pdb'), coord_array=True)
+    xyz = m.store_coords()
+    assert xyz.shape == (len(m.atoms), 3) and xyz.dtype == np.float64
+    assert_allclose(xyz, [a.x for a in ref.atoms])
+
+    # atoms are views of the array, in both directions
+    m.atoms[3].x[1] += 1.
+    assert xyz[3, 1] == ref.atoms[3].x[1] + 1.
+    m.atoms[3].x = ref.atoms[3].x
+    xyz[5] = [1., 2., 3.]
+    assert list(m.atoms[5].x) == [1., 2., 3.]
+    xyz[5] = ref.atoms[5].x
+
+    # bulk operations give the same results as the per-atom ones
+    for model in [ref, m]:
+        model.translate([1., -2., 3.])
+        model.a2nm()
+        model.rotate([[0, -1, 0], [1, 0, 0], [0, 0, 1]], origin=[1, 1, 1])
+    assert_allclose([a.x for a in m.atoms], [a.x for a in ref.atoms])
+    assert m.atoms[0].unity == 'nm'
+    assert_allclose(m.com(vector_only=True), ref.com(vector_only=True))
+    assert_allclose(m.max_crd(), ref.max_crd())
+    assert m.atoms[0] - m.atoms[1] == pytest.approx(
+        ref.atoms[0] - ref.atoms[1])
+
+    # frame updates write the whole array
+    m.nm2a()
+    t = Trajectory(gf('peptide.xtc'))
+    frame = next(iter(t))
+    frame.update(m)
+    t.close()
+    assert_allclose(xyz, frame.get_coords(units='A'))
+
+    # copies get their own array
+    m2 = m.copy()
+    m2.translate([1., 0., 0.])
+    assert_allclose(m2.atoms[0].x, np.array(m.atoms[0].x) + [1., 0., 0.])
+
+    # atoms taken over by the store of a residue are found again
+    res = m.residues[2]
+    res.store_coords()
+    before = np.array([a.x for a in m.atoms])
+    m.translate([1., 2., 3.])
+    assert_allclose([a.x for a in m.atoms], before + [1., 2., 3.])
+    assert res.atoms[0]._store is m.atoms[0]._store
+    m.translate([-1., -2., -3.])
+
+    # copies of single atoms are detached from the store
+    import copy
+    a = copy.deepcopy(m.atoms[3])
+    assert isinstance(a.x, list) and a.x == m.atoms[3].x.tolist()
+    assert a._store is None and m.atoms[3]._store is m._coord_store
+
+    m.release_coords()
+    assert isinstance(m.atoms[0].x, list)
+    assert_allclose([a.x for a in m.atoms], frame.get_coords(units='A'))
+
+
+def test_slot_atom(gf, tmpdir):
+    import copy
+    from pmx.atom import SlotAtom
+    ref = Model(gf('doublebox/file1.gro'))
+    m = Model(gf('doublebox/file1.gro'), atom_class=SlotAtom)
+    assert all(isinstance(a, SlotAtom) for a in m.atoms)
+    assert [str(a) for a in m.atoms] == [str(a) for a in ref.atoms]
+    assert [r.resname for r in m.residues] == \
+        [r.resname for r in ref.residues]
+
+    a = m.atoms[0]
+    assert a._bonds is None and a.bonds == [] and a._bonds == []
+    assert a.v == [0, 0, 0]
+    a.nameB = 'X'
+    b = copy.deepcopy(a)
+    assert b.nameB == 'X' and b.x == a.x and b.x is not a.x
+
+    # renamed atoms are found
+    res = m.residues[0]
+    first = res.atoms[0]
+    assert res.fetch(first.name) == [first]
+    name, res.atoms[-1].name = res.atoms[-1].name, first.name
+    assert res.fetch(first.name) == [first, res.atoms[-1]]
+    res.atoms[-1].name = name
+
+    a = SlotAtom(name='CA', x=[1., 2., 3.], bfac=20.)
+    assert (a.name, a.x, a.bfac) == ('CA', [1., 2., 3.], 20.)
+
+    m.write(str(tmpdir.join('slot.gro')))
+    ref.write(str(tmpdir.join('ref.gro')))
+    assert cmp(str(tmpdir.join('slot.gro')), str(tmpdir.join('ref.gro')))
+
+
+def test_columns_reader(gf, tmpdir):
+    import numpy as np
+    from pmx.atom import Atom
+    from pmx import columns
+    lines = [l.rstrip('\n') for l in open(gf('peptide.pdb'))
+             if l.startswith(('ATOM', 'HETATM'))]
+    lines[5] = lines[5][:26] + 'A' + lines[5][27:]   # insertion code
+    lines[6] = lines[6][:54]                          # no occupancy
+    lines.insert(10, 'TER')
+    lines.append('HETATM 9999  OW  SOL   998      1.000   2.000   3.000')
+    pdb = '\n'.join(lines) + '\nEND\n'
+
+    m = Model(pdbline=pdb, renumber_atoms=False, renumber_residues=False)
+    ref = [Atom().readPDBString(l) for l in lines if l != 'TER']
+    assert [str(a) for a in m.atoms] == [str(a) for a in ref]
+    for a, b in zip(m.atoms, ref):
+        assert (a.resnr, a.occ, a.symbol, a.long_name) == \
+            (b.resnr, b.occ, b.symbol, b.long_name)
+        assert a in a.molecule.atoms and a.molecule in a.chain.residues
+    assert m.residues[-1].moltype == 'water'
+
+    cols = columns.read_pdb(pdbline=pdb)
+    assert cols.ter.sum() == 1 and cols.ter[10]
+    assert cols.resnr.dtype == object and cols.resnr[5] == lines[5][22:27]
+
+    # GRO with velocities
+    fn = str(tmpdir.join('vel.gro'))
+    gro = Model(gf('doublebox/file1.gro'))
+    for i, a in enumerate(gro.atoms):
+        a.v = [0.001*(i+1), -0.5, 1.25]
+    gro.writeGRO(fn)
+    cols = columns.read_gro(fn)
+    assert cols.unity == 'nm' and cols.box == gro.box
+    assert np.allclose(cols.x, [a.x for a in gro.atoms], atol=1e-3)
+    assert np.allclose(cols.v, [a.v for a in gro.atoms], atol=1e-4)
+    m = Model(fn)
+    assert [str(a) for a in m.atoms] == [str(a) for a in gro.atoms]
+    assert m.atoms[0].v == cols.v[0].tolist()
+
+
+def test_lazy_model(gf, tmpdir):
+    from pmx.xtc import Trajectory
+    ref = Model(gf('peptide.pdb'))
+    m = Model(gf('peptide.pdb'), lazy=True)
+    assert m.columns is not None and len(m.columns) == len(ref.atoms)
+    assert str(m) == str(ref) and m.moltype == ref.moltype
+
+    # writing and updating the coordinates do not make the objects
+    for ext in ['pdb', 'gro']:
+        m.write(str(tmpdir.join('lazy.' + ext)))
+        ref.write(str(tmpdir.join('ref.' + ext)))
+        assert cmp(str(tmpdir.join('lazy.' + ext)),
+                   str(tmpdir.join('ref.' + ext)))
+    t = Trajectory(gf('peptide.xtc'))
+    frame = next(iter(t))
+    frame.update(m)
+    frame.update(ref)
+    t.close()
+    assert m.columns is not None
+    assert (m.columns.x == [a.x for a in ref.atoms]).all()
+
+    # using the residues makes all objects
+    res = m.fetch_residue(2)
+    assert m.columns is None
+    assert (res.resname, res.orig_id) == (ref.residues[1].resname,
+                                          ref.residues[1].orig_id)
+    assert [str(a) for a in m.atoms] == [str(a) for a in ref.atoms]
+    assert [c.id for c in m.chains] == [c.id for c in ref.chains]
+    assert all(a.molecule.chain is a.chain and a.model is m
+               for a in m.atoms)
+
+
+def test_lookup_indexes(gf):
+    m = Model(gf('peptide.pdb'))
+    ch = m.chains[0]
+    res = m.fetch_residue(3, chain=ch.id)
+    assert res is m.residues[2] and ch.fetch_residue(3) is res
+    assert res.fetchm(['C', 'CA', 'N']) == [res['C'], res['CA'], res['N']]
+    atom = m.atoms[40]
+    assert m.fetch_atoms(atom.id, how='byid') == [atom]
+
+    # atoms and residues renamed directly are still found
+    res['CA'].name = 'CX'
+    assert res.fetch('CA') == [] and len(res.fetch('CX')) == 1
+    res['CX'].name = 'CA'
+    last = res.atoms[-1]
+    name, last.name = last.name, 'CA'
+    ref = [a for a in res.atoms if a.name == 'CA']
+    assert len(ref) == 2 and res.fetch('CA') == ref
+    assert res.fetchm(['CA']) == ref
+    last.name = name
+    other = m.atoms[7]
+    oid, other.id = other.id, atom.id
+    assert m.fetch_atoms(atom.id, how='byid') == [other, atom]
+    other.id = oid
+    rid = m.residues[1].id
+    m.residues[1].id = res.id
+    with pytest.raises(ValueError):
+        m.fetch_residue(3)
+    with pytest.raises(ValueError):
+        ch.fetch_residue(3)
+    m.residues[1].id = rid
+    assert m.fetch_residue(3) is res
+
+    # also in copies, whose indexes are copied along
+    m2 = m.copy()
+    m2.residues[2].atoms[-1].name = 'CA'
+    assert len(m2.residues[2].fetch('CA')) == 2
+
+    # renaming the atoms of another Model keeps the indexes, those of
+    # other selections of the renamed atoms are rebuilt
+    from pmx.atomselection import Atomselection
+    cols = m._atom_columns()
+    sel = Atomselection(atoms=m2.atoms[:30])
+    assert sel.fetch_atoms(m2.atoms[3].id, how='byid') == [m2.atoms[3]]
+    m2.atoms[5].id = m2.atoms[3].id
+    assert m._atom_columns() is cols
+    assert sel.fetch_atoms(m2.atoms[3].id, how='byid') == [m2.atoms[3],
+                                                           m2.atoms[5]]
+
+    # inserting and removing residues update the lookups
+    new = m.residues[5].copy()
+    for a in new.atoms:
+        a.molecule = new
+    new.chain = new.model = None
+    m.replace_residue(res, new, bKeepResNum=True)
+    assert m.fetch_residue(3) is new and ch.fetch_residue(3) is new
+    assert new.fetch('CA')[0] in m.atoms
+    m.remove_residue(new)
+    assert m.fetch_residue(3) is m.residues[2] is not new
+    with pytest.raises(ValueError):
+        m.fetch_residue(len(m.residues) + 1)
+    assert m.fetch_atoms(len(m.atoms), how='byid') == [m.atoms[-1]]
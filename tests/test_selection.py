@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+import pytest
+from pmx.model import Model
+from pmx.selection import compile_selection
+
+
+@pytest.mark.parametrize("text, keep", [
+    ('name CA and chain A', lambda a: a.name == 'CA' and a.chain_id == 'A'),
+    ('resname LEU TYR', lambda a: a.resname in ['LEU', 'TYR']),
+    ('resid 2 to 4 or resid 7-8', lambda a: a.resnr in [2, 3, 4, 7, 8]),
+    ('protein and not (element H or name C*)',
+     lambda a: a.symbol != 'H' and not a.name.startswith('C')),
+    ('id 1 5 10', lambda a: a.id in [1, 5, 10]),
+    ('water or none', lambda a: False),
+])
+def test_select(protein_model, text, keep):
+    ref = [a for a in protein_model.atoms if keep(a)]
+    assert protein_model.select(text).atoms == ref
+    idx = protein_model.select(text, indices=True)
+    assert [protein_model.atoms[i] for i in idx] == ref
+
+
+def test_select_within(gf):
+    m = Model(gf('peptide.pdb'))
+    res = [a for a in m.atoms if a.resnr == 3]
+    ref = [i for i, a in enumerate(m.atoms)
+           if a.name == 'CA' and min(a - b for b in res) <= 5.]
+    sel = compile_selection('within 5 of resid 3 and name CA')
+    assert compile_selection('within 5 of resid 3 and name CA') is sel
+    assert m.select(sel, indices=True).tolist() == ref
+
+    # new coordinates only change the within part
+    x = m._coords_array() + [100., 0., 0.]
+    x[[a.resnr == 3 for a in m.atoms]] -= [100., 0., 0.]
+    assert m.select(sel, x=x, indices=True).tolist() == \
+        [i for i in ref if m.atoms[i].resnr == 3]
+
+    # a lazy Model selects on its columns
+    lazy = Model(gf('peptide.pdb'), lazy=True)
+    assert lazy.select(sel, indices=True).tolist() == ref
+    assert lazy.columns is not None
+
+
+def test_select_after_rename(gf):
+    m = Model(gf('peptide.pdb'))
+    n = len(m.select('name CA').atoms)
+    m.atoms[0].name = 'CA'
+    sel = m.select('name CA')
+    assert len(sel.atoms) == n + 1 and sel.atoms[0] is m.atoms[0]
+    m.residues[0].atoms[0].resname = 'XXX'
+    assert m.select('resname XXX').atoms == [m.atoms[0]]
+
+
+@pytest.mark.parametrize("text", ['', 'name', 'foo CA', 'within x of all',
+                                  '(name CA', 'name CA)', 'resid A'])
+def test_select_errors(protein_model, text):
+    with pytest.raises(ValueError):
+        protein_model.select(text)
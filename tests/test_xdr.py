@@ -16,3 +16,233 @@ def test_trajectory_xdr(gf, struct, traj):
     assert_almost_equal(m.atoms[2].x[1], 34.70, decimal=2)
     t.close()
     
+
+
+@pytest.mark.parametrize("traj", ['peptide.trr', 'peptide.xtc'])
+def test_trajectory_numpy_mode(gf, traj):
+    import numpy as np
+    res = {}
+    for mode in ['Std', 'NumPy']:
+        m = Model(gf('peptide.pdb'))
+        t = Trajectory(gf(traj), mode=mode)
+        res[mode] = []
+        for frame in t:
+            frame.update(m)
+            res[mode].append(([a.x[:] for a in m.atoms], frame.time))
+        t.close()
+    assert res['Std'] == res['NumPy']
+
+    # NumPy is the default; the frame buffers are reused
+    t = Trajectory(gf(traj))
+    xs = [frame.x for frame in t]
+    t.close()
+    assert isinstance(xs[0], np.ndarray) and xs[0].dtype == np.float32
+    assert all(x is xs[0] for x in xs)
+    assert frame.get_coords(units='A').shape == (len(m.atoms), 3)
+
+
+@pytest.mark.parametrize("traj", ['peptide.trr', 'peptide.xtc'])
+def test_trajectory_random_access(gf, tmpdir, traj):
+    import os
+    import shutil
+    import numpy as np
+    from pmx.xdrfile import index_filename, read_frame_index
+    fn = str(tmpdir.join(traj))
+    shutil.copy(gf(traj), fn)
+
+    t = Trajectory(fn)
+    frames = [(f.x.copy(), f.time, f.step) for f in t]
+    assert len(t) == len(frames) == 6
+    assert os.path.isfile(index_filename(fn))
+    assert np.array_equal(t.times, [f[1] for f in frames])
+    assert np.array_equal(t.steps, [f[2] for f in frames])
+    for i in [0, 3, -1]:
+        assert np.array_equal(t[i].x, frames[i][0])
+    assert [f.time for f in t[1::2]] == [f[1] for f in frames[1::2]]
+    with pytest.raises(IndexError):
+        t[len(t)]
+
+    # seeking moves the iteration
+    assert t.seek_time(frames[4][1] + 0.1) == 4
+    assert [f.step for f in t] == [f[2] for f in frames[4:]]
+    t.close()
+
+    # the sidecar index is invalidated when the file changes
+    with open(fn, 'ab') as f:
+        f.write(b'\0' * 4)
+    assert len(read_frame_index(fn)[0]) == 6
+    os.utime(fn, ns=(0, 0))
+    offsets, steps, times = read_frame_index(fn)
+    assert np.load(index_filename(fn))['size'] == os.path.getsize(fn)
+
+
+@pytest.mark.parametrize("traj", ['peptide.trr', 'peptide.xtc'])
+def test_trajectory_strided(gf, tmpdir, traj):
+    import shutil
+    import numpy as np
+    fn = str(tmpdir.join(traj))
+    shutil.copy(gf(traj), fn)
+
+    t = Trajectory(fn)
+    frames = [(f.x.copy(), f.time) for f in t]
+    for kwargs, ref in [(dict(step=2), frames[::2]),
+                        (dict(start=1, stop=5, step=3), frames[1:5:3]),
+                        (dict(begin_time=8.), frames[2:]),
+                        (dict(begin_time=4., end_time=12., step=2),
+                         frames[1:4:2]),
+                        (dict(step=-1), frames[::-1]),
+                        (dict(), frames)]:
+        res = [(f.x.copy(), f.time) for f in t.frames(**kwargs)]
+        assert [r[1] for r in res] == [r[1] for r in ref]
+        assert all(np.array_equal(r[0], x[0]) for r, x in zip(res, ref))
+    t.close()
+
+
+def _mean_x(frame):
+    return float(frame.x.mean())
+
+
+@pytest.mark.parametrize("traj", ['peptide.trr', 'peptide.xtc'])
+def test_read_frames_parallel(gf, tmpdir, monkeypatch, traj):
+    import shutil
+    import numpy as np
+    from pmx import xdrfile
+    from pmx.xdrfile import read_frames_parallel
+    fn = str(tmpdir.join(traj))
+    shutil.copy(gf(traj), fn)
+    t = Trajectory(fn)
+    ref = np.array([f.x.copy() for f in t])
+    t.close()
+
+    for nproc in [1, 2]:
+        x = read_frames_parallel(fn, nproc=nproc)
+        assert x.shape == (6, 304, 3) and np.array_equal(x, ref)
+        xs = read_frames_parallel(fn, nproc=nproc, step=2, split=True)
+        assert len(xs) == min(nproc, 3)
+        assert np.array_equal(np.concatenate(xs), ref[::2])
+        res = read_frames_parallel(fn, nproc=nproc, begin_time=4.,
+                                   reducer=_mean_x)
+        assert res == [float(r.mean()) for r in ref[1:]]
+
+    # several blocks per worker, decoded into a given array
+    monkeypatch.setattr(xdrfile, '_PARALLEL_BLOCK', 2 * 304 * 12)
+    out = np.zeros_like(ref)
+    x = read_frames_parallel(fn, nproc=2, out=out)
+    assert x is out and np.array_equal(out, ref)
+    xs = read_frames_parallel(fn, nproc=3, split=True)
+    assert [len(c) for c in xs] == [2, 2, 2]
+    assert np.array_equal(np.concatenate(xs), ref)
+    with pytest.raises(ValueError):
+        read_frames_parallel(fn, nproc=2, out=np.zeros((5, 304, 3)))
+
+
+@pytest.mark.parametrize("ext", ['trr', 'xtc'])
+def test_write_frames(tmpdir, ext):
+    import numpy as np
+    from pmx.xdrfile import XDRFile
+    fn = str(tmpdir.join('out.' + ext))
+    bTrr = ext == 'trr'
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0., 30., size=(5, 20, 3))
+    box = np.diag([3., 3., 3.])
+
+    out = XDRFile(fn, mode='Out', atomNum=20)
+    out.write_frames(x[:3], step=[0, 10, 20], time=[0., 1., 2.], box=box,
+                     bTrr=bTrr)
+    out.close()
+    # append, taking the number of atoms from the file
+    out = XDRFile(fn, mode='Out', append=True)
+    assert out.natoms == 20
+    out.write_frames(x[3:4], step=30, time=3., box=box, bTrr=bTrr)
+    out.write_xtc_frame(step=40, time=4., box=box, x=x[4].ravel().tolist(),
+                        bTrr=bTrr)
+    out.close()
+
+    t = XDRFile(fn)
+    res = [(f.step, f.time, f.get_coords(units='A'), f.box.copy()) for f in t]
+    t.close()
+    assert [r[0] for r in res] == [0, 10, 20, 30, 40]
+    assert [r[1] for r in res] == [0., 1., 2., 3., 4.]
+    for r, xi in zip(res, x):
+        np.testing.assert_allclose(r[2], xi, atol=0.01)
+        np.testing.assert_array_equal(r[3], box)
+
+
+def test_mapped_trr(gf, tmpdir):
+    import shutil
+    import numpy as np
+    from pmx.xdrfile import XDRFile, MappedTrr
+    t = XDRFile(gf('peptide.trr'))
+    ref = [(f.x.copy(), f.box.copy(), f.time) for f in t]
+    t.close()
+
+    trr = MappedTrr(gf('peptide.trr'))
+    assert len(trr) == 6 and trr.natoms == 304
+    assert np.array_equal(trr.times, [r[2] for r in ref])
+    for i, (x, box, time) in enumerate(ref):
+        assert np.array_equal(trr.get_x(i), x)
+        assert np.array_equal(trr.x[i], x)
+        assert np.array_equal(trr.get_box(i), box)
+    assert_almost_equal(trr.get_x(2, units='A'), ref[2][0] * 10, decimal=4)
+    assert trr.x.dtype == np.dtype('>f4') and trr.x[::2].shape == (3, 304, 3)
+    assert trr.has('v').all() and not trr.has('f').any()
+    assert np.array_equal(trr.get_v(-1), trr.v[-1])
+    with pytest.raises(ValueError):
+        trr.f
+    with pytest.raises(ValueError):
+        trr.get_f(0)
+    trr.close()
+
+    # a frame without velocities breaks the uniform layout
+    fn = str(tmpdir.join('mixed.trr'))
+    shutil.copy(gf('peptide.trr'), fn)
+    out = XDRFile(fn, mode='Out', append=True)
+    out.write_frames(ref[0][0][None], time=24., units='nm', bTrr=True)
+    out.close()
+    trr = MappedTrr(fn)
+    assert len(trr) == 7 and not trr.has('v')[-1]
+    assert np.array_equal(trr.get_x(-1), ref[0][0])
+    assert np.array_equal(trr.x[-1], ref[0][0])
+    with pytest.raises(ValueError):
+        trr.v
+    assert trr.get_v(5).shape == (304, 3)
+    trr.close()
+
+
+def test_trajectory_set(tmpdir):
+    import numpy as np
+    from pmx.xdrfile import XDRFile
+    from pmx.xtc import TrajectorySet
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0., 30., size=(11, 8, 3))
+    # restart parts that repeat the frame of the checkpoint; part1 was
+    # written past the checkpoint at frame 4, and part2 overwrites it
+    for name, frames in [('md.part1.xtc', range(0, 6)),
+                         ('md.part2.xtc', range(4, 9)),
+                         ('md.part10.xtc', range(8, 11))]:
+        out = XDRFile(str(tmpdir.join(name)), mode='Out', atomNum=8)
+        xk = x[list(frames)]
+        if name == 'md.part1.xtc':
+            xk[4:] += 1.
+        out.write_frames(xk, step=np.array(frames) * 10,
+                         time=list(frames))
+        out.close()
+
+    trajs = TrajectorySet(str(tmpdir.join('md.part*.xtc')))
+    names = ['md.part1.xtc', 'md.part2.xtc', 'md.part10.xtc']
+    assert trajs.filenames == [str(tmpdir.join(n)) for n in names]
+    assert len(trajs) == 11
+    assert np.array_equal(trajs.times, np.arange(11))
+    assert trajs.locate(3) == (0, 3)
+    assert trajs.locate(4) == (1, 0)
+    assert trajs.locate(8) == (2, 0)
+    assert [f.time for f in trajs] == list(range(11))
+    assert [f.step for f in trajs.frames(begin_time=3., step=3)] == \
+        [30, 60, 90]
+    for i in [0, 3, 4, 5, -1]:
+        np.testing.assert_allclose(trajs[i].get_coords(units='A'), x[i],
+                                   atol=0.01)
+    assert [f.time for f in trajs[9:2:-3]] == [9., 6., 3.]
+    with pytest.raises(IndexError):
+        trajs[11]
+    trajs.close()